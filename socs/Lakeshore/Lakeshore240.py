@@ -14,6 +14,8 @@ from typing import List
 
 from serial import Serial
 
+from socs.Lakeshore.curves import MAX_BREAKPOINTS, CurveTransfer
+
 BUFF_SIZE = 1024
 
 
@@ -335,13 +337,7 @@ class Channel:
 
     def read_curve(self):
         # Reads curve
-        breakpoints = []
-        for i in range(1, 201):
-            resp = self.ls.msg("CRVPT? {},{}".format(self.channel_num, i))
-            unit, temp = resp.split(',')
-            if float(unit) == 0.0:
-                break
-            breakpoints.append((float(unit), float(temp)))
+        breakpoints = CurveTransfer(self.ls, self.channel_num).read_points()
 
         resp = self.ls.msg("CRVHDR? {}".format(self.channel_num)).split(',')
 
@@ -384,39 +380,49 @@ class Channel:
         message += ",".join([str(c) for c in [self.channel_num, n, x, y]])
         self.ls.msg(message)
 
-    def load_curve(self, filename):
+    def load_curve(self, filename, verify=False):
         """Upload calibration curve to channel from file.
 
         Args:
             filename (str): Calibration file for upload.
+            verify (bool): Read back the uploaded breakpoints, and re-upload
+                any that don't match. Also skips the upload if this curve is
+                known to already be loaded on the channel.
 
         """
         self.curve = Curve(filename=filename)
         hdr = self.curve.header
         keys = list(hdr)
+        header = [hdr[key] for key in keys[:5]]
+
+        bps = self.curve.breakpoints
+        assert len(bps) <= MAX_BREAKPOINTS, "Curve must have 200 breakpoints or less"
+        # Unused breakpoints are zeroed, to clear any previous curve
+        points = bps + [(0, 0)] * (MAX_BREAKPOINTS - len(bps))
+
+        transfer = CurveTransfer(self.ls, self.channel_num)
+        if verify and transfer.is_loaded(header, points):
+            print("Curve already loaded to {}".format(self.name))
+            return
 
         # loads header
         cmd = "CRVHDR {}".format(self.channel_num)
-        for key in keys[:5]:
-            cmd += ",{}".format(hdr[key])
+        for val in header:
+            cmd += ",{}".format(val)
         print(cmd)
         self.ls.msg(cmd)
 
-        bps = self.curve.breakpoints
-        assert len(bps) <= 200, "Curve must have 200 breakpoints or less"
-
         print("Loading Curve to {}".format(self.name))
-        for i in range(200):
-            if i < len(bps):
-                self.load_curve_point(i + 1, bps[i][0], bps[i][1])
-            else:
-                self.load_curve_point(i + 1, 0, 0)
+        transfer.upload(points, verify=verify)
+        if verify:
+            transfer.remember(header, points)
         print("Curve loaded")
 
     def delete_curve(self):
         """Delete calibration curve from channel."""
         cmd = "CRVDEL {}".format(self.channel_num)
         self.ls.msg(cmd)
+        CurveTransfer(self.ls, self.channel_num).forget()
 
     def __str__(self):
         string = "-" * 40 + "\n"
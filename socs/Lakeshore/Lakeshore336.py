@@ -8,6 +8,8 @@ import time
 
 import numpy as np
 
+from socs.Lakeshore.curves import CurveTransfer
+
 # helper dicts
 sensor_key = {
     '0': 'disabled',
@@ -443,6 +445,11 @@ class Channel:
 class Curve:
     """Calibration Curve class for the LS336."""
 
+    # Breakpoints are transferred one per message; msg already waits
+    # between messages as required by the device.
+    _transfer_batch_size = 1
+    _transfer_point_interval = 0.
+
     def __init__(self, ls, curve_num):
         self.ls = ls
         self.curve_num = curve_num
@@ -724,17 +731,17 @@ class Curve:
 
         return resp
 
+    def _transfer(self):
+        return CurveTransfer(self.ls, self.curve_num,
+                             batch_size=self._transfer_batch_size,
+                             point_interval=self._transfer_point_interval)
+
     # Public API Elements
     def get_curve(self, _file=None):
         """Get a calibration curve from the LS336.
         If _file is not None, save to file location.
         """
-        breakpoints = []
-        for i in range(1, 201):
-            x = self.get_data_point(i)
-            if x[0] == 0:
-                break
-            breakpoints.append(x)
+        breakpoints = self._transfer().read_points()
 
         struct_array = np.array(breakpoints, dtype=[('units', 'f8'),
                                                     ('temperature', 'f8')])
@@ -795,56 +802,25 @@ class Curve:
         for i in range(9, len(content)):
             values.append(content[i].strip().split())
 
-        self.delete_curve()
-        # remove old curve first, so old breakpoints don't remain
+        header = header[:-1]  # ignore num of breakpoints
+        points = [(point[1], point[2]) for point in values if point]
+
+        transfer = self._transfer()
+        if transfer.is_loaded(header, points):
+            print(f"Curve {self.curve_num} is already loaded, skipping upload")
+            return
+
+        self.delete_curve()  # remove old curve first, so old breakpoints don't remain
         time.sleep(1)  # necessary to make work
 
-        self._set_header(header[:-1])  # ignore num of breakpoints
+        self._set_header(header)
 
-        for point in values:
-            print("uploading %s" % point)
-            self._set_data_point(point[0], point[1], point[2])
+        print(f"Uploading {len(points)} breakpoints to curve {self.curve_num}")
+        transfer.upload(points)
 
         # refresh curve attributes
         self.get_header()
-        self._check_curve(_file)
-
-    def _check_curve(self, _file):
-        """After setting a data point for calibration curve,
-        use CRVPT? command from get_data_point() to check
-        that all points of calibration curve  were uploaded.
-        If not, re-upload points.
-
-        Parameters
-        ----------
-        _file : str
-            calibration curve file
-
-        """
-        with open(_file) as f:
-            content = f.readlines()
-
-        # skipping header info
-        values = []
-        for i in range(9, len(content)):
-            # data points that should have been uploaded
-            values.append(content[i].strip().split())
-
-        for j in range(1, len(values) + 1):
-            try:
-                resp = self.get_data_point(j)  # response from the 336
-                point = values[j - 1]
-                units = float(resp[0])
-                temperature = float(resp[1])
-                assert units == float(
-                    point[1]), "Point number %s not uploaded" % point[0]
-                assert temperature == float(
-                    point[2]), "Point number %s not uploaded" % point[0]
-                print("Successfully uploaded %s, %s" % (units, temperature))
-            # if AssertionError, tell 336 to re-upload points
-            except AssertionError:
-                if units != float(point[1]):
-                    self.set_curve(_file)
+        transfer.remember(header, points)
 
     def delete_curve(self):
         """Delete the curve using the CRVDEL command.
@@ -856,6 +832,7 @@ class Curve:
 
         """
         resp = self.ls.msg(f"CRVDEL {self.curve_num}")
+        self._transfer().forget()
         # self.get_header()
         return resp
 
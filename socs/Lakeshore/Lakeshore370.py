@@ -7,6 +7,8 @@ import time
 import numpy as np
 import serial
 
+from socs.Lakeshore.curves import CurveTransfer
+
 # Lookup keys for command parameters.
 autorange_key = {'0': 'off',
                  '1': 'on'}
@@ -992,6 +994,11 @@ class Channel:
 class Curve:
     """Calibration Curve class for the LS370."""
 
+    # Breakpoints are transferred one per message; msg already waits
+    # between messages as required by the device.
+    _transfer_batch_size = 1
+    _transfer_point_interval = 0.
+
     def __init__(self, ls, curve_num):
         self.ls = ls
         self.curve_num = curve_num
@@ -1215,6 +1222,11 @@ class Curve:
         resp = self.ls.msg(f"CRVPT {self.curve_num}, {index}, {units}, {kelvin}")
         return resp
 
+    def _transfer(self):
+        return CurveTransfer(self.ls, self.curve_num,
+                             batch_size=self._transfer_batch_size,
+                             point_interval=self._transfer_point_interval)
+
     # Public API Elements
     def get_curve(self, _file=None):
         """Get a calibration curve from the LS370.
@@ -1224,12 +1236,7 @@ class Curve:
         :param _file: the file to load the calibration curve from
         :type _file: str
         """
-        breakpoints = []
-        for i in range(1, 201):
-            x = self.get_data_point(i)
-            if x[0] == 0:
-                break
-            breakpoints.append(x)
+        breakpoints = self._transfer().read_points()
 
         struct_array = np.array(breakpoints, dtype=[('units', 'f8'),
                                                     ('temperature', 'f8')])
@@ -1279,70 +1286,24 @@ class Curve:
         for i in range(9, len(content)):
             values.append(content[i].strip().split())
 
+        header = header[:-1]  # ignore num of breakpoints
+        points = [(point[1], point[2]) for point in values if point]
+
+        transfer = self._transfer()
+        if transfer.is_loaded(header, points):
+            print(f"Curve {self.curve_num} is already loaded, skipping upload")
+            return
+
         self.delete_curve()  # remove old curve first, so old breakpoints don't remain
 
-        self._set_header(header[:-1])  # ignore num of breakpoints
+        self._set_header(header)
 
-        for point in values:
-            print("uploading %s" % point)
-            self._set_data_point(point[0], point[1], point[2])
+        print(f"Uploading {len(points)} breakpoints to curve {self.curve_num}")
+        transfer.upload(points)
 
         # refresh curve attributes
         self.get_header()
-        self._check_curve(_file)
-
-    def _check_curve(self, _file):
-        """After setting a data point for calibration curve,
-        use CRVPT? command from get_data_point() to check
-        that all points of calibration curve  were uploaded.
-        If not, re-upload points.
-
-        :param _file: calibration curve file
-        :type _file: str
-        """
-
-        with open(_file) as f:
-            content = f.readlines()
-
-        # skipping header info
-        values = []
-        for i in range(9, len(content)):
-            values.append(content[i].strip().split())  # data points that should have been uploaded
-
-        # TODO: shouldn't this be capped at len(values) + 1?
-        # above is done ZA 20200330
-        for j in range(1, len(values) + 1):
-            try:
-                resp = self.get_data_point(j)  # response from the 370
-                point = values[j - 1]
-                units = float(resp[0])
-                temperature = float(resp[1])
-                assert units == float(point[1]), "Point number %s not uploaded" % point[0]
-                assert temperature == float(point[2]), "Point number %s not uploaded" % point[0]
-                print("Successfully uploaded %s, %s" % (units, temperature))
-            # if AssertionError, tell 370 to re-upload points
-
-            # TODO: shouldn't this condition on either units or temperature, not just units?
-            # above is done ZA 20200330
-            except AssertionError:
-                if units != float(point[1]) or temperature != float(point[2]):
-
-                    # TODO: fix, could enter infinite loop if always fails
-                    self.set_curve(_file)
-
-        # check that remainining points are zeros
-        for j in range(len(values) + 1, 201):
-            try:
-                resp = self.get_data_point(j)  # response from the 370
-                units = float(resp[0])
-                temperature = float(resp[1])
-                assert units == 0, "Point number %s contains nonzero data" % j
-                assert temperature == 0, "Point number %s contains nonzero data" % j
-            except AssertionError:
-                if units != 0 or temperature != 0:
-
-                    # TODO: fix, could enter infinite loop if always fails
-                    self.set_curve(_file)
+        transfer.remember(header, points)
 
     def delete_curve(self):
         """Delete the curve using the CRVDEL command.
@@ -1351,6 +1312,7 @@ class Curve:
         :rtype: str
         """
         resp = self.ls.msg(f"CRVDEL {self.curve_num}")
+        self._transfer().forget()
         self.get_header()
         return resp
 
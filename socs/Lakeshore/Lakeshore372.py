@@ -5,6 +5,7 @@ import time
 
 import numpy as np
 
+from socs.Lakeshore.curves import CurveTransfer
 from socs.tcp import TCPInterface
 
 # Lookup keys for command parameters.
@@ -221,18 +222,73 @@ class LS372(TCPInterface):
         str
             Response string from the Lakeshore, if any. Else, an empty string.
 
+        Raises
+        ------
+        ConnectionError
+            Raised if the connection is closed, or the response is not
+            complete within the timeout.
+
         """
         msg_str = f'{message}\r\n'.encode()
 
         if '?' in message:
             self.send(msg_str)
-            resp = str(self.recv(reset_on_error=True), 'utf-8').strip()
+            # Long responses, such as those to batched queries, may arrive
+            # in several pieces. All responses end with a line terminator.
+            data = b''
+            deadline = time.time() + self.timeout
+            while not data.endswith(b'\n'):
+                if data and time.time() > deadline:
+                    self._reset()
+                    raise ConnectionError("Incomplete response within "
+                                          f"{self.timeout} seconds: {data}")
+                chunk = self.recv(reset_on_error=True)
+                if not chunk:
+                    self._reset()
+                    raise ConnectionError("Connection closed by the device.")
+                data += chunk
+            resp = str(data, 'utf-8').strip()
         else:
             self.send(msg_str)
             resp = ''
 
         return resp
 
+    def msg_batch(self, messages):
+        """Send several queries to the Lakeshore 372 in one transmission.
+
+        The queries are joined with semicolons, and the 372 replies to all of
+        them at once, with the responses also separated by semicolons. This
+        costs a single round trip, rather than one per query.
+
+        Parameters
+        ----------
+        messages : list of str
+            Query strings as described in the Lakeshore 372 manual.
+
+        Returns
+        -------
+        list of str
+            Response to each query, in order.
+
+        Raises
+        ------
+        ConnectionError
+            Raised if the number of responses doesn't match the number of
+            queries.
+
+        """
+        for message in messages:
+            if '?' not in message:
+                raise ValueError(f"Only queries can be batched, got '{message}'")
+
+        resp = self.msg(';'.join(messages))
+        resps = [r.strip() for r in resp.split(';')]
+        if len(resps) != len(messages):
+            raise ConnectionError(f"Expected {len(messages)} responses to "
+                                  f"batched query, got '{resp}'")
+        return resps
+
     def get_id(self):
         """Get the ID number of the Lakeshore unit."""
         return self.msg('*IDN?')
@@ -318,7 +374,17 @@ class LS372(TCPInterface):
         :returns: channel object describing the scanned channel
         :rtype: Channel Object
         """
-        resp = self.msg("SCAN?")
+        return self.get_channel_from_scan(self.msg("SCAN?"))
+
+    def get_channel_from_scan(self, resp):
+        """Get the scanned channel from a response to the SCAN? query.
+
+        :param resp: response to SCAN?
+        :type resp: str
+
+        :returns: channel object describing the scanned channel
+        :rtype: Channel Object
+        """
         channel_number = int(resp.split(',')[0])
         channel_list = [_.channel_num for _ in self.channels]
         idx = channel_list.index(channel_number)
@@ -983,6 +1049,11 @@ class Channel:
 class Curve:
     """Calibration Curve class for the LS372."""
 
+    # Breakpoints per message when transferring curves, and the minimum
+    # time (s) to allow per breakpoint written.
+    _transfer_batch_size = 8
+    _transfer_point_interval = 0.065
+
     def __init__(self, ls, curve_num):
         self.ls = ls
         self.curve_num = curve_num
@@ -1212,18 +1283,18 @@ class Curve:
 
         return resp
 
+    def _transfer(self):
+        return CurveTransfer(self.ls, self.curve_num,
+                             batch_size=self._transfer_batch_size,
+                             point_interval=self._transfer_point_interval)
+
     # Public API Elements
     def get_curve(self, _file=None):
         """Get a calibration curve from the LS372.
 
         If _file is not None, save to file location.
         """
-        breakpoints = []
-        for i in range(1, 201):
-            x = self.get_data_point(i)
-            if x[0] == 0:
-                break
-            breakpoints.append(x)
+        breakpoints = self._transfer().read_points()
 
         struct_array = np.array(breakpoints, dtype=[('units', 'f8'),
                                                     ('temperature', 'f8')])
@@ -1270,49 +1341,24 @@ class Curve:
         for i in range(9, len(content)):
             values.append(content[i].strip().split())
 
+        header = header[:-1]  # ignore num of breakpoints
+        points = [(point[1], point[2]) for point in values if point]
+
+        transfer = self._transfer()
+        if transfer.is_loaded(header, points):
+            print(f"Curve {self.curve_num} is already loaded, skipping upload")
+            return
+
         self.delete_curve()  # remove old curve first, so old breakpoints don't remain
 
-        self._set_header(header[:-1])  # ignore num of breakpoints
+        self._set_header(header)
 
-        for point in values:
-            print("uploading %s" % point)
-            self._set_data_point(point[0], point[1], point[2])
-            time.sleep(0.065)
+        print(f"Uploading {len(points)} breakpoints to curve {self.curve_num}")
+        transfer.upload(points)
 
         # refresh curve attributes
         self.get_header()
-        self._check_curve(_file)
-
-    def _check_curve(self, _file):
-        """After setting a data point for calibration curve,
-        use CRVPT? command from get_data_point() to check
-        that all points of calibration curve  were uploaded.
-        If not, re-upload points.
-
-        :param _file: calibration curve file
-        :type _file: str
-        """
-
-        with open(_file) as f:
-            content = f.readlines()
-
-        # skipping header info
-        values = []
-        for i in range(9, len(content)):
-            values.append(content[i].strip().split())  # data points that should have been uploaded
-
-        for j in range(1, len(values) + 1):
-            try:
-                resp = self.get_data_point(j)  # response from the 372
-                point = values[j - 1]
-                units = float(resp[0])
-                temperature = float(resp[1])
-                assert units == float(point[1]), "Point number %s not uploaded. Reuploading points." % point[0]
-                assert temperature == float(point[2]), "Point number %s not uploaded. Reuploading points." % point[0]
-            # if AssertionError, tell 372 to re-upload points
-            except AssertionError:
-                if units != float(point[1]):
-                    self.set_curve(_file)
+        transfer.remember(header, points)
 
     def delete_curve(self):
         """Delete the curve using the CRVDEL command.
@@ -1321,6 +1367,7 @@ class Curve:
         :rtype: str
         """
         resp = self.ls.msg(f"CRVDEL {self.curve_num}")
+        self._transfer().forget()
         self.get_header()
         return resp
 
@@ -0,0 +1,219 @@
+"""Bulk upload and readback of Lakeshore calibration curves.
+
+The Lakeshore 240, 336, 370 and 372 all store calibration curves as up to 200
+breakpoints, set with ``CRVPT <curve>,<index>,<units>,<kelvin>`` and read with
+``CRVPT? <curve>,<index>``, where ``<curve>`` is the curve number (or the
+channel number on the 240). :class:`CurveTransfer` handles these transfers
+for any of the drivers, given their ``msg`` method.
+"""
+import hashlib
+import time
+import weakref
+
+import numpy as np
+
+#: Maximum number of breakpoints in a curve.
+MAX_BREAKPOINTS = 200
+
+# Curves known to be loaded on each device, as
+# {ls: {curve: (content hash, CRVHDR? response)}}
+_loaded_curves = weakref.WeakKeyDictionary()
+
+
+def curve_hash(header, points):
+    """Returns a hash identifying the contents of a curve.
+
+    Args:
+        header (list): Curve header parameters.
+        points (list): (units, kelvin) for each breakpoint.
+
+    """
+    content = repr(([str(h) for h in header],
+                    [(float(u), float(k)) for u, k in points]))
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class CurveTransfer:
+    """Uploads and reads back curve breakpoints.
+
+    Commands are sent in batches of ``batch_size``, joined with semicolons
+    into a single transmission (queries are answered with a single response,
+    also separated by semicolons). Writes are paced so that, on average, no
+    more than one breakpoint is sent per ``point_interval`` seconds; time
+    spent communicating counts towards the interval, rather than sleeping a
+    fixed time after each point.
+
+    Args:
+        ls: Lakeshore driver object, with a ``msg`` method.
+        curve (int): Curve number, or channel number for the 240.
+        batch_size (int): Number of commands per transmission.
+        point_interval (float): Minimum average time (s) per breakpoint
+            written, as required by the device.
+        rtol (float): Relative tolerance when comparing read back values.
+            The devices store breakpoints to 6 significant digits.
+
+    """
+
+    def __init__(self, ls, curve, batch_size=1, point_interval=0.,
+                 rtol=1e-5):
+        self.ls = ls
+        self.curve = curve
+        self.batch_size = max(1, batch_size)
+        self.point_interval = point_interval
+        self.rtol = rtol
+
+    def _batches(self, items, batch_size=None):
+        if batch_size is None:
+            batch_size = self.batch_size
+        for i in range(0, len(items), batch_size):
+            yield items[i:i + batch_size]
+
+    def _query(self, queries):
+        resp = self.ls.msg(';'.join(queries))
+        resps = resp.split(';')
+        if len(resps) != len(queries):
+            raise ValueError(f"Expected {len(queries)} responses, got '{resp}'")
+        return [r.strip() for r in resps]
+
+    def read_points(self, indices=None, stop_at_zero=True):
+        """Reads breakpoints from the device.
+
+        Args:
+            indices (list of int): Breakpoint indices (starting at 1) to
+                read. Defaults to all of them.
+            stop_at_zero (bool): Stop at the first breakpoint with zero
+                units, which marks the end of the curve.
+
+        Returns:
+            list: (units, kelvin) tuples of floats, for each index read.
+
+        """
+        if indices is None:
+            indices = list(range(1, MAX_BREAKPOINTS + 1))
+
+        points = []
+        for batch in self._batches(list(indices)):
+            resps = self._query([f'CRVPT? {self.curve},{i}' for i in batch])
+            for resp in resps:
+                units, kelvin = resp.split(',')[:2]
+                point = (float(units), float(kelvin))
+                if stop_at_zero and point[0] == 0:
+                    return points
+                points.append(point)
+        return points
+
+    def write_points(self, points, indices=None, batch_size=None):
+        """Writes breakpoints to the device.
+
+        Args:
+            points (list): (units, kelvin) for each breakpoint. Values are
+                sent as formatted by ``str``.
+            indices (list of int): Index of each breakpoint, defaulting to
+                1, 2, ...
+            batch_size (int): Overrides the batch size for these writes.
+
+        """
+        if indices is None:
+            indices = range(1, len(points) + 1)
+        cmds = [f'CRVPT {self.curve},{i},{units},{kelvin}'
+                for i, (units, kelvin) in zip(indices, points)]
+
+        next_time = time.time()
+        for batch in self._batches(cmds, batch_size):
+            delay = next_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.ls.msg(';'.join(batch))
+            next_time = time.time() + self.point_interval * len(batch)
+
+        # Don't let following commands start within the last interval.
+        delay = next_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def find_mismatches(self, points):
+        """Reads back breakpoints, and compares them with those expected.
+
+        Args:
+            points (list): Expected (units, kelvin) for breakpoints 1, 2, ...
+
+        Returns:
+            list of int: Indices of the breakpoints that don't match.
+
+        """
+        expected = np.array(points, dtype=float).reshape(-1, 2)
+        read = np.array(self.read_points(range(1, len(points) + 1),
+                                         stop_at_zero=False),
+                        dtype=float).reshape(-1, 2)
+        ok = np.isclose(read, expected, rtol=self.rtol, atol=0).all(axis=1)
+        return [int(i) + 1 for i in np.flatnonzero(~ok)]
+
+    def upload(self, points, verify=True, max_attempts=3):
+        """Writes breakpoints, then re-writes any that don't read back
+        correctly, one per transmission.
+
+        Args:
+            points (list): (units, kelvin) for breakpoints 1, 2, ...
+            verify (bool): Read back and check the breakpoints.
+            max_attempts (int): Number of times to re-write mismatched
+                breakpoints before giving up.
+
+        Raises:
+            RuntimeError: If breakpoints still don't match after
+                max_attempts.
+
+        """
+        if len(points) > MAX_BREAKPOINTS:
+            raise ValueError(f"Curve must have {MAX_BREAKPOINTS} breakpoints or less")
+
+        self.write_points(points)
+        if not verify:
+            return
+
+        mismatched = self.find_mismatches(points)
+        for _ in range(max_attempts):
+            if not mismatched:
+                return
+            print(f"Re-uploading breakpoints {mismatched}")
+            self.write_points([points[i - 1] for i in mismatched],
+                              indices=mismatched, batch_size=1)
+            check = self.read_points(mismatched, stop_at_zero=False)
+            mismatched = [
+                i for i, point in zip(mismatched, check)
+                if not np.allclose(point, np.array(points[i - 1], dtype=float),
+                                   rtol=self.rtol, atol=0)
+            ]
+
+        if mismatched:
+            raise RuntimeError(f"Breakpoints {mismatched} of curve {self.curve} "
+                               "failed to upload")
+
+    def _device_header(self):
+        return self.ls.msg(f'CRVHDR? {self.curve}').strip()
+
+    def is_loaded(self, header, points):
+        """Checks whether a curve is known to already be on the device.
+
+        The curve must have been loaded by :meth:`remember`, with the same
+        header parameters and breakpoints, and the curve header on the device
+        must be unchanged since.
+
+        Args:
+            header (list): Curve header parameters.
+            points (list): (units, kelvin) for each breakpoint.
+
+        """
+        loaded = _loaded_curves.get(self.ls, {}).get(self.curve)
+        if loaded is None or loaded[0] != curve_hash(header, points):
+            return False
+        return loaded[1] == self._device_header()
+
+    def remember(self, header, points):
+        """Records that a curve has been loaded on the device, so that
+        loading it again can be skipped."""
+        _loaded_curves.setdefault(self.ls, {})[self.curve] = (
+            curve_hash(header, points), self._device_header())
+
+    def forget(self):
+        """Forgets the curve loaded on the device, such as after deleting it."""
+        _loaded_curves.get(self.ls, {}).pop(self.curve, None)
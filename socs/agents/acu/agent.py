@@ -15,11 +15,12 @@ from ocs.ocs_twisted import Pacemaker, TimeoutLock
 from soaculib.retwisted_backend import RetwistedHttpBackend
 from soaculib.twisted_backend import TwistedHttpBackend
 from twisted.internet import protocol, reactor, threads
-from twisted.internet.defer import DeferredList, inlineCallbacks
+from twisted.internet.defer import DeferredList, FirstError, inlineCallbacks
 
 from socs.agents.acu import avoidance
 from socs.agents.acu import drivers as sh
 from socs.agents.acu import exercisor, hvac, hwp_iface, status_keys
+from socs.agents.acu.publisher import StatusPublisher
 
 #: The number of free ProgramTrack positions, when stack is empty.
 FULL_STACK = 10000
@@ -140,6 +141,23 @@ MONITOR_STRUCTURE = [
 #: Maximum update time (in s) for "monitor" process data, even with no changes
 MONITOR_MAX_TIME_DELTA = 2.
 
+#: Minimum time (in s) between queries of each status dataset, in the
+#: "monitor" process.  Datasets not listed here are queried on every
+#: poll.  Can be overridden with "monitor_dataset_periods" in the ACU
+#: config file.
+MONITOR_DATASET_PERIODS = {
+    'hvac': 1.,
+    'power_dist': 1.,
+}
+
+#: Nominal sample rate (Hz) of the UDP broadcast streams.
+UDP_SAMPLE_RATE = 200
+
+#: Capacity of the UDP sample queue, in seconds of data.  If the
+#: queue fills up (e.g. due to reactor starvation), the oldest samples
+#: are dropped.
+UDP_QUEUE_SECONDS = 30
+
 
 class ACUAgent:
     """Agent to acquire data from an ACU and control telescope pointing with the
@@ -327,6 +345,9 @@ class ACUAgent:
             'timestamp': time.time(),
             'active': False,
             'time_offset': 0,
+            'queue_depth': 0,
+            'queue_max_depth': 0,
+            'dropped_samples': 0,
         }
 
         # Task, Process, Feed registration.
@@ -534,9 +555,61 @@ class ACUAgent:
 
         return True, 'Process "idle_reset" exited cleanly.'
 
+    @inlineCallbacks
+    def _get_status(self, last_fetch, dataset_periods, concurrent):
+        """Query the status datasets that are due, for the monitor
+        process.  A dataset is due if at least dataset_periods[short]
+        seconds have passed since last_fetch[short]; last_fetch is
+        updated in place.  Returns a dict, keyed by collection name,
+        of the datasets that were fetched (and empty dicts for any
+        that are not defined on this platform).
+
+        If any query fails, the first exception is raised (in the
+        concurrent case, without waiting for the other queries) and
+        last_fetch is not updated, so all datasets are retried on the
+        next call.
+
+        """
+        now = time.time()
+        output = {}
+        to_fetch = []
+        for short, collection in [
+                ('status', 'StatusDetailed'),
+                ('third', 'Status3rdAxis'),
+                ('shutter', 'StatusShutter'),
+                ('pointing', 'CmdPointingCorrection'),
+                ('hvac', 'Hvac'),
+                ('power_dist', 'PowerDistribution'),
+        ]:
+            if not self.datasets[short]:
+                output[collection] = {}
+            elif now - last_fetch.get(short, 0) >= dataset_periods.get(short, 0):
+                to_fetch.append((short, collection))
+            # ... otherwise, previous values remain in session.data.
+
+        if concurrent:
+            try:
+                results = yield DeferredList(
+                    [self.acu_read.Values(self.datasets[short])
+                     for short, _ in to_fetch],
+                    fireOnOneErrback=True, consumeErrors=True)
+            except FirstError as e:
+                e.subFailure.raiseException()
+            results = [r for _, r in results]
+        else:
+            results = []
+            for short, _ in to_fetch:
+                results.append((yield self.acu_read.Values(self.datasets[short])))
+
+        for (short, collection), result in zip(to_fetch, results):
+            output[collection] = result
+            last_fetch[short] = now
+        return output
+
+    @ocs_agent.param('concurrent', type=bool, default=True)
     @inlineCallbacks
     def monitor(self, session, params):
-        """monitor()
+        """monitor(concurrent=True)
 
         **Process** - Refresh the cache of SATP ACU status information and
         report it on the 'acu_status' and 'acu_status_influx' HK feeds.
@@ -545,6 +618,14 @@ class ACUAgent:
         Azimuth position, Azimuth velocity, Elevation mode, Elevation position,
         Elevation velocity, Boresight mode, and Boresight position.
 
+        Slowly changing datasets (such as Hvac and PowerDistribution)
+        are queried at a reduced rate; see MONITOR_DATASET_PERIODS.
+
+        Args:
+          concurrent (bool): If True, the queries for the various
+            status datasets are issued simultaneously, rather than
+            one after the other.
+
         The session.data of this process is a nested dictionary.
         Here's an example::
 
@@ -650,69 +731,6 @@ class ACUAgent:
         self.log.info(version)
         session.data['connected'] = True
 
-        # Numbering as per ICD.
-        mode_key = {
-            'Stop': 0,
-            'Preset': 1,
-            'ProgramTrack': 2,
-            'Rate': 3,
-            'SectorScan': 4,
-            'SearchSpiral': 5,
-            'SurvivalMode': 6,
-            'StepTrack': 7,
-            'GeoSync': 8,
-            'OPT': 9,
-            'TLE': 10,
-            'Stow': 11,
-            'StarTrack': 12,
-            'SunTrack': 13,
-            'MoonTrack': 14,
-            'I11P': 15,
-            'AutoTrack/Preset': 16,
-            'AutoTrack/PositionMemory': 17,
-            'AutoTrack/PT': 18,
-            'AutoTrack/OPT': 19,
-            'AutoTrack/PT/Search': 20,
-            'AutoTrack/TLE': 21,
-            'AutoTrack/TLE/Search': 22,
-
-            # Currently we do not have ICD values for these, but they
-            # are included in the output of Meta.  ElSync, at least,
-            # is a known third axis mode for the LAT.
-            'ElSync': 100,
-            'UnStow': 101,
-            'MaintenanceStow': 102,
-        }
-
-        # fault_key digital values taken from ICD (correspond to byte-encoding)
-        fault_key = {
-            'No Fault': 0,
-            'Warning': 1,
-            'Fault': 2,
-            'Critical': 3,
-            'No Data': 4,
-            'Latched Fault': 5,
-            'Latched Critical Fault': 6,
-        }
-        pin_key = {
-            # Capitalization matches strings in ACU binary, not ICD.
-            # Are these needed for the SAT still?
-            'Any Moving': 0,
-            'All Inserted': 1,
-            'All Retracted': 2,
-            'Failure': 3,
-        }
-        lat_pin_key = {
-            # From "meta" output.
-            'Moving': 0,
-            'Inserted': 1,
-            'Retracted': 2,
-            'Error': 3,
-        }
-        tfn_key = {'None': float('nan'),
-                   'False': 0,
-                   'True': 1,
-                   }
         report_t = time.time()
         report_period = 20
         n_ok = 0
@@ -730,35 +748,26 @@ class ACUAgent:
         ]
         prev_checkdata = {k: None for g, k in checkdata}
 
-        @inlineCallbacks
-        def _get_status():
-            output = {}
-            for short, collection in [
-                    ('status', 'StatusDetailed'),
-                    ('third', 'Status3rdAxis'),
-                    ('shutter', 'StatusShutter'),
-                    ('pointing', 'CmdPointingCorrection'),
-                    ('hvac', 'Hvac'),
-                    ('power_dist', 'PowerDistribution'),
-            ]:
-                if self.datasets[short]:
-                    output[collection] = (
-                        yield self.acu_read.Values(self.datasets[short]))
-                else:
-                    output[collection] = {}
-            return output
+        dataset_periods = dict(MONITOR_DATASET_PERIODS)
+        dataset_periods.update(self.acu_config.get('monitor_dataset_periods', {}))
+        last_fetch = {}
 
         session.data['StatusResponseRate'] = n_ok / (query_t - report_t)
-        session.data.update((yield _get_status()))
+        session.data.update((yield self._get_status(
+            last_fetch, dataset_periods, params['concurrent'])))
         qual_pacer = Pacemaker(.1)
 
         self.hvm = hvac.HvacManager()
 
         last_resp_rate = None
-        data_blocks = {}
-        influx_blocks = {}
         unknown_fields = set()
 
+        commanded_axes = ['Azimuth', 'Elevation']
+        if self.acu_config['platform'] == 'satp':
+            commanded_axes.append('Boresight')
+        publisher = StatusPublisher(MONITOR_STRUCTURE, MONITOR_MAX_TIME_DELTA,
+                                    commanded_axes=commanded_axes)
+
         while session.status in ['running']:
 
             now = time.time()
@@ -791,12 +800,16 @@ class ACUAgent:
                     'data': {
                         'Broadcast_stream_ok': int(bq_ok),
                         'Broadcast_recv_offset': bq_offset,
+                        'Broadcast_queue_depth': bq['queue_depth'],
+                        'Broadcast_queue_max_depth': bq['queue_max_depth'],
+                        'Broadcast_dropped_samples': bq['dropped_samples'],
                     }
                 }
                 self.agent.publish_to_feed('data_qual', block)
 
             try:
-                session.data.update((yield _get_status()))
+                session.data.update((yield self._get_status(
+                    last_fetch, dataset_periods, params['concurrent'])))
                 session.data['connected'] = True
                 n_ok += 1
                 last_complaint = 0
@@ -875,116 +888,16 @@ class ACUAgent:
 
             prev_checkdata = new_checkdata
 
-            # influx_blocks are constructed based on refers to all
-            # other self.data['status'] keys. Do not add more keys to
-            # any self.data['status'] categories beyond this point
-            new_influx_blocks = {}
-            for category in self.data['status']:
-                new_influx_blocks[category] = {
-                    'timestamp': self.data['status']['summary']['ctime'],
-                    'block_name': category,
-                    'data': {}}
-
-                if category != 'commands':
-                    for statkey, statval in self.data['status'][category].items():
-                        if isinstance(statval, float):
-                            influx_val = statval
-                        elif isinstance(statval, str):
-                            for key_map in [tfn_key, mode_key, fault_key, pin_key,
-                                            lat_pin_key]:
-                                if statval in key_map:
-                                    influx_val = key_map[statval]
-                                    break
-                            else:
-                                raise ValueError('Could not convert value for %s="%s"' %
-                                                 (statkey, statval))
-                        elif isinstance(statval, int):
-                            if statkey in ['Year', 'Free_upload_positions']:
-                                influx_val = float(statval)
-                            else:
-                                influx_val = int(statval)
-                        new_influx_blocks[category]['data'][statkey + '_influx'] = influx_val
-                else:  # i.e. category == 'commands':
-                    if str(self.data['status']['commands']['Azimuth_commanded_position']) != 'nan':
-                        acucommand_az = {'timestamp': self.data['status']['summary']['ctime'],
-                                         'block_name': 'ACU_commanded_positions_az',
-                                         'data': {'Azimuth_commanded_position_influx': self.data['status']['commands']['Azimuth_commanded_position']}
-                                         }
-                        self.agent.publish_to_feed('acu_commands_influx', acucommand_az)
-                    if str(self.data['status']['commands']['Elevation_commanded_position']) != 'nan':
-                        acucommand_el = {'timestamp': self.data['status']['summary']['ctime'],
-                                         'block_name': 'ACU_commanded_positions_el',
-                                         'data': {'Elevation_commanded_position_influx': self.data['status']['commands']['Elevation_commanded_position']}
-                                         }
-                        self.agent.publish_to_feed('acu_commands_influx', acucommand_el)
-                    if self.acu_config['platform'] == 'satp':
-                        if str(self.data['status']['commands']['Boresight_commanded_position']) != 'nan':
-                            acucommand_bs = {'timestamp': self.data['status']['summary']['ctime'],
-                                             'block_name': 'ACU_commanded_positions_boresight',
-                                             'data': {'Boresight_commanded_position_influx': self.data['status']['commands']['Boresight_commanded_position']}
-                                             }
-                            self.agent.publish_to_feed('acu_commands_influx', acucommand_bs)
-
-            # Only keep blocks that have changed or have new data.
-            block_keys = list(new_influx_blocks.keys())
-            for k in block_keys:
-                if k not in influx_blocks:
-                    continue
-                B, N = influx_blocks[k], new_influx_blocks[k]
-                overdue = (N['timestamp'] - B['timestamp'] > MONITOR_MAX_TIME_DELTA)
-                changes = any([B['data'][_k] != _v for _k, _v in N['data'].items()])
-                if overdue or changes:
-                    continue
-                del new_influx_blocks[k]
-
-            for block in new_influx_blocks.values():
-                # Check that we have data (commands and corotator often don't)
-                if len(block['data']) > 0:
-                    self.agent.publish_to_feed('acu_status_influx', block)
-            influx_blocks.update(new_influx_blocks)
-
-            # Assemble data for aggregator ...
-            new_blocks = {}
-            for block_name, data_key, _, _ in MONITOR_STRUCTURE:
-                if block_name is None:
-                    continue
-                new_blocks[block_name] = {
-                    'timestamp': self.data['status']['summary']['ctime'],
-                    'block_name': block_name,
-                    'data': {} | self.data['status'][data_key],
-                }
-
-            # Only keep blocks that have changed or have new data.
-            for k, _, policy, delta in MONITOR_STRUCTURE:
-                if k is None:
-                    continue
-                B, N = data_blocks.get(k), new_blocks[k]
-                if len(N['data']) == 0:
-                    del new_blocks[k]
-                    continue
-                if B is None:
-                    continue
-                if policy == 'tick':  # always store.
-                    continue
-                underdue = delta is not None and \
-                    (N['timestamp'] - B['timestamp'] < delta)
-                overdue = (N['timestamp'] - B['timestamp'] > MONITOR_MAX_TIME_DELTA) \
-                    and not underdue
-                changes = any([B['data'][_k] != _v for _k, _v in N['data'].items()])
-                if (overdue and policy != 'changed') or changes and not underdue:
-                    continue
-                del new_blocks[k]
-
-            for block in new_blocks.values():
-                self.agent.publish_to_feed('acu_status', block)
-
-            data_blocks.update(new_blocks)
+            for feed, block in publisher.process(
+                    self.data['status'], self.data['status']['summary']['ctime']):
+                self.agent.publish_to_feed(feed, block)
 
         return True, 'Acquisition exited cleanly.'
 
     @ocs_agent.param('auto_enable', type=bool, default=True)
+    @ocs_agent.param('batched', type=bool, default=False)
     def broadcast(self, session, params):
-        """broadcast(auto_enable=True)
+        """broadcast(auto_enable=True, batched=False)
 
         **Process** - Read UDP data from the port specified by
         self.acu_config, decode it, and publish to HK feeds.  Full
@@ -996,6 +909,9 @@ class ACUAgent:
           auto_enable (bool): If True, the Process will try to
             configure and (re-)enable the UDP stream if at any point
             the stream seems to drop out.
+          batched (bool): If True, decode the UDP datagrams in bulk
+            and publish the full rate data as multi-sample blocks
+            (about 1 per second) rather than one block per sample.
 
         Notes:
           The session.data looks like this (this is for a SATP running
@@ -1029,11 +945,13 @@ class ACUAgent:
             session, 'main', control, self.data['broadcast'],
             'acu_udp_stream', 'acu_broadcast_influx',
             auto_enable=params['auto_enable'],
-            influx_suffix='_bcast_influx')
+            influx_suffix='_bcast_influx',
+            batched=params['batched'])
 
     @ocs_agent.param('auto_enable', type=bool, default=True)
+    @ocs_agent.param('batched', type=bool, default=False)
     def broadcast_ext(self, session, params):
-        """broadcast_ext(auto_enable=True)
+        """broadcast_ext(auto_enable=True, batched=False)
 
         **Process** - Read UDP data from the "ext" UDP stream, as
         defined in self.acu_config.  Like the broadcast process, this
@@ -1044,6 +962,8 @@ class ACUAgent:
           auto_enable (bool): If True, the Process will try to
             configure and (re-)enable the UDP stream if at any point
             the stream seems to drop out.
+          batched (bool): If True, decode and publish the data in
+            multi-sample blocks; see broadcast.
 
         Notes:
           The session.data is as you would find for the broadcast
@@ -1057,12 +977,14 @@ class ACUAgent:
             session, 'ext', control, data_store,
             'acu_ext_stream', 'acu_ext_influx',
             auto_enable=params['auto_enable'],
-            influx_suffix='_ext')
+            influx_suffix='_ext',
+            batched=params['batched'])
 
     @inlineCallbacks
     def _udp_stream_handler(self, session, stream_name, stream_control,
                             data_store, agg_feed, influx_feed,
-                            auto_enable=True, influx_suffix=''):
+                            auto_enable=True, influx_suffix='',
+                            batched=False):
         """Collect data from UDP (200 Hz) stream. This is a helper
         function that can be used to monitor either PositionBroadcast
         or PositionBroadcastExt.
@@ -1077,6 +999,8 @@ class ACUAgent:
           auto_enable (bool): whether to use http API to turn stream on/off
             if needed.
           influx_suffix (str): suffix to append to all influx fields.
+          batched (bool): if True, process the samples as arrays and
+            publish full rate data in multi-sample blocks.
 
         """
         session.data = {}
@@ -1093,26 +1017,28 @@ class ACUAgent:
         assert fields[:2] == ['Day', 'Time']
         fields = [f.replace(' ', '_') for f in fields[2:]]
 
-        # The udp_data list is used as a queue; it contains
-        # struct-unpacked samples from the UDP stream in the form
-        # (time_received, data).
-        udp_data = []
+        # The udp_data ring buffer is used as a queue; it contains
+        # samples from the UDP stream, decoded into a structured
+        # array, and the time at which each was received.
+        udp_dtype = sh.struct_format_to_dtype(FMT, ['Day', 'Time'] + fields)
+        udp_data = sh.RingBuffer(UDP_QUEUE_SECONDS * UDP_SAMPLE_RATE,
+                                 udp_dtype)
 
         class MonitorUDP(protocol.DatagramProtocol):
             def datagramReceived(self, data, src_addr):
                 now = time.time()
                 host, port = src_addr
-                offset = 0
-                while len(data) - offset >= FMT_LEN:
-                    d = struct.unpack(FMT, data[offset:offset + FMT_LEN])
-                    udp_data.append((now, d))
-                    offset += FMT_LEN
+                n = len(data) // FMT_LEN
+                if n > 0:
+                    udp_data.push(
+                        np.frombuffer(data, dtype=udp_dtype, count=n), now)
 
         handler = reactor.listenUDP(int(UDP_PORT), MonitorUDP())
 
         influx_data = {k: [] for k in ['Time'] + fields}
 
         best_dt = None
+        n_overflows = 0
 
         active = True
         last_packet_time = time.time()
@@ -1127,28 +1053,43 @@ class ACUAgent:
                 last_packet_time = now
                 best_dt = None
 
-                process_data = udp_data[:200]
-                udp_data = udp_data[200:]
-                for recv_time, d in process_data:
-                    time_d, fields_d = d[:2], d[2:]
-                    data_ctime = sh.timecode(time_d[0] + time_d[1] / sh.DAY)
-                    if best_dt is None or abs(recv_time - data_ctime) < best_dt:
-                        best_dt = recv_time - data_ctime
-
-                    data_store['Time'] = data_ctime
-                    influx_data['Time'].append(data_ctime)
-                    for _f, _d in zip(fields, fields_d):
-                        data_store[_f] = _d
-                        influx_data[_f].append(_d)
-                    acu_udp_stream = {'timestamp': data_store['Time'],
+                recv_times, samples = udp_data.pop(200)
+                if batched:
+                    data_ctimes = sh.timecode(samples['Day'] + samples['Time'] / sh.DAY)
+                    dts = recv_times - data_ctimes
+                    best_dt = float(dts[np.argmin(abs(dts))])
+
+                    columns = {'Time': data_ctimes}
+                    for _f in fields:
+                        columns[_f] = samples[_f]
+                    data_store.update({k: v[-1].item() for k, v in columns.items()})
+                    acu_udp_stream = {'timestamps': data_ctimes.tolist(),
                                       'block_name': 'ACU_broadcast',
-                                      'data': data_store
+                                      'data': {k: v.tolist() for k, v in columns.items()}
                                       }
                     self.agent.publish_to_feed(agg_feed, acu_udp_stream)
-                influx_means = {}
-                for key, vals in influx_data.items():
-                    influx_means[key] = np.mean(vals)
-                    influx_data[key] = []
+                    influx_means = {k: np.mean(v) for k, v in columns.items()}
+                else:
+                    for recv_time, d in zip(recv_times.tolist(), samples.tolist()):
+                        time_d, fields_d = d[:2], d[2:]
+                        data_ctime = sh.timecode(time_d[0] + time_d[1] / sh.DAY)
+                        if best_dt is None or abs(recv_time - data_ctime) < best_dt:
+                            best_dt = recv_time - data_ctime
+
+                        data_store['Time'] = data_ctime
+                        influx_data['Time'].append(data_ctime)
+                        for _f, _d in zip(fields, fields_d):
+                            data_store[_f] = _d
+                            influx_data[_f].append(_d)
+                        acu_udp_stream = {'timestamp': data_store['Time'],
+                                          'block_name': 'ACU_broadcast',
+                                          'data': data_store
+                                          }
+                        self.agent.publish_to_feed(agg_feed, acu_udp_stream)
+                    influx_means = {}
+                    for key, vals in influx_data.items():
+                        influx_means[key] = np.mean(vals)
+                        influx_data[key] = []
                 acu_broadcast_influx = {
                     'timestamp': influx_means['Time'],
                     'block_name': 'ACU_bcast_influx',
@@ -1171,11 +1112,20 @@ class ACUAgent:
                                       '[{stream_name}]: {err}', stream_name=stream_name, err=err)
                     next_reconfig += 60
 
+            queue_stats = udp_data.get_stats()
             self._broadcast_qual = {
                 'timestamp': now,
                 'active': active,
                 'time_offset': best_dt,
+                'queue_depth': queue_stats['depth'],
+                'queue_max_depth': queue_stats['max_depth'],
+                'dropped_samples': queue_stats['dropped'],
             }
+            if queue_stats['overflows'] > n_overflows:
+                self.log.warn('UDP queue overflow [{stream_name}]; {dropped} '
+                              'samples dropped in total.', stream_name=stream_name,
+                              dropped=queue_stats['dropped'])
+                n_overflows = queue_stats['overflows']
             yield dsleep(.01)
 
         handler.stopListening()
@@ -2043,7 +1993,13 @@ class ACUAgent:
         Notes:
             See :func:`drivers.from_file
             <socs.agents.acu.drivers.from_file>` for discussion of the
-            file structure.
+            file structure.  The track is read from the file in
+            blocks, as it is uploaded; but it is first read through
+            once, to check it, so the start-up time grows with the
+            length of the track.  The track velocities are
+            checked against the ``vel`` motion limits, if configured;
+            for free_form tracks, the point-to-point acceleration is
+            also checked against the ``accel`` motion limits.
 
         """
         ff_scan = sh.from_file(params['filename'])
@@ -2054,27 +2010,23 @@ class ACUAgent:
         if ff_scan.el_range[0] <= self.motion_limits['elevation']['lower'] \
            or ff_scan.el_range[1] >= self.motion_limits['elevation']['upper']:
             return False, 'Elevation location out of range!'
+        for axis, ax in [('azimuth', 'az'), ('elevation', 'el')]:
+            vel_limit = self.motion_limits[axis].get('vel')
+            if vel_limit and ff_scan.max_vel[ax] > vel_limit:
+                return False, f'{axis.capitalize()} velocity exceeds limit!'
+            # With the profiler off, the ACU follows the track as given.
+            accel_limit = self.motion_limits[axis].get('accel')
+            if ff_scan.free_form and accel_limit \
+               and ff_scan.max_accel[ax] > accel_limit:
+                return False, f'{axis.capitalize()} acceleration exceeds limit!'
 
         # Modify times?
         t_shift = 0
         if not params['absolute_times']:
             t_shift = time.time() + 5.
 
-        # Turn those lines into a generator.
-        def line_batcher(ff_scan, t_shift=0., n=10):
-            lines = [sh.track_point_time_shift(p, t_shift)
-                     for p in ff_scan.points]
-            while True:
-                while len(lines):
-                    some, lines = lines[:n], lines[n:]
-                    yield some
-                if ff_scan.loop_time <= 0:
-                    break
-                t_shift += ff_scan.loop_time
-                lines = [sh.track_point_time_shift(p, t_shift)
-                         for p in ff_scan.points[ff_scan.preamble_count:]]
-
-        point_gen = line_batcher(ff_scan, t_shift)
+        # Points are read from the file, in blocks, as needed.
+        point_gen = ff_scan.iter_blocks(t_shift)
 
         if params['azonly']:
             track_axes = ['az']
@@ -2383,6 +2335,7 @@ class ACUAgent:
                                                    el_endpoint2=el_endpoint2,
                                                    el_speed=el_speed,
                                                    az_first_pos=plan['init_az'],
+                                                   as_arrays=True,
                                                    **scan_params)
         elif params['scan_type'] == 2:
             free_form = True
@@ -2394,6 +2347,7 @@ class ACUAgent:
                                        el_endpoint1=el_endpoint1,
                                        az_vel_ref=az_vel_ref,
                                        az_first_pos=plan['init_az'],
+                                       as_arrays=True,
                                        **scan_params)
         elif params['scan_type'] == 3:
             free_form = True
@@ -2407,6 +2361,7 @@ class ACUAgent:
                                        el_freq=el_freq,
                                        az_vel_ref=az_vel_ref,
                                        az_first_pos=plan['init_az'],
+                                       as_arrays=True,
                                        **scan_params)
         else:
             raise ValueError("Scan type must be 1, 2, or 3")
@@ -2621,20 +2576,14 @@ class ACUAgent:
                 if ((last_uploaded_timestamp - time.time()) <= MIN_STACK_ADVANCE_TIME) \
                    or (free_positions > MAX_ALLOWABLE_FREE_POSITIONS):
 
-                    upload_lines = []
                     # Grab points from point_prov until our last point is at least
                     # 2 * MIN_STACK_ADVANCE_TIME seconds from now.
                     # If that isn't enough points to have MIN_STACK_POP_TIME amount of points uploaded,
-                    # Keep grabbing points until we have enough.
-                    while not point_prov.is_empty() and (len(upload_lines) == 0
-                                                         or upload_lines[-1].timestamp - time.time() < (2 * MIN_STACK_ADVANCE_TIME)
-                                                         or (free_positions - len(upload_lines) > MAX_ALLOWABLE_FREE_POSITIONS)):
-
-                        upload_lines.append(point_prov.pop())
-
-                    # If the last line has a "group" flag, keep transferring lines.
-                    while not point_prov.is_empty() and len(upload_lines) and upload_lines[-1].group_flag != 0:
-                        upload_lines.append(point_prov.pop())
+                    # Keep grabbing points until we have enough.  If the last line has a
+                    # "group" flag, keep transferring lines.
+                    upload_lines = point_prov.pop_block(
+                        min_count=free_positions - MAX_ALLOWABLE_FREE_POSITIONS,
+                        until=time.time() + 2 * MIN_STACK_ADVANCE_TIME)
 
                     if point_prov.is_empty() and mode == 'go':
                         mode = 'stop'
@@ -2659,10 +2608,10 @@ class ACUAgent:
                             raise RuntimeError('Upload fail.')
                         if first_upload_time is None:
                             first_upload_time = time.time()
-                        last_upload_az = upload_lines[-1].az
+                        last_upload_az = upload_lines.az[-1]
 
                         # Track the timestamp of the current upload.
-                        last_uploaded_timestamp = upload_lines[-1].timestamp
+                        last_uploaded_timestamp = upload_lines.timestamp[-1]
 
                 if point_prov.is_empty() and free_positions >= FULL_STACK - 1:
                     if mode == 'stop':
@@ -2866,11 +2815,15 @@ class ACUAgent:
         false position.)
 
         """
-        def _get_sun_map():
-            # To run in thread ...
+        def _get_sun_map(reference):
+            # To run in thread ... if reference (the current tracker)
+            # is compatible, the new map is obtained by rotating its
+            # map rather than recomputing from scratch.
             start = time.time()
             new_sun = avoidance.SunTracker(policy=self.sun_params['policy'],
+                                           compute=False,
                                            **self.sun_params['safety_map_kw'])
+            new_sun.reset(reference=reference)
             return new_sun, time.time() - start
 
         def _notify_recomputed(result):
@@ -2943,7 +2896,7 @@ class ACUAgent:
             if do_recompute:
                 req_out = True
                 self.sun_params['recompute_req'] = False
-                threads.deferToThread(_get_sun_map).addCallback(
+                threads.deferToThread(_get_sun_map, self.sun).addCallback(
                     _notify_recomputed)
 
             new_data.update({
@@ -124,6 +124,25 @@ DEFAULT_POLICY = {
 }
 
 
+@functools.lru_cache(maxsize=4)
+def _map_geometry(res):
+    """Get the geometry of the Sun Safety Map, for resolution res (in
+    radians).  Returns (shape, wcs, dec, ra, map_q), where dec and ra
+    are the coordinate maps and map_q holds the quaternion rotation
+    for each pixel.  These depend only on res and are cached; callers
+    must not modify the returned arrays.
+
+    """
+    # Map extends from dec -80 to +80.
+    shape, wcs = enmap.band_geometry(
+        dec_cut=80 * DEG, res=res, proj='car')
+    dec, ra = enmap.posmap(shape, wcs)
+    map_q = quat.rotation_lonlat(ra.ravel(), dec.ravel())
+    dec.flags.writeable = False
+    ra.flags.writeable = False
+    return shape, wcs, dec, ra, map_q
+
+
 class SunTracker:
     """Provide guidance on what horizion coordinate positions and
     trajectories are sun-safe.
@@ -208,22 +227,43 @@ class SunTracker:
         inverted[abs(phi) > .001 * coords.DEG] = True
         return -lon / coords.DEG, lat / coords.DEG, inverted
 
-    def reset(self, base_time=None):
+    def reset(self, base_time=None, reference=None):
         """Compute and store the Sun Safety Map for a specific
         timestamp.
 
         This basic computation is required prior to calling other
         functions that use the Sun Safety Map.
 
+        Args:
+          base_time (unix timestamp): Reference time for the map;
+            defaults to now.
+          reference (SunTracker): If provided, and that tracker's map
+            was computed with the same resolution and policy, for a
+            Sun declination within half a pixel of the present one,
+            then the map is obtained by rotating the reference map in
+            RA rather than by full recomputation.  (Passing
+            reference=self is permitted.)
+
         """
         # Set a reference time -- the map of sun times is usable from
         # this reference time to at least 12 hours in the future.
         if base_time is None:
             base_time = self._now()
 
-        # Map extends from dec -80 to +80.
-        shape, wcs = enmap.band_geometry(
-            dec_cut=80 * DEG, res=self.res, proj='car')
+        # Look up the sun position at our shifted time; but also shift
+        # explicitly in RA for earth rotation.
+        v = self._sun(base_time + self.sun_time_shift)
+        sun_dec = v.dec
+        sun_ra = v.ra - self.sun_time_shift * (2 * np.pi / SIDEREAL_DAY)
+        del v
+
+        if reference is not None and self._rotate_map(reference, sun_ra, sun_dec):
+            self.base_time = base_time
+            return
+
+        # Map extends from dec -80 to +80.  The geometry and
+        # per-pixel quaternions are cached.
+        shape, wcs, dec, ra, map_q = _map_geometry(self.res)
 
         # Map where each pixel is distance to the Sun.
         sun_dist = enmap.zeros(shape, wcs=wcs) - 1
@@ -234,17 +274,6 @@ class SunTracker:
         # Map of time-to-sun-danger, when sun is below horizon.
         sun_times_dn = sun_dist.copy()
 
-        # Quaternion rotation for each point in the map.
-        dec, ra = sun_dist.posmap()
-        map_q = quat.rotation_lonlat(ra.ravel(), dec.ravel())
-
-        # Look up the sun position at our shifted time; but also shift
-        # explicitly in RA for earth rotation.
-        v = self._sun(base_time + self.sun_time_shift)
-        sun_dec = v.dec
-        sun_ra = v.ra - self.sun_time_shift * (2 * np.pi / SIDEREAL_DAY)
-        del v
-
         # Compute the map of angular distance to the Sun, at
         # base_time.
         qsun = quat.rotation_lonlat(sun_ra, sun_dec)
@@ -259,23 +288,21 @@ class SunTracker:
 
         # For sun_times_up (sun above horizon), the region around the
         # sun is bad right now.
-        sun_times_up[sun_dist <= self.policy['exclusion_radius']] = 0.
-
-        # Loop over rows of the sun_times_* maps.
-        for g_up, g_dn in zip(sun_times_up, sun_times_dn):
-            if (g_up < 0).all():
-                # Sun mask does not touch this declination.
-                continue
-            # Identify pixel on the right of the masked region.
-            flips = ((g_up == 0)
-                     * np.hstack((g_up[:-1] != g_up[1:],
-                                  g_up[-1] != g_up[0]))).nonzero()[0]
-            dt0 = dt[flips[0]]
-            _dt = (dt - dt0) % DAY
-            # For sun_times_up, fill only pixels outside sun mask.
-            g_up[g_up < 0] = _dt[g_up < 0]
-            # For sun_times_dn, fill all pixels.
-            g_dn[:] = _dt[:]
+        masked = sun_dist <= self.policy['exclusion_radius']
+        sun_times_up[masked] = 0.
+
+        # In each row that touches the Sun mask, identify the first
+        # masked pixel on the right edge of the masked region.
+        edges = masked * ~np.roll(masked, -1, axis=1)
+        rows = edges.any(axis=1).nonzero()[0]
+        dt0 = dt[np.argmax(edges[rows], axis=1)]
+        _dt = (dt[None, :] - dt0[:, None]) % DAY
+
+        # For sun_times_up, fill only pixels outside sun mask.
+        g_up = sun_times_up[rows]
+        sun_times_up[rows] = np.where(g_up < 0, _dt, g_up)
+        # For sun_times_dn, fill all pixels.
+        sun_times_dn[rows] = _dt
 
         # Fill in remaining -1 with NO_TIME.
         sun_times_up[sun_times_up < 0] = NO_TIME
@@ -287,6 +314,41 @@ class SunTracker:
         self.sun_times_dn = sun_times_dn
         self.sun_dist = sun_dist
         self.map_q = map_q
+        self._map_info = {
+            'res': self.res,
+            'exclusion_radius': self.policy['exclusion_radius'],
+            'sun_radec': (sun_ra, sun_dec),
+        }
+
+    def _rotate_map(self, reference, sun_ra, sun_dec):
+        """Try to set up this tracker's Sun Safety Map by rotating the
+        map of reference in RA, so that it is appropriate for the Sun
+        at (sun_ra, sun_dec).  Returns True on success, or False if
+        the reference map is not suitable.
+
+        """
+        info = getattr(reference, '_map_info', None)
+        if info is None or info['res'] != self.res or \
+           info['exclusion_radius'] != self.policy['exclusion_radius']:
+            return False
+        ref_ra, ref_dec = info['sun_radec']
+        if abs(sun_dec - ref_dec) > self.res / 2:
+            return False
+
+        # Confirm that the map is periodic in RA.
+        ra = _map_geometry(self.res)[3][0]
+        step = ra[1] - ra[0]
+        if abs(abs(step * len(ra)) - 2 * np.pi) > abs(step) * 1e-3:
+            return False
+        d_ra = (sun_ra - ref_ra + np.pi) % (2 * np.pi) - np.pi
+        n = int(np.round(d_ra / step))
+
+        self.sun_times_up = np.roll(reference.sun_times_up, n, axis=-1)
+        self.sun_times_dn = np.roll(reference.sun_times_dn, n, axis=-1)
+        self.sun_dist = np.roll(reference.sun_dist, n, axis=-1)
+        self.map_q = reference.map_q
+        self._map_info = dict(info, sun_radec=(ref_ra + n * step, ref_dec))
+        return True
 
     def _azel_pix(self, az, el, dt=0, round=True, segments=False):
         """Return the pixel indices of the Sun Safety Map that are
@@ -350,41 +412,96 @@ class SunTracker:
         - ``'sun_dist_start'``: Distance to Sun, at first point.
         - ``'sun_dist_stop'``: Distance to Sun, at last point.
 
+        """
+        if raw:
+            if t is None:
+                t = self._now()
+            t = np.full(np.shape(az), t)
+            return self._check_points(np.asarray(az), np.asarray(el), t, t)
+        info = self.check_trajectories([(az, el)], t=t)
+        return {k: v[0] for k, v in info.items()}
+
+    def check_trajectories(self, trajs, t=None):
+        """Evaluate the Sun safety of many trajectories at once.  This
+        is equivalent to calling check_trajectory on each one, but the
+        coordinate transformation and map look-ups are done in a
+        single vectorized pass.
+
+        Args:
+          trajs (list): Each entry is a tuple (az, el) or (az, el,
+            t_traj), where az and el are vectors (in deg; the lengths
+            may differ from one trajectory to the next) and t_traj is
+            a time at which to evaluate that trajectory (either a
+            single time, or one time per point).
+          t (float): Default evaluation time, for trajectories that
+            do not specify one.  Defaults to now.
+
+        Returns:
+          A dict with the same keys as returned by check_trajectory;
+          but each value is an array, with one entry per trajectory.
+
         """
         if t is None:
             t = self._now()
-        az, el = np.asarray(az), np.asarray(el)
+        azs, els, times, ref_times = [], [], [], []
+        for traj in trajs:
+            az, el = np.atleast_1d(traj[0]), np.atleast_1d(traj[1])
+            if len(az) == 0 or len(az) != len(el):
+                raise ValueError('Each trajectory must have equal, non-zero '
+                                 'numbers of az and el points.')
+            _t = traj[2] if len(traj) > 2 else t
+            azs.append(az)
+            els.append(el)
+            times.append(np.broadcast_to(_t, az.shape))
+            ref_times.append(np.ravel(_t)[0])
+        lens = np.array([len(az) for az in azs])
+        starts = np.hstack((0, np.cumsum(lens)[:-1]))
+        stops = starts + lens - 1
+
+        sun_delta, sun_dists = self._check_points(
+            np.hstack(azs), np.hstack(els), np.hstack(times),
+            np.repeat(ref_times, lens))
+        return {
+            'sun_time': np.minimum.reduceat(sun_delta, starts),
+            'sun_time_start': sun_delta[starts],
+            'sun_time_stop': sun_delta[stops],
+            'sun_dist_start': sun_dists[starts],
+            'sun_dist_stop': sun_dists[stops],
+            'sun_dist_min': np.minimum.reduceat(sun_dists, starts),
+            'sun_dist_mean': np.add.reduceat(sun_dists, starts) / lens,
+        }
+
+    def _check_points(self, az, el, t, ref_t):
+        """Get the Sun Safety Time and Sun Distance for each point
+        (az[i], el[i]) at time t[i].  The Sun below horizon
+        corrections are evaluated at time ref_t[i], which should take
+        few distinct values (e.g. one per trajectory).
+
+        """
         j, i = self._azel_pix(az, el, dt=t - self.base_time)
         sun_delta = self.sun_times_up[j, i]
         sun_dists = self.sun_dist[j, i]
 
         # If the sun is below the horizon, sun times are modified.
-        az_sun, el_sun = self.get_sun_pos(t=t)['sun_azel']
-        if el_sun < self.policy['el_horizon']:
+        ref_t = np.asarray(ref_t)
+        for _t in np.unique(ref_t):
+            az_sun, el_sun = self.get_sun_pos(t=_t)['sun_azel']
+            if el_sun >= self.policy['el_horizon']:
+                continue
+            s = (ref_t == _t)
             if (az_sun % 360.) > 180:
                 # The setting problem:
-                sun_delta = self.sun_times_dn[j, i]
+                sun_delta[s] = self.sun_times_dn[j[s], i[s]]
             else:
                 # The rising problem:
-                dt_rise = self._next_rise_time(t) - t
-                sun_delta[sun_delta < dt_rise] = dt_rise
+                dt_rise = self._next_rise_time(_t) - _t
+                sun_delta[s] = np.maximum(sun_delta[s], dt_rise)
 
         # Positions below the modified horizon are always safe.
         safe_el = self.policy['el_horizon'] - self.policy['exclusion_radius']
         _, el_can, _ = self._horizon_branch(az, el)
         sun_delta[el_can < safe_el] = NO_TIME
-
-        if raw:
-            return sun_delta, sun_dists
-        return {
-            'sun_time': sun_delta.min(),
-            'sun_time_start': sun_delta[0],
-            'sun_time_stop': sun_delta[-1],
-            'sun_dist_start': sun_dists[0],
-            'sun_dist_stop': sun_dists[-1],
-            'sun_dist_min': sun_dists.min(),
-            'sun_dist_mean': sun_dists.mean(),
-        }
+        return sun_delta, sun_dists
 
     def get_sun_pos(self, az=None, el=None, t=None):
         """Get info on the Sun's location at time t.  If (az, el) are also
@@ -487,11 +604,53 @@ class SunTracker:
         if t is None:
             t = self._now()
 
+        all_moves = self._plan_paths(az0, el0, az1, el1, t, dodging=dodging)
+        self._analyze_moves([all_moves], t)
+
         if plot_file:
             assert (t == self.base_time)  # Can only plot "now" results.
             fig, axes, imgs = self.show_map(show=False)
             last_el = None
+            for detail in all_moves:
+                iel = detail['travel_el']
+                if detail['direct'] or \
+                   (last_el is not None and abs(last_el - iel) <= 5):
+                    continue
+                c = 'black'
+                for j, i in self._azel_pix(*detail['moves'].get_traj(), round=True, segments=True):
+                    for ax in axes:
+                        a, = ax.plot(i, j, color=c, lw=1)
+                last_el = iel
 
+            # Add the direct traj, in blue.
+            direct = [m for m in all_moves if m['direct']]
+            if len(direct) == 0:
+                direct = [{'moves': MoveSequence(az0, el0, az1, el1, simplify=True)}]
+            segments = self._azel_pix(*direct[0]['moves'].get_traj(), round=True, segments=True)
+            for ax in axes:
+                for j, i in segments:
+                    ax.plot(i, j, color='blue')
+                for seg, rng, mrk in [(segments[0], slice(0, 1), 'o'),
+                                      (segments[-1], slice(-1, None), 'x')]:
+                    ax.scatter(seg[1][rng], seg[0][rng], marker=mrk, color='blue')
+            # Add the selected trajectory in green.
+            selected = self.select_move(all_moves)[0]
+            if selected is not None:
+                traj = selected['moves'].get_traj()
+                segments = self._azel_pix(*traj, round=True, segments=True)
+                for ax in axes:
+                    for j, i in segments:
+                        ax.plot(i, j, color='green')
+
+            pl.savefig(plot_file)
+        return all_moves
+
+    def _plan_paths(self, az0, el0, az1, el1, t, dodging=True):
+        """Design a number of different paths between (az0, el0) and
+        (az1, el1), for analysis by _analyze_moves.  Returns a list of
+        dicts, one per path.
+
+        """
         # Test all trajectories with intermediate el.
         all_moves = []
 
@@ -531,51 +690,41 @@ class SunTracker:
                 'travel_el': iel,
                 'travel_el_confined': (iel >= min(el0, el1)) and (iel <= max(el0, el1)),
             })
-            moves = MoveSequence(az0, el0, az0, iel, az1, iel, az1, el1, simplify=True)
-
-            detail['moves'] = moves
-            traj_info = self.check_trajectory(*moves.get_traj(), t=t)
-            detail.update(traj_info)
+            detail['moves'] = MoveSequence(az0, el0, az0, iel, az1, iel, az1, el1,
+                                           simplify=True)
             all_moves.append(detail)
-            if plot_file and (last_el is None or abs(last_el - iel) > 5):
-                c = 'black'
-                for j, i in self._azel_pix(*moves.get_traj(), round=True, segments=True):
-                    for ax in axes:
-                        a, = ax.plot(i, j, color=c, lw=1)
-                last_el = iel
 
-        # Include the direct path, but put in "worst case" details
-        # based on all "confined" paths computed above.
-        direct = dict(base)
-        direct['moves'] = MoveSequence(az0, el0, az1, el1, simplify=True)
-        traj_info = self.check_trajectory(*direct['moves'].get_traj(), t=t)
-        direct.update(traj_info)
-        conf = [m for m in all_moves if m['travel_el_confined']]
-        if len(conf):
-            for k in ['sun_time', 'sun_dist_min', 'sun_dist_mean']:
-                direct[k] = min([m[k] for m in conf])
+        # Include the direct path (if there are any "confined" paths
+        # from which to assess it; see _analyze_moves).
+        if any([m['travel_el_confined'] for m in all_moves]):
+            direct = dict(base)
+            direct['moves'] = MoveSequence(az0, el0, az1, el1, simplify=True)
             all_moves.append(direct)
+        return all_moves
 
-        if plot_file:
-            # Add the direct traj, in blue.
-            segments = self._azel_pix(*direct['moves'].get_traj(), round=True, segments=True)
-            for ax in axes:
-                for j, i in segments:
-                    ax.plot(i, j, color='blue')
-                for seg, rng, mrk in [(segments[0], slice(0, 1), 'o'),
-                                      (segments[-1], slice(-1, None), 'x')]:
-                    ax.scatter(seg[1][rng], seg[0][rng], marker=mrk, color='blue')
-            # Add the selected trajectory in green.
-            selected = self.select_move(all_moves)[0]
-            if selected is not None:
-                traj = selected['moves'].get_traj()
-                segments = self._azel_pix(*traj, round=True, segments=True)
-                for ax in axes:
-                    for j, i in segments:
-                        ax.plot(i, j, color='green')
+    def _analyze_moves(self, move_lists, t):
+        """Compute Sun-safety info for all the paths in move_lists
+        (which is a list of outputs from _plan_paths), in a single
+        call to check_trajectories.  The path dicts are updated in
+        place.
 
-            pl.savefig(plot_file)
-        return all_moves
+        """
+        flat = [m for moves in move_lists for m in moves]
+        if len(flat) == 0:
+            return
+        info = self.check_trajectories(
+            [m['moves'].get_traj() for m in flat], t=t)
+        for idx, m in enumerate(flat):
+            m.update({k: v[idx] for k, v in info.items()})
+
+        # The direct path gets "worst case" details based on all
+        # "confined" paths.
+        for moves in move_lists:
+            conf = [m for m in moves if m['travel_el_confined'] and not m['direct']]
+            for m in moves:
+                if m['direct']:
+                    for k in ['sun_time', 'sun_dist_min', 'sun_dist_mean']:
+                        m[k] = min([_m[k] for _m in conf])
 
     def find_escape_paths(self, az0, el0, t=None,
                           debug=False):
@@ -608,8 +757,9 @@ class SunTracker:
 
         path = None
         for el1 in els:
-            paths = [self.analyze_paths(az0, el0, _az, el1, t=t, dodging=False)
+            paths = [self._plan_paths(az0, el0, _az, el1, t, dodging=False)
                      for _az in az_cands]
+            self._analyze_moves(paths, t)
             best_paths = [self.select_move(p)[0] for p in paths]
             best_paths = [p for p in best_paths if p is not None]
             if len(best_paths):
@@ -1,7 +1,10 @@
 import calendar
 import datetime
+import itertools
 import math
 import pickle
+import re
+import struct
 import time
 from dataclasses import dataclass, replace
 
@@ -32,13 +35,99 @@ def _progtrack_format_time(timestamp):
 
 
 class FromFileScan:
+    """Track loaded by :func:`from_file`.  The points themselves are
+    not held in memory; they are read from the source, in chunks,
+    when iter_blocks is called (or when the points attribute is
+    accessed).
+
+    The ranges and velocity and acceleration maxima are computed by
+    reading through the whole track once, on load, so that a track
+    can be rejected before any of it is executed.  Memory use is
+    constant, but the load time grows with the length of the track.
+
+    """
     loop_time: float
     free_form: bool
-    points: list
     preamble_count: int
     step_time: float
     az_range: tuple
     el_range: tuple
+    #: Maximum absolute velocity, per axis ('az', 'el').
+    max_vel: dict
+    #: Maximum absolute acceleration (from velocity differences
+    #: between points), per axis ('az', 'el').
+    max_accel: dict
+
+    def __init__(self, read_chunks):
+        # read_chunks(start) must return an iterator over
+        # TRACK_POINT_DTYPE arrays, starting from point index start.
+        self._read_chunks = read_chunks
+        self.loop_time = 0.
+        self.free_form = False
+        self.preamble_count = 0
+
+    @property
+    def points(self):
+        """All the points, in a single TrackPointBuffer."""
+        return TrackPointBuffer.concatenate(self._read_chunks(0))
+
+    def _summarize(self):
+        # Pass through the data to get the ranges, step_time, and
+        # velocity and acceleration maxima.
+        stats = {}
+        last = None
+        for chunk in self._read_chunks(0):
+            if last is not None:
+                chunk = np.concatenate([last, chunk])
+            dt = np.diff(chunk['timestamp'])
+            vals = {
+                'step_time': (min, dt.min(initial=np.inf)),
+                'az_min': (min, chunk['az'].min()),
+                'az_max': (max, chunk['az'].max()),
+                'el_min': (min, chunk['el'].min()),
+                'el_max': (max, chunk['el'].max()),
+            }
+            for ax in ['az', 'el']:
+                v = chunk[f'{ax}_vel']
+                vals[f'{ax}_vel'] = (max, abs(v).max())
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    acc = abs(np.diff(v) / dt)
+                vals[f'{ax}_accel'] = (max, np.nan_to_num(acc).max(initial=0.))
+            for k, (func, v) in vals.items():
+                stats[k] = func(stats[k], v) if k in stats else v
+            last = chunk[-1:]
+        if last is None:
+            raise ValueError('No points found in track.')
+        self.step_time = stats['step_time']
+        self.az_range = (stats['az_min'], stats['az_max'])
+        self.el_range = (stats['el_min'], stats['el_max'])
+        self.max_vel = {ax: stats[f'{ax}_vel'] for ax in ['az', 'el']}
+        self.max_accel = {ax: stats[f'{ax}_accel'] for ax in ['az', 'el']}
+
+    def iter_blocks(self, t_shift=0., block_time=10.):
+        """Generator that yields the track as TrackPointBuffers, each
+        spanning at most block_time seconds.  If the track is
+        loopable (loop_time > 0) this continues forever.
+
+        Args:
+          t_shift (float): Offset to add to all timestamps.
+          block_time (float): Maximum time span of each block.
+
+        """
+        start = 0
+        while True:
+            for chunk in self._read_chunks(start):
+                chunk['timestamp'] += t_shift
+                t = chunk['timestamp']
+                edges = np.searchsorted(
+                    t, np.arange(t[0] + block_time, t[-1], block_time))
+                for block in np.split(chunk, edges):
+                    if len(block):
+                        yield TrackPointBuffer(block)
+            if self.loop_time <= 0:
+                break
+            t_shift += self.loop_time
+            start = self.preamble_count
 
 
 @dataclass
@@ -71,16 +160,126 @@ class TrackPoint:
     group_flag: int = 0
 
 
+#: Structured dtype for arrays of TrackPoint data; the fields match
+#: the TrackPoint attributes.
+TRACK_POINT_DTYPE = np.dtype([
+    ('timestamp', 'f8'),
+    ('az', 'f8'),
+    ('el', 'f8'),
+    ('az_vel', 'f8'),
+    ('el_vel', 'f8'),
+    ('az_flag', 'i4'),
+    ('el_flag', 'i4'),
+    ('group_flag', 'i4'),
+])
+
+
+def track_point_array(n=0, **columns):
+    """Create a TRACK_POINT_DTYPE array with n entries, initialized
+    with values (arrays or scalars) passed by field name.  Fields not
+    specified are set to 0.
+
+    """
+    arr = np.zeros(n, dtype=TRACK_POINT_DTYPE)
+    for k, v in columns.items():
+        arr[k] = v
+    return arr
+
+
+def track_points_from_array(arr):
+    """Convert a TRACK_POINT_DTYPE array to a list of TrackPoint."""
+    return [TrackPoint(*row) for row in arr.tolist()]
+
+
+class TrackPointBuffer:
+    """Array-backed container for a sequence of track points.  The
+    data are stored in a TRACK_POINT_DTYPE array, so each field
+    (e.g. ``buf.timestamp``, ``buf.az``) is available as a column.
+    Indexing with an integer returns a TrackPoint; indexing with a
+    slice (or index array) returns a new TrackPointBuffer.
+
+    Args:
+      data: a TRACK_POINT_DTYPE array, a list of TrackPoint, another
+        TrackPointBuffer, or None (empty buffer).
+
+    """
+
+    def __init__(self, data=None):
+        if data is None:
+            data = track_point_array(0)
+        elif isinstance(data, TrackPointBuffer):
+            data = data.data
+        elif not isinstance(data, np.ndarray):
+            data = track_point_array(
+                len(data), **{k: [getattr(p, k) for p in data]
+                              for k in TRACK_POINT_DTYPE.names})
+        if data.dtype != TRACK_POINT_DTYPE:
+            raise ValueError(f'Unexpected dtype for track points: {data.dtype}')
+        self.data = data
+
+    @classmethod
+    def concatenate(cls, items):
+        """Combine a sequence of buffers (or anything accepted by the
+        constructor) into a single TrackPointBuffer."""
+        return cls(np.concatenate([cls(x).data for x in items]
+                                  + [track_point_array(0)]))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return TrackPoint(*self.data[index].tolist())
+        return TrackPointBuffer(self.data[index])
+
+    def __iter__(self):
+        return iter(track_points_from_array(self.data))
+
+    def __getattr__(self, key):
+        if key in TRACK_POINT_DTYPE.names:
+            return self.data[key]
+        raise AttributeError(key)
+
+    def time_shift(self, dt):
+        """Return a copy of the buffer with dt added to all
+        timestamps."""
+        data = self.data.copy()
+        data['timestamp'] += dt
+        return TrackPointBuffer(data)
+
+
 def track_point_time_shift(p, dt):
+    if isinstance(p, TrackPointBuffer):
+        return p.time_shift(dt)
     return replace(p, timestamp=p.timestamp + dt)
 
 
+def _progtrack_format_times(timestamps):
+    # Vectorized equivalent of _progtrack_format_time; returns a list
+    # of arrays (day, hour, min, sec) for use with '%03d, %02d:%02d:%s'.
+    timestamps = np.asarray(timestamps, dtype=float)
+    whole = np.floor(timestamps)
+    days = (whole // DAY).astype('int64')
+    sec_of_day = (whole - days * DAY).astype('int64')
+    year_start = (days.astype('datetime64[D]').astype('datetime64[Y]')
+                  .astype('datetime64[D]').astype('int64'))
+    # Seconds and fractional part are rendered together.  Note
+    # _progtrack_format_time rounds the fractional part on its own
+    # (so a fraction that rounds up to 1 is rendered as .000000);
+    # mimic that.
+    frac = timestamps % 1.
+    secs = sec_of_day % 60 + np.where(frac >= 1 - 5e-7, 0., frac)
+    return [days - year_start + 1, sec_of_day // 3600,
+            (sec_of_day // 60) % 60, secs]
+
+
 def get_track_points_text(tpl, timestamp_offset=None, with_group_flag=False,
                           text_block=False):
     """Get a list of ProgramTrack lines for upload to ACU.
 
     Args:
-      tpl (list): list of TrackPoint to convert.
+      tpl (list): list of TrackPoint, or a TrackPointBuffer, to
+        convert.
       timestamp_offset (float): offset to add to all timestamps
         before rendering (defaults to 0).
       with_group_flag (bool): If True return each line as
@@ -91,30 +290,36 @@ def get_track_points_text(tpl, timestamp_offset=None, with_group_flag=False,
     """
     if timestamp_offset is None:
         timestamp_offset = 0
-    fmted_times = [_progtrack_format_time(p.timestamp + timestamp_offset)
-                   for p in tpl]
-    all_lines = [('{t}; {p.az:.6f}; {p.el:.6f}; {p.az_vel:.4f}; '
-                  '{p.el_vel:.4f}; {p.az_flag}; {p.el_flag}\r\n')
-                 .format(p=p, t=t)
-                 for p, t in zip(tpl, fmted_times)]
+    tpb = TrackPointBuffer(tpl)
+    if len(tpb) == 0:
+        return '' if text_block else []
+
+    # Render the whole block with a single formatting operation.
+    line_fmt = ('%03d, %02d:%02d:%09.6f; %.6f; %.6f; %.4f; %.4f; %d; %d\r\n')
+    columns = _progtrack_format_times(tpb.timestamp + timestamp_offset) + [
+        tpb.az, tpb.el, tpb.az_vel, tpb.el_vel, tpb.az_flag, tpb.el_flag]
+    values = itertools.chain.from_iterable(zip(*[c.tolist() for c in columns]))
+    text = (line_fmt * len(tpb)) % tuple(values)
 
     if text_block:
-        return ''.join(all_lines)
+        return text
+    all_lines = text.splitlines(keepends=True)
     if with_group_flag:
-        all_lines = [(p.group_flag, line) for p, line in zip(tpl, all_lines)]
+        all_lines = list(zip(tpb.group_flag.tolist(), all_lines))
     return all_lines
 
 
 class PointProvider:
-    """Wraps a generator that yields lists of points, but then
-    provides them one by one via the pop method, and can tell the
-    caller when the source is empty.
+    """Wraps a generator that yields blocks of points (lists of
+    TrackPoint, TRACK_POINT_DTYPE arrays, or TrackPointBuffers), but
+    then provides them one by one via the pop method (or in blocks,
+    via pop_block), and can tell the caller when the source is empty.
 
     """
 
     def __init__(self, gen):
         self._gen = gen
-        self._stash = []
+        self._stash = TrackPointBuffer()
         self._last_yielded_points = []  # Keep a queue of the last 2 yielded points.
 
     def __len__(self):
@@ -125,31 +330,71 @@ class PointProvider:
         return len(self._stash) == 0
 
     def _request(self, n):
-        while self._gen is not None and len(self._stash) < n:
+        blocks = [self._stash]
+        count = len(self._stash)
+        while self._gen is not None and count < n:
             try:
-                self._stash.extend(next(self._gen))
+                blocks.append(TrackPointBuffer(next(self._gen)))
+                count += len(blocks[-1])
             except StopIteration:
                 self._gen = None
+        if len(blocks) > 1:
+            self._stash = TrackPointBuffer.concatenate(blocks)
+
+    def _take(self, n):
+        # Remove the first n points from the stash and return them.
+        block, self._stash = self._stash[:n], self._stash[n:]
+        # Ensure we only ever have 2 points or less in the last yielded points.
+        self._last_yielded_points = (self._last_yielded_points
+                                     + list(block[-2:]))[-2:]
+        return block
 
     def pop(self):
         self._request(1)
         if len(self._stash):
-            while len(self._last_yielded_points) >= 2:
-                # Ensure we only ever have 2 points or less in the last yielded points.
-                self._last_yielded_points.pop(0)
-
-            self._last_yielded_points.append(self._stash[0])
-            return self._stash.pop(0)
+            return self._take(1)[0]
 
         return None
 
+    def pop_block(self, min_count=1, until=None):
+        """Remove and return a block of points, as a TrackPointBuffer.
+        The block will include at least min_count points and, if until
+        is not None, will extend at least to the first point with
+        timestamp >= until.  It will then be extended, if necessary,
+        so that the final point does not have group_flag set.  The
+        block may be shorter than requested if the source runs out.
+
+        """
+        n = max(min_count, 1)
+        while True:
+            self._request(n)
+            if until is not None:
+                idx = np.nonzero(self._stash.timestamp[n - 1:] >= until)[0]
+                if not len(idx) and self._gen is not None:
+                    n = max(n, len(self._stash)) + 1
+                    continue
+                if len(idx):
+                    n += idx[0]
+                else:
+                    n = len(self._stash)
+            # If the last point has a "group" flag, keep transferring points.
+            idx = np.nonzero(self._stash.group_flag[n - 1:] == 0)[0]
+            if not len(idx) and self._gen is not None:
+                n = max(n, len(self._stash)) + 1
+                continue
+            if len(idx):
+                n += idx[0]
+            else:
+                n = len(self._stash)
+            return self._take(n)
+
     def abort(self):
         """
         Nuclear option to clear stash and gen immediately.
         """
 
         self._gen = None
-        self._stash = []
+        self._stash = TrackPointBuffer()
 
     def stop(self, free_form, stop_accel=0.5):
         """
@@ -209,7 +454,7 @@ class PointProvider:
                                                               az0=final_az, el0=final_el, stoptime=stoptime,
                                                               az_flag=final_az_flag, el_flag=final_el_flag)
 
-            self._stash.extend(stop_point_track)
+            self._stash = TrackPointBuffer(stop_point_track)
 
         # If we're not in a free_form scan, we can make one final point with az_vel = 0 and el_vel = 0.
         # To replicate the "end of planned track" stop, we make a point that's one second into the future.
@@ -225,20 +470,55 @@ class PointProvider:
             pass  # Actually, for now, do nothing for not free_form scans! The ACU can handle it!
 
 
-def from_file(filename, fmt=None):
+def _array_chunk_reader(columns, n, chunk_size):
+    # Returns a read_chunks function for FromFileScan, for columns
+    # (dict of array-like, possibly memory-mapped) of length n.
+    def read_chunks(start=0):
+        for i in range(start, n, chunk_size):
+            j = min(i + chunk_size, n)
+            yield track_point_array(
+                j - i, **{k: v[i:j] for k, v in columns.items()})
+    return read_chunks
+
+
+def _text_chunk_reader(filename, chunk_size):
+    # Returns a read_chunks function for FromFileScan, that parses
+    # the text file in blocks of chunk_size lines.
+    keys = ['timestamp', 'az', 'el', 'az_vel', 'el_vel', 'az_flag', 'el_flag']
+
+    def read_chunks(start=0):
+        with open(filename) as f:
+            lines = (line for line in f
+                     if line.strip() and not line.lstrip().startswith('#'))
+            lines = itertools.islice(lines, start, None)
+            while True:
+                block = list(itertools.islice(lines, chunk_size))
+                if not len(block):
+                    break
+                data = np.loadtxt(block, ndmin=2)
+                if data.shape[1] not in [5, 7]:
+                    raise ValueError(f'Unexpected field count ({data.shape[1]}) in {filename}')
+                yield track_point_array(len(data), **dict(zip(keys, data.T)))
+    return read_chunks
+
+
+def from_file(filename, fmt=None, chunk_size=100000):
     """Load a ProgramTrack trajectory from a file.  This function
-    supports two formats. The modern format is a pickle file. The
-    older numpy format is also supported.
+    supports several formats. The modern format is a pickle file (or
+    an npz file with the same structure). The older numpy format, and
+    a text format, are also supported.
 
     Parameters:
       filename (str): Full path to the file.
-      fmt (str): Optional, one of "pickle" or "numpy". If this is
-        unspecified, the code will assume pickle format unless the
-        filename ends in "npy".
+      fmt (str): Optional, one of "pickle", "npz", "numpy" or
+        "text". If this is unspecified, the code will assume pickle
+        format unless the filename ends in "npz", "npy" or "txt".
+      chunk_size (int): Number of points to process at a time, when
+        scanning through the file data.
 
     Returns:
-      FromFileScan: Object containing the loaded points and
-        supporting config for ProgramTrack mode.
+      FromFileScan: Object containing supporting config for
+        ProgramTrack mode, and providing access to the points.
 
     Notes:
 
@@ -290,45 +570,50 @@ def from_file(filename, fmt=None):
           track to have a ramp-up, or partial initial scan segment,
           prior to entering the repetable template.
 
+      The npz format is the same, except that the dict is stored
+      with np.savez (the settings become 0-d arrays).
+
       The older numpy-based format does not support the additional
       settings.  The numpy file must contain an iterable with 5 or 7
       entries, where all entries are 1-d arrays of the same length.
       The first 5 arrays will correspond to 'timestamp', 'az', 'el',
       'az_vel', 'el_vel'.  The 2 optional arrays are 'az_flag' and
-      'el_flag'.
+      'el_flag'.  The file is memory-mapped, rather than loaded.
+
+      The text format has the same 5 or 7 entries as columns, one
+      line per point; blank lines and lines starting with "#" are
+      ignored.  The text is parsed in chunks, as needed.
+
+      For all formats, the whole track is read through once, in
+      chunks, to compute the summary attributes of the
+      :class:`FromFileScan`; so the time taken by this function
+      grows with the track length, even where memory use does not.
 
     """
     if fmt is None:
         fmt = 'pickle'
-        if filename.endswith('npy'):
-            fmt = 'numpy'
+        for suffix, _fmt in [('npz', 'npz'), ('npy', 'numpy'), ('txt', 'text')]:
+            if filename.endswith(suffix):
+                fmt = _fmt
 
     if fmt == 'numpy':
-        info = np.load(filename)
+        info = np.load(filename, mmap_mode='r')
         if len(info) not in [5, 7]:
             raise ValueError(f'Unexpected field count ({len(info)}) in {filename}')
-        times, az, el, vaz, vel = info[:5]
-        if len(info) == 5:
-            az_flags = np.zeros(len(times), int)
-            el_flags = az_flags
-        elif len(info) == 7:
-            az_flags = info[5].astype('int')
-            el_flags = info[6].astype('int')
-
-        output = FromFileScan()
-        output.loop_time = 0.
-        output.free_form = False
-        output.step_time = np.diff(times).min()
-        output.points = [TrackPoint(*a) for a in zip(
-            times, az, el, vaz, vel, az_flags, el_flags)]
-        output.az_range = (az.min(), az.max())
-        output.el_range = (el.min(), el.max())
-
-    elif fmt == 'pickle':
-        data = pickle.load(open(filename, 'rb'))
-        output = FromFileScan()
-        output.loop_time = 0.
-        output.free_form = data.get('free_form', False)
+        keys = ['timestamp', 'az', 'el', 'az_vel', 'el_vel', 'az_flag', 'el_flag']
+        output = FromFileScan(_array_chunk_reader(
+            dict(zip(keys, info)), info.shape[1], chunk_size))
+
+    elif fmt == 'text':
+        output = FromFileScan(_text_chunk_reader(filename, chunk_size))
+
+    elif fmt in ['pickle', 'npz']:
+        if fmt == 'pickle':
+            data = pickle.load(open(filename, 'rb'))
+        else:
+            with np.load(filename) as npz:
+                data = {k: (v.item() if v.ndim == 0 else v)
+                        for k, v in npz.items()}
 
         keys = ['timestamp', 'az', 'el', 'az_vel', 'el_vel',
                 'az_flag', 'el_flag', 'group_flag']
@@ -340,32 +625,26 @@ def from_file(filename, fmt=None):
             vects['az_vel'] = np.gradient(vects['az']) / dtv
         if vects['el_vel'] is None:
             vects['el_vel'] = np.gradient(vects['el']) / dtv
-        if vects['az_flag'] is None:
-            vects['az_flag'] = np.zeros(n, int)
-        if vects['el_flag'] is None:
-            vects['el_flag'] = np.zeros(n, int)
-        if vects['group_flag'] is None:
-            vects['group_flag'] = np.zeros(n, int)
-
-        output.preamble_count = data.get('preamble_count', 0)
+        vects = {k: v for k, v in vects.items() if v is not None}
+
+        loop_time = 0.
+        preamble_count = data.get('preamble_count', 0)
         if data.get('loopable'):
             # Measure repeat time.
-            output.loop_time = (vects['timestamp'][-1]
-                                - vects['timestamp'][output.preamble_count])
+            loop_time = (vects['timestamp'][-1]
+                         - vects['timestamp'][preamble_count])
             # ... and drop last point.
-            for k in keys:
-                vects[k] = vects[k][:-1]
-
-        columns = [vects[k] for k in keys]
-        output.points = [TrackPoint(*row) for row in zip(*columns)]
+            n -= 1
 
-        output.step_time = np.diff(vects['timestamp']).min()
-        output.az_range = (vects['az'].min(), vects['az'].max())
-        output.el_range = (vects['el'].min(), vects['el'].max())
+        output = FromFileScan(_array_chunk_reader(vects, n, chunk_size))
+        output.free_form = bool(data.get('free_form', False))
+        output.loop_time = loop_time
+        output.preamble_count = preamble_count
 
     else:
         raise ValueError(f"Invalid fmt={fmt}")
 
+    output._summarize()
     return output
 
 
@@ -374,8 +653,10 @@ def timecode(acutime, now=None):
     a unix timestamp.
 
     Parameters:
-        acutime (float): The time recorded by the ACU status stream,
-            corresponding to the fractional day of the year.
+        acutime (float or array): The time recorded by the ACU status
+            stream, corresponding to the fractional day of the year.
+            An array of such times may be passed, in which case an
+            array of unix timestamps is returned.
         now (float): The time, as unix timestamp, to assume it is now.
             This is for testing, it defaults to time.time().
 
@@ -386,17 +667,184 @@ def timecode(acutime, now=None):
 
     # This guard protects us at end of year, when time.time() and
     # acutime might correspond to different years.
-    if acutime > 180:
-        context = datetime.datetime.utcfromtimestamp(now - 30 * DAY)
-    else:
-        context = datetime.datetime.utcfromtimestamp(now + 30 * DAY)
+    def _year_start(late):
+        if late:
+            context = datetime.datetime.utcfromtimestamp(now - 30 * DAY)
+        else:
+            context = datetime.datetime.utcfromtimestamp(now + 30 * DAY)
+        return calendar.timegm(time.strptime(str(context.year), '%Y'))
 
-    year = context.year
-    gyear = calendar.timegm(time.strptime(str(year), '%Y'))
+    if np.ndim(acutime):
+        gyear = np.where(np.asarray(acutime) > 180,
+                         _year_start(True), _year_start(False))
+    else:
+        gyear = _year_start(acutime > 180)
     comptime = gyear + sec_of_day
     return comptime
 
 
+#: Map from struct format characters to numpy type characters, for
+#: the "standard size" struct modes.
+_STRUCT_STD_TYPES = {
+    'b': 'i1', 'B': 'u1', '?': 'b1',
+    'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+    'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8',
+    'e': 'f2', 'f': 'f4', 'd': 'f8',
+}
+
+
+def struct_format_to_dtype(fmt, names=None):
+    """Construct a numpy structured dtype that has the same memory
+    layout as a struct format string, so that packed records can be
+    decoded in bulk with np.frombuffer.
+
+    Parameters:
+      fmt (str): struct module format string, e.g. '<iddd'.
+      names (list of str): names for the fields.  If None, the
+        numpy defaults ('f0', 'f1', ...) are used.
+
+    Returns:
+      A numpy dtype, with itemsize equal to struct.calcsize(fmt).
+
+    """
+    order = '@'
+    if fmt[:1] in '@=<>!':
+        order, fmt = fmt[0], fmt[1:]
+    byteorder = {'@': '=', '=': '=', '<': '<', '>': '>', '!': '>'}[order]
+
+    items = []
+    for count, code in re.findall(r'(\d*)([a-zA-Z?])', fmt):
+        count = int(count) if count else 1
+        if code == 's':
+            items.append((f'{count}s', f'S{count}'))
+        elif code == 'x':
+            items.append((f'{count}x', None))
+        else:
+            if order == '@':
+                np_type = byteorder + np.dtype(code).char
+            elif code in _STRUCT_STD_TYPES:
+                np_type = byteorder + _STRUCT_STD_TYPES[code]
+            else:
+                raise ValueError(f'Unsupported struct code "{code}" in format.')
+            items.extend([(code, np_type)] * count)
+
+    formats, offsets = [], []
+    prefix = ''
+    for code, np_type in items:
+        prefix += code
+        if np_type is None:
+            continue
+        formats.append(np_type)
+        offsets.append(struct.calcsize(order + prefix)
+                       - struct.calcsize(order + code))
+
+    if names is None:
+        names = [f'f{i}' for i in range(len(formats))]
+    if len(names) != len(formats):
+        raise ValueError(f'Format has {len(formats)} fields but '
+                         f'{len(names)} names were provided.')
+    return np.dtype({'names': list(names),
+                     'formats': formats,
+                     'offsets': offsets,
+                     'itemsize': struct.calcsize(order + fmt)})
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO queue of records, backed by preallocated
+    numpy arrays.  Each record is stored along with a timestamp (such
+    as the time at which it was received).  When the buffer is full,
+    pushing new records causes the oldest records to be discarded;
+    such losses are counted.
+
+    Args:
+      capacity (int): Maximum number of records to hold.
+      dtype: numpy dtype of the records.
+
+    Attributes:
+      max_depth (int): The largest number of records that have been
+        held in the queue at once.
+      dropped (int): The total number of records discarded due to
+        overflow.
+      overflows (int): The number of push calls that caused records
+        to be discarded.
+
+    """
+
+    def __init__(self, capacity, dtype):
+        self.capacity = int(capacity)
+        self.records = np.zeros(self.capacity, dtype=dtype)
+        self.times = np.zeros(self.capacity)
+        self._head = 0  # index of the oldest record
+        self._count = 0
+        self.max_depth = 0
+        self.dropped = 0
+        self.overflows = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, records, timestamp):
+        """Add records to the end of the queue.
+
+        Args:
+          records (array): 1-d array of records, with the buffer's
+            dtype.
+          timestamp (float or array): timestamp to associate with
+            the records; either a single value or one per record.
+
+        """
+        n = len(records)
+        times = np.broadcast_to(timestamp, (n,))
+        lost = 0
+        if n > self.capacity:
+            records, times = records[-self.capacity:], times[-self.capacity:]
+            lost = n - self.capacity
+            n = self.capacity
+        excess = self._count + n - self.capacity
+        if excess > 0:
+            self._head = (self._head + excess) % self.capacity
+            self._count -= excess
+            lost += excess
+        if lost:
+            self.dropped += lost
+            self.overflows += 1
+        start = (self._head + self._count) % self.capacity
+        n1 = min(n, self.capacity - start)
+        self.records[start:start + n1] = records[:n1]
+        self.times[start:start + n1] = times[:n1]
+        self.records[:n - n1] = records[n1:]
+        self.times[:n - n1] = times[n1:]
+        self._count += n
+        self.max_depth = max(self.max_depth, self._count)
+
+    def pop(self, n):
+        """Remove up to n records from the front of the queue.
+
+        Returns:
+          Tuple (times, records), which are new arrays (not views
+          into the buffer).
+
+        """
+        n = min(n, self._count)
+        idx = (self._head + np.arange(n)) % self.capacity
+        output = self.times[idx], self.records[idx]
+        self._head = (self._head + n) % self.capacity
+        self._count -= n
+        return output
+
+    def get_stats(self):
+        """Get a dict with the current depth, and the max_depth,
+        dropped, and overflows counters.
+
+        """
+        return {
+            'depth': self._count,
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+            'overflows': self.overflows,
+        }
+
+
 def _get_target_az(current_az, current_t, increasing, az_endpoint1, az_endpoint2, az_speed, az_drift):
     # Return the next endpoint azimuth, based on current (az, t)
     # and whether to move in +ve or -ve az direction.
@@ -414,6 +862,197 @@ def _get_target_az(current_az, current_t, increasing, az_endpoint1, az_endpoint2
     return target
 
 
+def _count_steps(n, cond):
+    # Given an estimate n for the number of leading True values of
+    # the monotonic condition cond(k), k = 0, 1, ..., return the
+    # exact count.
+    n = max(n, 0)
+    while n > 0 and not cond(n - 1):
+        n -= 1
+    while cond(n):
+        n += 1
+    return n
+
+
+def _batch_track_points(segments, batch_size, num_batches=None,
+                        as_arrays=False):
+    # Regroup a stream of track point arrays into blocks of
+    # batch_size points, converting to lists of TrackPoint unless
+    # as_arrays.
+    pending = []
+    n_pending = 0
+    n_yielded = 0
+
+    def emit(block):
+        if as_arrays:
+            return block
+        return track_points_from_array(block)
+
+    for seg in segments:
+        pending.append(seg)
+        n_pending += len(seg)
+        while n_pending >= batch_size:
+            if num_batches is not None and n_yielded >= num_batches:
+                return
+            block = np.concatenate(pending)
+            pending = [block[batch_size:]]
+            n_pending -= batch_size
+            n_yielded += 1
+            yield emit(block[:batch_size])
+    if n_pending and (num_batches is None or n_yielded < num_batches):
+        yield emit(np.concatenate(pending))
+
+
+def _gen_const_vel_segments(t0, t, az, el, increasing, az_endpoint1,
+                            az_endpoint2, az_speed, az_drift, step_time,
+                            turntime, turnaround_method, num_scans):
+    # Yields arrays of track points for alternating const-vel legs
+    # and (generated) turnarounds, for generate_constant_velocity_scan.
+    daz = step_time * az_speed
+    az_flag = 0
+    point_group_batch = 0
+    while num_scans is None or num_scans > 0:
+        sign = 1 if increasing else -1
+        target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2,
+                                   az_speed, az_drift)
+
+        # Points up to (and including) the first one within 2 * daz
+        # of the target; then a final point on the target.  Positions
+        # and times are accumulated step by step (cumsum adds in
+        # order), so that rounding, and thus the point count and
+        # flags, match stepping one point at a time.
+        n = max(0, math.floor((sign * (target_az - az) - 2 * daz) / daz) + 1)
+        while True:
+            azs = np.cumsum(np.hstack((az, np.full(n + 2, sign * daz))))
+            if increasing:
+                stop = (azs > target_az - 2 * daz).nonzero()[0]
+            else:
+                stop = (azs < target_az + 2 * daz).nonzero()[0]
+            if len(stop):
+                break
+            n = 2 * n + 2
+        n = stop[0]
+        azs = azs[:n + 1]
+        ts = np.cumsum(np.hstack((t, np.full(n, step_time))))
+        if azs[-1] != target_az:
+            ts = np.hstack((ts, ts[-1] + sign * (target_az - azs[-1]) / az_speed))
+            azs = np.hstack((azs, target_az))
+        leg = track_point_array(len(ts), timestamp=ts + t0, az=azs, el=el,
+                                az_vel=sign * az_speed, az_flag=1)
+        leg['az_flag'][0] = az_flag
+        if len(ts) > n + 1:
+            leg['az_flag'][-1] = 2
+        leg['group_flag'] = np.arange(len(leg)) < point_group_batch
+        point_group_batch = max(0, point_group_batch - len(leg))
+        t, az, az_flag = ts[-1], target_az, leg['az_flag'][-1]
+
+        if num_scans is not None:
+            num_scans -= 1
+            if num_scans == 0:
+                # Kill the velocity on the last point and exit -- this
+                # was recommended at LAT FAT for smoothly stopping the
+                # motion at end of program.
+                leg['az_vel'][-1] = 0
+                yield leg
+                break
+        yield leg
+
+        # Turn around.
+        profile = turnarounds.gen_turnaround_profile(turnaround_method, sign * az_speed, turntime)
+        if profile is not None:
+            yield track_point_array(len(profile[0]), timestamp=profile[0] + t + t0,
+                                    az=profile[1] + az, el=el, az_vel=profile[2],
+                                    az_flag=az_flag, group_flag=int(point_group_batch > 0))
+        t += turntime
+        az_flag = 1
+        increasing = not increasing
+        point_group_batch = MIN_GROUP_NEW_LEG - 1
+
+
+def _get_scan_time(az0, az1, az_speed, az_cent):
+    # Time to move from az0 to az1, in a type 2 / 3 scan.
+    upper = -1 * np.cos(np.deg2rad(az1 - az_cent))
+    lower = -1 * np.cos(np.deg2rad(az0 - az_cent))
+
+    return abs(upper - lower) / np.deg2rad(az_speed)
+
+
+def _gen_type3_segments(t0, t, az, el, el_cent, increasing, az_endpoint1,
+                        az_endpoint2, az_speed, az_cent, tt, step_time,
+                        turnaround_method, num_scans, get_el=None):
+    # Yields arrays of track points for alternating legs and
+    # turnarounds, for generate_type3_scan.  Along each leg, az_speed
+    # * sin(az - az_cent) is constant, so -cos(az - az_cent) is linear
+    # in time.
+    az_flag = 0
+    point_group_batch = 0
+
+    def apply_el(points):
+        if get_el is not None and len(points):
+            points['el'], points['el_vel'] = get_el(points['timestamp'] - t0)
+            points['el_flag'] = 1
+
+    while num_scans is None or num_scans > 0:
+        sign = 1 if increasing else -1
+        if increasing:
+            target_az = max(az_endpoint1, az_endpoint2)
+        else:
+            target_az = min(az_endpoint1, az_endpoint2)
+
+        u0 = -np.cos(np.deg2rad(az - az_cent))
+
+        def get_az(k):
+            u = np.clip(u0 + sign * np.deg2rad(az_speed) * step_time * k, -1, 1)
+            return np.where(k == 0, az, az_cent + np.rad2deg(np.arccos(-u)))
+
+        def cond(k):
+            return _get_scan_time(get_az(k), target_az, az_speed, az_cent) > 2 * step_time
+
+        scan_time = _get_scan_time(az, target_az, az_speed, az_cent)
+        n = _count_steps(math.ceil((scan_time - 2 * step_time) / step_time), cond)
+        ks = np.arange(n + 1)
+        azs = get_az(ks)
+        ts = t + ks * step_time
+        if azs[-1] != target_az:
+            ts = np.hstack((ts, ts[-1] + _get_scan_time(azs[-1], target_az, az_speed, az_cent)))
+            azs = np.hstack((azs, target_az))
+        leg = track_point_array(len(ts), timestamp=ts + t0, az=azs, el=el_cent,
+                                az_vel=sign * az_speed / np.sin(np.deg2rad(azs - az_cent)),
+                                az_flag=1)
+        leg['az_flag'][0] = az_flag
+        leg['group_flag'] = np.arange(len(leg)) < point_group_batch
+        point_group_batch = max(0, point_group_batch - len(leg))
+        t, az, az_flag = ts[-1], target_az, leg['az_flag'][-1]
+
+        if num_scans is not None:
+            num_scans -= 1
+            if num_scans == 0:
+                # Kill the velocity on the last point and exit -- this
+                # was recommended at LAT FAT for smoothly stopping the
+                # motion at end of program.
+                apply_el(leg[:-1])
+                leg['az_vel'][-1] = 0
+                yield leg
+                break
+        apply_el(leg)
+        yield leg
+
+        # Turn around.
+        point_group_batch = MIN_GROUP_NEW_LEG - 1
+        _v = sign * az_speed / np.sin(np.deg2rad(az - az_cent))
+        profile = turnarounds.gen_turnaround_profile(turnaround_method, _v, tt[1],
+                                                     step_time=step_time)
+        if profile is not None:
+            turn = track_point_array(len(profile[0]), timestamp=profile[0] + t + t0,
+                                     az=profile[1] + az, el=el, az_vel=profile[2],
+                                     az_flag=az_flag, group_flag=1)
+            apply_el(turn)
+            yield turn
+        t += tt[sign]
+        az_flag = 1
+        increasing = not increasing
+
+
 def generate_constant_velocity_scan(az_endpoint1, az_endpoint2, az_speed,
                                     acc, el_endpoint1, el_endpoint2,
                                     el_speed=0,
@@ -426,7 +1065,8 @@ def generate_constant_velocity_scan(az_endpoint1, az_endpoint2, az_speed,
                                     az_start='mid_inc',
                                     az_first_pos=None,
                                     az_drift=None,
-                                    turnaround_method='standard'):
+                                    turnaround_method='standard',
+                                    as_arrays=False):
     """Python generator to produce times, azimuth and elevation positions,
     azimuth and elevation velocities, azimuth and elevation flags for
     arbitrarily long constant-velocity azimuth scans.
@@ -477,20 +1117,23 @@ def generate_constant_velocity_scan(az_endpoint1, az_endpoint2, az_speed,
             'three_leg' generates a three-leg turnaround which attempts to
             minimize the acceleration at the midpoint of the turnaround.
             'two_leg' generates a "three_leg" turnaround with second_leg_time = 0.
+        as_arrays (bool): If True, yield arrays of TRACK_POINT_DTYPE
+            instead of lists of TrackPoint.
 
     Yields:
-        points (list): a list of TrackPoint objects.  Raises
-          StopIteration once exit condition, if defined, is met.
+        points (list): a list of TrackPoint objects (or an array,
+          if as_arrays).  Raises StopIteration once exit condition,
+          if defined, is met.
 
     """
     if az_endpoint1 == az_endpoint2:
         raise ValueError('Generator requires two different az endpoints!')
 
-    # Force the el_speed to 0.  It matters because an el_speed in
-    # ProgramTrack data that exceeds the ACU limits will cause the
-    # point to be rejected, even if there's no motion in el planned
-    # (which, at the time of this writing, there is not).
-    el_speed = 0.
+    # Note el_speed is ignored, and el_vel is always 0.  It matters
+    # because an el_speed in ProgramTrack data that exceeds the ACU
+    # limits will cause the point to be rejected, even if there's no
+    # motion in el planned (which, at the time of this writing, there
+    # is not).
 
     # Note that starting scan direction gets modified, below,
     # depending on az_start.
@@ -513,7 +1156,6 @@ def generate_constant_velocity_scan(az_endpoint1, az_endpoint2, az_speed,
     else:
         raise ValueError(f'az_start value "{az_start}" not supported. Choose from '
                          'az_endpoint1, az_endpoint2, mid_inc, mid_dec')
-    az_vel = az_speed if increasing else -az_speed
 
     # Bias the starting point for the first leg?
     if az_first_pos is not None:
@@ -530,123 +1172,13 @@ def generate_constant_velocity_scan(az_endpoint1, az_endpoint2, az_speed,
         raise ValueError('Time step size too small, must be at least '
                          '0.05 seconds')
     daz = step_time * az_speed
-    el_vel = el_speed
-    az_flag = 0
-    el_flag = 0
-    if num_batches is None:
-        stop_iter = float('inf')
-    else:
-        stop_iter = num_batches
+    if num_batches is not None:
         batch_size = int(np.ceil(abs(az_endpoint2 - az_endpoint1) / daz))
 
-    def dec_num_scans():
-        nonlocal num_scans
-        if num_scans is not None:
-            num_scans -= 1
-
-    def check_num_scans():
-        return num_scans is None or num_scans > 0
-
-    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed, az_drift)
-    point_group_batch = 0
-
-    i = 0
-    point_queue = []
-    while i < stop_iter and check_num_scans():
-        i += 1
-        point_block = []
-        for j in range(batch_size):
-            if len(point_queue):  # Pull from points in the queue first
-                point_block.append(point_queue.pop(0))
-                continue
-
-            point_block.append(TrackPoint(
-                timestamp=t + t0,
-                az=az, el=el, az_vel=az_vel, el_vel=el_vel,
-                az_flag=az_flag, el_flag=el_flag,
-                group_flag=int(point_group_batch > 0)))
-
-            if point_group_batch > 0:
-                point_group_batch -= 1
-
-            if increasing:
-                if az <= (target_az - 2 * daz):
-                    t += step_time
-                    az += daz
-                    az_vel = az_speed
-                    el_vel = el_speed
-                    az_flag = 1
-                    el_flag = 0
-                elif az == target_az:
-                    # Turn around.
-                    turnaround_track = turnarounds.gen_turnaround(turnaround_method=turnaround_method,
-                                                                  t0=t + t0, az0=az, el0=el, v0=az_vel,
-                                                                  turntime=turntime,
-                                                                  az_flag=az_flag, el_flag=el_flag,
-                                                                  point_group_batch=point_group_batch)
-                    point_queue.extend(turnaround_track)
-
-                    t += turntime
-                    az_vel = -1 * az_speed
-                    el_vel = el_speed
-                    az_flag = 1
-                    el_flag = 0
-                    increasing = False
-                    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed, az_drift)
-                    dec_num_scans()
-                    point_group_batch = MIN_GROUP_NEW_LEG - 1
-                else:
-                    time_remaining = (target_az - az) / az_speed
-                    az = target_az
-                    t += time_remaining
-                    az_vel = az_speed
-                    el_vel = el_speed
-                    az_flag = 2
-                    el_flag = 0
-            else:
-                if az >= (target_az + 2 * daz):
-                    t += step_time
-                    az -= daz
-                    az_vel = -1 * az_speed
-                    el_vel = el_speed
-                    az_flag = 1
-                    el_flag = 0
-                elif az == target_az:
-                    # Turn around.
-                    turnaround_track = turnarounds.gen_turnaround(turnaround_method=turnaround_method,
-                                                                  t0=t + t0, az0=az, el0=el, v0=az_vel,
-                                                                  turntime=turntime,
-                                                                  az_flag=az_flag, el_flag=el_flag,
-                                                                  point_group_batch=point_group_batch)
-                    point_queue.extend(turnaround_track)
-
-                    t += turntime
-                    az_vel = az_speed
-                    el_vel = el_speed
-                    az_flag = 1
-                    el_flag = 0
-                    increasing = True
-                    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed, az_drift)
-                    dec_num_scans()
-                    point_group_batch = MIN_GROUP_NEW_LEG - 1
-                else:
-                    time_remaining = (az - target_az) / az_speed
-                    az = target_az
-                    t += time_remaining
-                    az_vel = -1 * az_speed
-                    el_vel = el_speed
-                    az_flag = 2
-                    el_flag = 0
-
-            if not check_num_scans():
-                # Kill the velocity on the last point and exit -- this
-                # was recommended at LAT FAT for smoothly stopping the
-                # motion at end of program.
-                point_block[-1].az_vel = 0
-                point_block[-1].el_vel = 0
-                break
-
-        yield point_block
+    segments = _gen_const_vel_segments(
+        t0, t, az, el, increasing, az_endpoint1, az_endpoint2, az_speed,
+        az_drift, step_time, turntime, turnaround_method, num_scans)
+    yield from _batch_track_points(segments, batch_size, num_batches, as_arrays)
 
 
 def generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
@@ -662,7 +1194,8 @@ def generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
                         az_start='mid_inc',
                         az_first_pos=None,
                         az_drift=None,
-                        turnaround_method='two_leg'):
+                        turnaround_method='two_leg',
+                        as_arrays=False):
     """Python generator to produce times, azimuth and elevation positions,
     azimuth and elevation velocities, azimuth and elevation flags for
     arbitrarily long type 3 scan.
@@ -714,18 +1247,15 @@ def generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
             'three_leg' generates a three-leg turnaround which attempts to
             minimize the acceleration at the midpoint of the turnaround.
             (Default) 'two_leg' generates a "three_leg" turnaround with second_leg_time = 0.
+        as_arrays (bool): If True, yield arrays of TRACK_POINT_DTYPE
+            instead of lists of TrackPoint.
 
     Yields:
-        points (list): a list of TrackPoint objects.  Raises
-          StopIteration once exit condition, if defined, is met.
+        points (list): a list of TrackPoint objects (or an array,
+          if as_arrays).  Raises StopIteration once exit condition,
+          if defined, is met.
 
     """
-    def get_scan_time(az0, az1, az_speed, az_cent):
-        upper = -1 * np.cos(np.deg2rad(az1 - az_cent))
-        lower = -1 * np.cos(np.deg2rad(az0 - az_cent))
-
-        return abs(upper - lower) / np.deg2rad(az_speed)
-
     if az_endpoint1 == az_endpoint2:
         raise ValueError('Generator requires two different az endpoints!')
 
@@ -767,7 +1297,6 @@ def generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
     else:
         raise ValueError(f'az_start value "{az_start}" not supported. Choose from '
                          'az_endpoint1, az_endpoint2, mid_inc, mid_dec')
-    az_vel = az_speed if increasing else -az_speed
 
     # Bias the starting point for the first leg?
     if az_first_pos is not None:
@@ -787,133 +1316,18 @@ def generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
     if step_time < 0.05:
         raise ValueError('Time step size too small, must be at least '
                          '0.05 seconds')
-    az_flag = 0
-    el_flag = 0
-    if num_batches is None:
-        stop_iter = float('inf')
-    else:
-        stop_iter = num_batches
-        batch_size = int(np.ceil(get_scan_time(az_endpoint1, az_endpoint2, az_speed, az_cent) / step_time))
-
-    def dec_num_scans():
-        nonlocal num_scans
-        if num_scans is not None:
-            num_scans -= 1
-
-    def check_num_scans():
-        return num_scans is None or num_scans > 0
-
-    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed / np.sin(np.deg2rad(az - az_cent)), az_drift)
-    point_group_batch = 0
+    if num_batches is not None:
+        batch_size = int(np.ceil(_get_scan_time(az_endpoint1, az_endpoint2, az_speed, az_cent) / step_time))
 
     def get_el(_t):
         return (el_cent - el_throw * np.cos(_t * el_freq * 2 * np.pi),
                 el_throw * el_freq * 2 * np.pi * np.sin(_t * el_freq * 2 * np.pi))
 
-    i = 0
-    point_queue = []
-    while i < stop_iter and check_num_scans():
-        i += 1
-        point_block = []
-        for j in range(batch_size):
-            if len(point_queue):  # Pull from points in the queue first
-                point_block.append(point_queue.pop(0))
-                continue
-
-            point_block.append(TrackPoint(
-                timestamp=t + t0,
-                az=az, el=el_cent, az_vel=az_vel / np.sin(np.deg2rad(az - az_cent)), el_vel=0,
-                az_flag=az_flag, el_flag=el_flag,
-                group_flag=int(point_group_batch > 0)))
-
-            if point_group_batch > 0:
-                point_group_batch -= 1
-
-            if increasing:
-                if get_scan_time(az, target_az, az_speed, az_cent) > 2 * step_time:
-                    t += step_time
-                    az += step_time * az_speed / np.sin(np.deg2rad(az - az_cent))
-                    az_vel = az_speed
-                    az_flag = 1  # 1
-                    el_flag = 0
-                elif az == target_az:
-                    point_group_batch = MIN_GROUP_NEW_LEG - 1
-                    # Turn around.
-                    _v = az_vel / np.sin(np.deg2rad(az - az_cent))
-                    turnaround_track = turnarounds.gen_turnaround(turnaround_method=turnaround_method,
-                                                                  t0=t + t0, az0=az, el0=el, v0=_v,
-                                                                  turntime=tt[1],
-                                                                  az_flag=az_flag, el_flag=el_flag,
-                                                                  step_time=step_time,
-                                                                  point_group_batch=point_group_batch)
-                    point_queue.extend(turnaround_track)
-
-                    # Turn around.
-                    t += tt[1]
-                    az_vel = -1 * az_speed
-                    az_flag = 1  # 1
-                    el_flag = 0
-                    increasing = False
-                    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed / np.sin(np.deg2rad(az - az_cent)), az_drift)
-                    dec_num_scans()
-                else:
-                    time_remaining = get_scan_time(az, target_az, az_speed, az_cent)
-                    az = target_az
-                    t += time_remaining
-                    az_vel = az_speed
-                    az_flag = 1  # 2
-                    el_flag = 0
-            else:
-                if get_scan_time(az, target_az, az_speed, az_cent) > 2 * step_time:
-                    t += step_time
-                    az -= step_time * az_speed / np.sin(np.deg2rad(az - az_cent))
-                    az_vel = -1 * az_speed
-                    az_flag = 1  # 1
-                    el_flag = 0
-                elif az == target_az:
-                    point_group_batch = MIN_GROUP_NEW_LEG - 1
-                    # Turn around.
-                    _v = az_vel / np.sin(np.deg2rad(az - az_cent))
-                    turnaround_track = turnarounds.gen_turnaround(turnaround_method=turnaround_method,
-                                                                  t0=t + t0, az0=az, el0=el, v0=_v,
-                                                                  turntime=tt[1],
-                                                                  az_flag=az_flag, el_flag=el_flag,
-                                                                  step_time=step_time,
-                                                                  point_group_batch=point_group_batch)
-                    point_queue.extend(turnaround_track)
-
-                    # Turn around.
-                    t += tt[-1]
-                    az_vel = az_speed
-                    az_flag = 1  # 1
-                    el_flag = 0
-                    increasing = True
-                    target_az = _get_target_az(az, t, increasing, az_endpoint1, az_endpoint2, az_speed / np.sin(np.deg2rad(az - az_cent)), az_drift)
-                    dec_num_scans()
-                else:
-                    time_remaining = get_scan_time(az, target_az, az_speed, az_cent)
-                    az = target_az
-                    t += time_remaining
-                    az_vel = -1 * az_speed
-                    az_flag = 1  # 2
-                    el_flag = 0
-
-            if not check_num_scans():
-                # Kill the velocity on the last point and exit -- this
-                # was recommended at LAT FAT for smoothly stopping the
-                # motion at end of program.
-                point_block[-1].az_vel = 0
-                point_block[-1].el_vel = 1000
-                break
-
-        for p in point_block:
-            if p.el_vel == 1000:
-                p.el_vel = 0.
-            elif el_throw != 0:
-                p.el, p.el_vel = get_el(p.timestamp - t0)
-                p.el_flag = 1
-
-        yield point_block
+    segments = _gen_type3_segments(
+        t0, t, az, el, el_cent, increasing, az_endpoint1, az_endpoint2,
+        az_speed, az_cent, tt, step_time, turnaround_method, num_scans,
+        get_el=(get_el if el_throw != 0 else None))
+    yield from _batch_track_points(segments, batch_size, num_batches, as_arrays)
 
 
 def generate_type2_scan(az_endpoint1, az_endpoint2, az_speed,
@@ -928,7 +1342,8 @@ def generate_type2_scan(az_endpoint1, az_endpoint2, az_speed,
                         az_start='mid_inc',
                         az_first_pos=None,
                         az_drift=None,
-                        turnaround_method='two_leg'):
+                        turnaround_method='two_leg',
+                        as_arrays=False):
     """Python generator to produce times, azimuth and elevation positions,
     azimuth and elevation velocities, azimuth and elevation flags for
     arbitrarily long type 2 scan.
@@ -977,10 +1392,13 @@ def generate_type2_scan(az_endpoint1, az_endpoint2, az_speed,
             'three_leg' generates a three-leg turnaround which attempts to
             minimize the acceleration at the midpoint of the turnaround.
             'two_leg' (Default) generates a "three_leg" turnaround with second_leg_time = 0.
+        as_arrays (bool): If True, yield arrays of TRACK_POINT_DTYPE
+            instead of lists of TrackPoint.
 
     Yields:
-        points (list): a list of TrackPoint objects.  Raises
-          StopIteration once exit condition, if defined, is met.
+        points (list): a list of TrackPoint objects (or an array,
+          if as_arrays).  Raises StopIteration once exit condition,
+          if defined, is met.
 
     """
     return generate_type3_scan(az_endpoint1, az_endpoint2, az_speed,
@@ -996,7 +1414,8 @@ def generate_type2_scan(az_endpoint1, az_endpoint2, az_speed,
                                az_start=az_start,
                                az_first_pos=az_first_pos,
                                az_drift=az_drift,
-                               turnaround_method=turnaround_method)
+                               turnaround_method=turnaround_method,
+                               as_arrays=as_arrays)
 
 
 def plan_scan(az_end1, az_end2, el, v_az=1, a_az=1, az_start=None,
@@ -0,0 +1,301 @@
+"""
+Block assembly and change-driven publishing for the ACU Agent
+"monitor" process.
+
+The monitor process polls the ACU status datasets at ~20 Hz, but most
+fields change rarely.  The StatusPublisher keeps, for each group of
+status fields, the values that were last published to each feed and
+uses a single vectorized comparison per group to decide whether a new
+block is needed (a nan value that remains nan is not considered a
+change).  Influx blocks (which require conversion of strings
+to numeric codes) are only assembled when they will be published.
+
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Codes for string-valued status fields, used when writing to influx.
+
+#: Axis mode codes; numbering as per ICD.
+MODE_KEY = {
+    'Stop': 0,
+    'Preset': 1,
+    'ProgramTrack': 2,
+    'Rate': 3,
+    'SectorScan': 4,
+    'SearchSpiral': 5,
+    'SurvivalMode': 6,
+    'StepTrack': 7,
+    'GeoSync': 8,
+    'OPT': 9,
+    'TLE': 10,
+    'Stow': 11,
+    'StarTrack': 12,
+    'SunTrack': 13,
+    'MoonTrack': 14,
+    'I11P': 15,
+    'AutoTrack/Preset': 16,
+    'AutoTrack/PositionMemory': 17,
+    'AutoTrack/PT': 18,
+    'AutoTrack/OPT': 19,
+    'AutoTrack/PT/Search': 20,
+    'AutoTrack/TLE': 21,
+    'AutoTrack/TLE/Search': 22,
+
+    # Currently we do not have ICD values for these, but they
+    # are included in the output of Meta.  ElSync, at least,
+    # is a known third axis mode for the LAT.
+    'ElSync': 100,
+    'UnStow': 101,
+    'MaintenanceStow': 102,
+}
+
+#: Fault codes; digital values taken from ICD (correspond to
+#: byte-encoding).
+FAULT_KEY = {
+    'No Fault': 0,
+    'Warning': 1,
+    'Fault': 2,
+    'Critical': 3,
+    'No Data': 4,
+    'Latched Fault': 5,
+    'Latched Critical Fault': 6,
+}
+
+#: SATP pin states.  Capitalization matches strings in ACU binary,
+#: not ICD.
+PIN_KEY = {
+    'Any Moving': 0,
+    'All Inserted': 1,
+    'All Retracted': 2,
+    'Failure': 3,
+}
+
+#: LAT pin states, from "meta" output.
+LAT_PIN_KEY = {
+    'Moving': 0,
+    'Inserted': 1,
+    'Retracted': 2,
+    'Error': 3,
+}
+
+#: Encoding of string booleans.
+TFN_KEY = {
+    'None': float('nan'),
+    'False': 0,
+    'True': 1,
+}
+
+#: Combined lookup from status string to influx code.  Where a string
+#: appears in more than one of the tables, the earliest table in this
+#: list takes precedence: TFN_KEY, MODE_KEY, FAULT_KEY, PIN_KEY,
+#: LAT_PIN_KEY.
+INFLUX_CODES = {}
+for _key_map in [LAT_PIN_KEY, PIN_KEY, FAULT_KEY, MODE_KEY, TFN_KEY]:
+    INFLUX_CODES.update(_key_map)
+
+#: Integer status fields that should be written to influx as floats.
+INFLUX_FLOAT_FIELDS = ['Year', 'Free_upload_positions']
+
+#: Short names used in the commanded position block names.
+_COMMAND_AXES = {
+    'Azimuth': 'az',
+    'Elevation': 'el',
+    'Boresight': 'boresight',
+}
+
+
+def influx_value(key, value):
+    """Convert a status value to the numeric form stored in influx.
+
+    Args:
+      key (str): the field name.
+      value: the field value, which must be a float, an int, or a
+        string that is listed in INFLUX_CODES.
+
+    """
+    if isinstance(value, float):
+        return value
+    if isinstance(value, str):
+        try:
+            return INFLUX_CODES[value]
+        except KeyError:
+            raise ValueError('Could not convert value for %s="%s"' %
+                             (key, value))
+    if key in INFLUX_FLOAT_FIELDS:
+        return float(value)
+    return int(value)
+
+
+@dataclass
+class BlockRule:
+    """Publication rule for one HK block of the acu_status feed.  See
+    MONITOR_STRUCTURE in the agent module for the meaning of policy
+    and min_period.
+
+    """
+    block_name: str
+    fields_key: str
+    policy: str = None
+    min_period: float = None
+
+    def __post_init__(self):
+        if self.policy not in [None, 'tick', 'changed']:
+            raise ValueError(f'Invalid policy "{self.policy}" for '
+                             f'block {self.block_name}.')
+
+    def should_publish(self, dt, changed, max_time_delta):
+        """Decide whether to publish, given the time dt since the
+        last published block and whether any values have changed.
+
+        """
+        if self.policy == 'tick':
+            return True
+        underdue = self.min_period is not None and dt < self.min_period
+        if underdue:
+            return False
+        if changed:
+            return True
+        return self.policy != 'changed' and dt > max_time_delta
+
+
+class _Columns:
+    """Current and last-published values for one group of status
+    fields.  The values are stored as object arrays, because a group
+    can mix strings, bools, ints and floats (and None, for missing
+    fields); comparisons are elementwise all the same.
+
+    """
+
+    def __init__(self):
+        self.fields = []
+        self.values = np.zeros(0, dtype=object)
+        # Map from target ("influx", "agg") to (timestamp, values).
+        self.published = {}
+
+    def load(self, data):
+        fields = list(data.keys())
+        if fields != self.fields:
+            # New layout; previously published values can't be
+            # compared, so treat everything as changed.
+            self.fields = fields
+            self.published = {k: (t, None) for k, (t, _) in
+                              self.published.items()}
+        self.values = np.array(list(data.values()), dtype=object)
+
+    def changed_since(self, target):
+        """Returns (dt, changed) relative to the last published values
+        for target; dt is None if nothing has been published.
+
+        """
+        t, prev = self.published.get(target, (None, None))
+        if prev is None or len(prev) != len(self.values):
+            return t, True
+        diff = (self.values != prev)
+        if not diff.any():
+            return t, False
+        # Don't count nan -> nan as a change.
+        return t, any([a == a or b == b for a, b in
+                       zip(self.values[diff], prev[diff])])
+
+    def mark(self, target, timestamp):
+        self.published[target] = (timestamp, self.values)
+
+
+class StatusPublisher:
+    """Decide which blocks of ACU status data to publish, on each
+    update of the monitor process.
+
+    Args:
+      structure (list): Table of (block_name, fields_key, policy,
+        sample_period), as in MONITOR_STRUCTURE.
+      max_time_delta (float): Maximum time (in s) between updates of
+        any block, even if nothing has changed (except for policy
+        'changed').
+      commanded_axes (list of str): Axes (drawn from 'Azimuth',
+        'Elevation', 'Boresight') for which commanded positions
+        should be written to the commands feed.
+      status_feed (str): Feed for full status blocks.
+      influx_feed (str): Feed for influx-format status blocks.
+      commands_feed (str): Feed for commanded positions.
+
+    """
+
+    def __init__(self, structure, max_time_delta,
+                 commanded_axes=('Azimuth', 'Elevation'),
+                 status_feed='acu_status',
+                 influx_feed='acu_status_influx',
+                 commands_feed='acu_commands_influx'):
+        self.max_time_delta = max_time_delta
+        self.commanded_axes = list(commanded_axes)
+        self.status_feed = status_feed
+        self.influx_feed = influx_feed
+        self.commands_feed = commands_feed
+        self.rules = [BlockRule(*row) for row in structure
+                      if row[0] is not None]
+        self._columns = {rule.fields_key: _Columns() for rule in self.rules}
+
+    def process(self, status, timestamp):
+        """Process the latest status readings.
+
+        Args:
+          status (dict): Map from fields_key to a dict of field values
+            (i.e. the agent's self.data['status']).
+          timestamp (float): Timestamp to assign to the blocks.
+
+        Returns:
+          List of (feed_name, block) to publish.
+
+        """
+        output = []
+
+        # Commanded positions are written to influx on every update.
+        commands = status.get('commands', {})
+        for axis in self.commanded_axes:
+            key = f'{axis}_commanded_position'
+            value = commands.get(key)
+            if value is None or str(value) == 'nan':
+                continue
+            output.append((self.commands_feed, {
+                'timestamp': timestamp,
+                'block_name': f'ACU_commanded_positions_{_COMMAND_AXES[axis]}',
+                'data': {key + '_influx': value},
+            }))
+
+        for fields_key, cols in self._columns.items():
+            cols.load(status.get(fields_key, {}))
+
+        # Influx blocks: publish on changes, or when overdue.
+        for fields_key, cols in self._columns.items():
+            if fields_key == 'commands' or len(cols.fields) == 0:
+                continue
+            t, changed = cols.changed_since('influx')
+            if not (changed or timestamp - t > self.max_time_delta):
+                continue
+            output.append((self.influx_feed, {
+                'timestamp': timestamp,
+                'block_name': fields_key,
+                'data': {f + '_influx': influx_value(f, v) for f, v in
+                         zip(cols.fields, cols.values.tolist())},
+            }))
+            cols.mark('influx', timestamp)
+
+        # Full status blocks: publish according to the rules.
+        for rule in self.rules:
+            cols = self._columns[rule.fields_key]
+            if len(cols.fields) == 0:
+                continue
+            t, changed = cols.changed_since('agg')
+            if t is not None and not rule.should_publish(
+                    timestamp - t, changed, self.max_time_delta):
+                continue
+            output.append((self.status_feed, {
+                'timestamp': timestamp,
+                'block_name': rule.block_name,
+                'data': dict(zip(cols.fields, cols.values.tolist())),
+            }))
+            cols.mark('agg', timestamp)
+
+        return output
@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 
 
@@ -43,21 +45,16 @@ def gen_turnaround(turnaround_method, t0, az0, el0, v0, turntime, az_flag, el_fl
     # but more work is necessary to get to that point. We shouldn't mix the two yet!
     el_vel = 0.
 
-    if turnaround_method == "standard_gen":
-        ts, azs, vs = _gen_standard_turnaround(v0, turntime, step_time)
-
-    elif turnaround_method == "two_leg":
-        # Two leg turnarounds set second_leg_time = 0
-        ts, azs, vs = _gen_three_leg_turnaround(v0, turntime, 0., second_leg_velocity, step_time)
-
-    elif turnaround_method == "three_leg":
-        ts, azs, vs = _gen_three_leg_turnaround(v0, turntime, second_leg_time, second_leg_velocity, step_time)
-
-    else:  # Return an empty list for non generative turnaround methods such as "standard"
+    profile = gen_turnaround_profile(turnaround_method, v0, turntime,
+                                     second_leg_time=second_leg_time,
+                                     second_leg_velocity=second_leg_velocity,
+                                     step_time=step_time)
+    if profile is None:  # Return an empty list for non generative turnaround methods such as "standard"
         return []
 
-    ts += t0
-    azs += az0
+    ts, azs, vs = profile
+    ts = ts + t0
+    azs = azs + az0
 
     # Turn our turnaround solution into TrackPoint's for the ACU.
     turnaround_track = []
@@ -70,6 +67,43 @@ def gen_turnaround(turnaround_method, t0, az0, el0, v0, turntime, az_flag, el_fl
     return turnaround_track
 
 
+@functools.lru_cache(maxsize=32)
+def gen_turnaround_profile(turnaround_method, v0, turntime, second_leg_time=None,
+                           second_leg_velocity=0, step_time=0.1):
+    """
+    Generates the times, azimuth offsets, and velocities of a turnaround, relative to its start time and position.
+    Since a scan repeats the same few turnarounds many times, the results are cached; the returned arrays must
+    not be modified in place.
+
+    Args:
+        turnaround_method (string): The method used for generating the turnaround; see gen_turnaround.
+        v0 (float): The initial azimuth velocity of the turnaround.
+        turntime (float): The turnaround time.
+        second_leg_time (float): See gen_turnaround.
+        second_leg_velocity (float): See gen_turnaround.
+        step_time (float): The step time between points in the turnaround.
+
+    Returns:
+        (ts, azs, vs) arrays, or None if the turnaround_method is not a generative method (such as "standard").
+    """
+    if turnaround_method == "standard_gen":
+        ts, azs, vs = _gen_standard_turnaround(v0, turntime, step_time)
+
+    elif turnaround_method == "two_leg":
+        # Two leg turnarounds set second_leg_time = 0
+        ts, azs, vs = _gen_three_leg_turnaround(v0, turntime, 0., second_leg_velocity, step_time)
+
+    elif turnaround_method == "three_leg":
+        ts, azs, vs = _gen_three_leg_turnaround(v0, turntime, second_leg_time, second_leg_velocity, step_time)
+
+    else:
+        return None
+
+    for x in [ts, azs, vs]:
+        x.flags.writeable = False
+    return ts, azs, vs
+
+
 def gen_free_form_stop(t0, a0, v0, az0, el0, stoptime, az_flag, el_flag, step_time=0.1):
     """
     Generates the trajectory of a gentle stop for a free_form scan given an timestamp, azimuth, and velocity
@@ -52,11 +52,8 @@ HWPEncoder_full: separated feed for full-sample HWP encoder data,
 """
 
 import argparse
-import calendar
 import os
-import select
 import socket
-import struct
 import time
 from collections import deque
 
@@ -68,15 +65,28 @@ txaio.use_twisted()
 from ocs import ocs_agent, site_config
 from ocs.ocs_twisted import TimeoutLock
 
-# These three values (COUNTER_INFO_LENGTH, COUNTER_PACKET_SIZE, IRIG_PACKET_SIZE)
+from socs.common.encoder import (COUNTER_HEADER, ERROR_HEADER, IRIG_HEADER,
+                                 IRIG_PACKET_SIZE, TIMEOUT_HEADER,
+                                 TIMEOUT_PACKET_SIZE, BBBPacketParser,
+                                 combine_overflow, count2time, decode_irig)
+
+# These values (COUNTER_INFO_LENGTH, COUNTER_PACKET_SIZE) and IRIG_PACKET_SIZE
 # should be consistent with the software on beaglebone.
 # The number of datapoints in every encoder packet from the Beaglebone
 COUNTER_INFO_LENGTH = 120
 # The size of the encoder packet from the beaglebone
 #    (header + 3*COUNTER_INFO_LENGTH datapoint information + 1 quadrature readout)
 COUNTER_PACKET_SIZE = 4 + 4 * COUNTER_INFO_LENGTH + 8 * COUNTER_INFO_LENGTH + 4
-# The size of the IRIG packet from the Beaglebone
-IRIG_PACKET_SIZE = 132
+
+# Layout of the encoder packets, used to decode them without copying
+COUNTER_PACKET_DTYPE = np.dtype([('header', '<u4'),
+                                 ('quad', '<u4'),
+                                 ('clock', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('overflow', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('index', '<u4', (COUNTER_INFO_LENGTH,))])
+
+# Maximum number of UDP packets to receive before parsing them
+MAX_PACKETS_PER_PARSE = 64
 
 # The slit scaler value for rough HWP rotating frequency
 NUM_SLITS = 570
@@ -88,59 +98,85 @@ SEC_ENCODER_TO_PUBLISH = 10
 NUM_SUBSAMPLE = 500
 
 
-def de_irig(val, base_shift=0):
-    """Converts the IRIG signal into sec/min/hours/day/year depending on the parameters
+class EncoderAccumulator:
+    """Accumulates the encoder packets from counter_queue in preallocated
+    arrays until they are published, growing them if needed.
 
-    Parameters
+    Attributes
     ----------
-    val : int
-       raw IRIG bit info of each 100msec chunk
-    base_shift : int, optional
-       number of bit shifts. This should be 0 except for seconds
-
-    Returns
-    -------
-    int
-       Either of sec/min/hours/day/year
-
-    """
-    return (((val >> (0 + base_shift)) & 1)
-            + ((val >> (1 + base_shift)) & 1) * 2
-            + ((val >> (2 + base_shift)) & 1) * 4
-            + ((val >> (3 + base_shift)) & 1) * 8
-            + ((val >> (5 + base_shift)) & 1) * 10
-            + ((val >> (6 + base_shift)) & 1) * 20
-            + ((val >> (7 + base_shift)) & 1) * 40
-            + ((val >> (8 + base_shift)) & 1) * 80 * (base_shift == 0))
-
-
-def count2time(counts, t_offset=0.):
-    """Quick etimation of time using Beagleboneblack clock counts
+    num_samples : int
+       number of counter samples accumulated
+    num_packets : int
+       number of packets accumulated
 
     Parameters
     ----------
-    counts : list of int
-       Beagleboneblack clock counter value
-    t_offset : int, optional
-       time offset in seconds
-
-    Returns
-    -------
-    list of float
-       Estimated time in seconds assuming the Beagleboneblack clock frequency is 200 MHz.
-       Without specifying t_offset, output is just the difference
-       from the first sample in the input list
+    num_samples : int, optional
+       initial capacity for counter samples
+    num_packets : int, optional
+       initial capacity for packets
 
     """
-    t_array = np.array(counts, dtype=float) - counts[0]
-    # Assuming BBB clock is 200MHz
-    t_array *= 5.e-9
-    t_array += t_offset
-
-    return t_array.tolist()
 
-
-class EncoderParser:
+    def __init__(self, num_samples=NUM_ENCODER_TO_PUBLISH + COUNTER_INFO_LENGTH,
+                 num_packets=64):
+        self._counter = np.empty(num_samples, dtype=np.int64)
+        self._counter_index = np.empty(num_samples, dtype=np.int64)
+        self._quad = np.empty(num_packets, dtype=np.int64)
+        self._received_time = np.empty(num_packets, dtype=float)
+        self.num_samples = 0
+        self.num_packets = 0
+
+    @staticmethod
+    def _reserve(array, size):
+        if size <= len(array):
+            return array
+        grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def append(self, counter, counter_index, quad, received_time):
+        """Adds an encoder packet, as stored in counter_queue."""
+        n = self.num_samples + len(counter)
+        self._counter = self._reserve(self._counter, n)
+        self._counter_index = self._reserve(self._counter_index, n)
+        self._counter[self.num_samples:n] = counter
+        self._counter_index[self.num_samples:n] = counter_index
+        self.num_samples = n
+
+        self._quad = self._reserve(self._quad, self.num_packets + 1)
+        self._received_time = self._reserve(self._received_time, self.num_packets + 1)
+        self._quad[self.num_packets] = quad
+        self._received_time[self.num_packets] = received_time
+        self.num_packets += 1
+
+    def clear(self):
+        """Empties the accumulator, keeping its arrays for reuse."""
+        self.num_samples = 0
+        self.num_packets = 0
+
+    @property
+    def counter(self):
+        """64 bit clock counts of each sample."""
+        return self._counter[:self.num_samples]
+
+    @property
+    def counter_index(self):
+        """Index of each sample, incremented by every edge."""
+        return self._counter_index[:self.num_samples]
+
+    @property
+    def quad(self):
+        """Quadrature readout of each packet."""
+        return self._quad[:self.num_packets]
+
+    @property
+    def received_time(self):
+        """System time at which each packet was received."""
+        return self._received_time[:self.num_packets]
+
+
+class EncoderParser(BBBPacketParser):
     """Class which will parse the incoming packets from the BeagleboneBlack and store the data
 
     Attributes
@@ -158,8 +194,8 @@ class EncoderParser:
        Current unix timestamp in seconds parased from IRIG
     sock : scoket.sock
        a UDP socket to connect to the Beagleboneblack
-    data : str
-       String which will hold the raw data from the Beaglebone before it is parsed
+    receiver : socs.common.encoder.UDPPacketReceiver
+       Buffer which will hold the raw data from the Beaglebone before it is parsed
     read_chunk_size : int
        Maximum data size to receive UDP packets in bytes
 
@@ -175,129 +211,17 @@ class EncoderParser:
     """
 
     def __init__(self, beaglebone_port=8080, read_chunk_size=8196):
-        # Creates twoe queues to hold the data from the encoder, IRIG, and quadrature respectively
-        self.counter_queue = deque()
-        self.irig_queue = deque()
+        # This helps with testing and rebinding to the same port after reset...
+        super().__init__(beaglebone_port, read_chunk_size, reuse_addr=True)
 
-        # Used for procedures that only run when data collection begins
-        self.is_start = 1
-        # Will hold the time at which data collection started [hours, mins, secs]
-        self.start_time = [0, 0, 0]
-        # Will be continually updated with unix in seconds
-        self.current_time = 0
+        # Creates a queue to hold the data from the encoder, in addition to irig_queue
+        self.counter_queue = deque()
 
         # If True, will stop trying to read data from socket
         self.stop = False
 
-        # Creates a UDP socket to connect to the Beaglebone
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        # This helps with testing and rebinding to the same port after reset...
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-        # Binds the socket to a specific ip address and port
-        # The ip address can be blank for accepting any UDP packet to the port
-        self.sock.bind(('', beaglebone_port))
-        # self.sock.setblocking(0)
-
-        # String which will hold the raw data from the Beaglebone before it is parsed
-        self.data = ''
-        self.read_chunk_size = read_chunk_size
-
-        self.log = txaio.make_logger()
-
-    def pretty_print_irig_info(self, irig_info, edge, print_out=False):
-        """Takes the IRIG information, prints it to the screen, sets the current time,
-        and returns the current time
-
-        Parameters
-        ----------
-        irig_info : list of int
-           IRIG bit info
-        edge : int
-           Clock count of rising edge of a reference marker bit
-        print_out : bool, optional
-           Set True to print out the parsed timestamp
-
-        Returns
-        -------
-        current_time : int
-           Current unix timestamp in seconds parased from IRIG
-
-        """
-        # Calls self.de_irig() to get the sec/min/hour of the IRIG packet
-        secs = de_irig(irig_info[0], 1)
-        mins = de_irig(irig_info[1], 0)
-        hours = de_irig(irig_info[2], 0)
-        day = de_irig(irig_info[3], 0) \
-            + de_irig(irig_info[4], 0) * 100
-        year = de_irig(irig_info[5], 0)
-
-        # If it is the first time that the function is called then set self.start_time
-        # to the current time
-        if self.is_start == 1:
-            self.start_time = [hours, mins, secs]
-            self.is_start = 0
-
-        if print_out:
-            # Find the sec/min/hour digit difference from the start time
-            dsecs = secs - self.start_time[2]
-            dmins = mins - self.start_time[1]
-            dhours = hours - self.start_time[0]
-
-            # Corrections to make sure that dsecs/dmins/dhours are all positive
-            if dhours < 0:
-                dhours = dhours + 24
-
-            if (dmins < 0) or ((dmins == 0) and (dsecs < 0)):
-                dmins = dmins + 60
-                dhours = dhours - 1
-
-            if dsecs < 0:
-                dsecs = dsecs + 60
-                dmins = dmins - 1
-
-            # Print UTC time, run time, and current clock count of the beaglebone
-            print('Current Time:', ('%d:%d:%d' % (hours, mins, secs)),
-                  'Run Time', ('%d:%d:%d' % (dhours, dmins, dsecs)),
-                  'Clock Count', edge)
-
-        # Set the current time in seconds (changed to seconds from unix epoch)
-        # self.current_time = secs + mins*60 + hours*3600
-        try:
-            st_time = time.strptime("%d %d %d:%d:%d" % (year, day, hours, mins, secs),
-                                    "%y %j %H:%M:%S")
-            self.current_time = calendar.timegm(st_time)
-        except ValueError:
-            self.log.error(f'Invalid IRIG-B timestamp: {year} {day} {hours} {mins} {secs}')
-            self.current_time = -1
-
-        return self.current_time
-
-    def check_data_length(self, start_index, size_of_read):
-        """Checks to make sure that self.data is the right size
-        Return false if the wrong size, return true if the data is the right size
-
-        Parameters
-        ----------
-        start_index : int
-           first index of the data to read
-        size_of_read : int
-           data size to read in bytes
-
-        Returns
-        -------
-        bool
-           False if the current data size is smaller than the data size suggested by the header info
-
-        """
-        if start_index + size_of_read > len(self.data):
-            self.data = self.data[start_index:]
-            return False
-
-        return True
-
     def grab_and_parse_data(self):
-        """Grabs self.data, determine what packet it corresponds to, parses the data.
+        """Grabs the received data, determine what packet it corresponds to, parses the data.
         This is a while loop to look for an appropriate header in a packet from beaglebone.
         Then, the data will be passed to an appropriate parsing method
         and stored in either of counter_queue or irig_queue.
@@ -311,80 +235,69 @@ class EncoderParser:
                     even though the IRIG packet header is found.
         """
         self.stop = False
+        receiver = self.receiver
 
         while not self.stop:  # This can be toggled by encoder agent to unblock
             # If there is data from the socket attached to the beaglebone then
-            #     ready[0] = true
-            # If not then continue checking for 2 seconds and if there is still no data
-            #     ready[0] = false
-            ready = select.select([self.sock], [], [], 2)
-            if ready[0]:
+            # receive it, otherwise continue checking for 2 seconds
+            if receiver.wait(2):
                 # Add the data from the socket attached to the beaglebone
-                # to the self.data string
-                data = self.sock.recv(self.read_chunk_size)
-                if len(self.data) > 0:
-                    self.data += data
-                else:
-                    self.data = data
+                # to the receiver, including any further packets already waiting,
+                # so that consecutive encoder packets are decoded together
+                receiver.receive(MAX_PACKETS_PER_PARSE)
 
                 while True:
                     # Check to make sure that there is at least 1 int in the packet
                     # The first int in every packet should be the header
-                    if not self.check_data_length(0, 4):
+                    if len(receiver) < 4:
                         self.log.error('Error 0')
                         break
 
-                    header = self.data[0:4]
                     # Convert a structure value from the beaglebone (header) to an int
-                    header = struct.unpack('<I', header)[0]
-                    # print('header ', '0x%x'%header)
-
-                    # 0x1EAF = Encoder Packet
-                    # 0xCAFE = IRIG Packet
-                    # 0xE12A = Error Packet
+                    header = receiver.header()
 
                     # Encoder
-                    if header == 0x1eaf:
+                    if header == COUNTER_HEADER:
+                        # Count the consecutive complete Encoder Packets
+                        count = receiver.count_packets(COUNTER_HEADER, COUNTER_PACKET_SIZE)
                         # Make sure the data is the correct length for an Encoder Packet
-                        if not self.check_data_length(0, COUNTER_PACKET_SIZE):
+                        if count == 0:
                             self.log.error('Error 1')
                             break
-                        # Call the meathod self.parse_counter_info() to parse the Encoder Packet
-                        self.parse_counter_info(self.data[4: COUNTER_PACKET_SIZE])
-                        if len(self.data) >= COUNTER_PACKET_SIZE:
-                            self.data = self.data[COUNTER_PACKET_SIZE:]
+                        # Call the meathod self.parse_counter_info() to parse the Encoder Packets
+                        self.parse_counter_info(receiver.unpack(COUNTER_PACKET_DTYPE, count))
 
                     # IRIG
-                    elif header == 0xcafe:
+                    elif header == IRIG_HEADER:
                         # Make sure the data is the correct length for an IRIG Packet
-                        if not self.check_data_length(0, IRIG_PACKET_SIZE):
+                        if len(receiver) < IRIG_PACKET_SIZE:
                             self.log.error('Error 2')
                             break
                         # Call the meathod self.parse_irig_info() to parse the IRIG Packet
-                        self.parse_irig_info(self.data[4: IRIG_PACKET_SIZE])
-                        if len(self.data) >= IRIG_PACKET_SIZE:
-                            self.data = self.data[IRIG_PACKET_SIZE:]
+                        self.parse_irig_packet()
 
                     # Error
                     # An Error Packet will be sent if there is a timing error in the
                     # synchronization pulses of the IRIG packet
                     # If you see 'Packet Error' check to make sure the IRIG is functioning as
                     # intended and that all the connections are made correctly
-                    elif header == 0xe12a:
+                    # The size of the Error Packet isn't fixed here, so the rest
+                    # of its datagram is dropped, but not the datagrams after it
+                    elif header == ERROR_HEADER:
                         self.log.error('Packet Error')
-                        # Clear self.data
-                        self.data = ''
-                    elif header == 0x1234:
+                        receiver.skip_datagram()
+                    elif header == TIMEOUT_HEADER:
                         # Expected behavior when HWP is not spinning
                         self.log.debug('Received timeout packet.')
-                        # Clear self.data
-                        self.data = ''
+                        if receiver.datagram_size() < TIMEOUT_PACKET_SIZE:
+                            receiver.skip_datagram()
+                        else:
+                            receiver.consume(TIMEOUT_PACKET_SIZE)
                     else:
                         self.log.error('Bad header')
-                        # Clear self.data
-                        self.data = ''
+                        receiver.skip_datagram()
 
-                    if len(self.data) == 0:
+                    if len(receiver) == 0:
                         break
                 break
 
@@ -392,22 +305,23 @@ class EncoderParser:
             # If you see this make sure that the beaglebone has been set up properly
             # print('Looking for data ...')
 
-    def parse_counter_info(self, data):
-        """Method to parse the Encoder Packet and put them to counter_queue
+    def parse_counter_info(self, packets):
+        """Method to parse Encoder Packets and put them to counter_queue
 
         Parameters
         ----------
-        data : str
-           string for the encoder ounter info
+        packets : numpy.ndarray
+           consecutive encoder packets, with dtype COUNTER_PACKET_DTYPE
 
         Note:
-           'data' structure:
+           packet structure (see COUNTER_PACKET_DTYPE):
            (Please note that '150' below might be replaced by COUNTER_INFO_LENGTH)
-           [0] Readout from the quadrature
-           [1-150] clock counts of 150 data points
-           [151-300] corresponding clock overflow of the 150 data points (each overflow count
+           [0] Packet header (0x1EAF)
+           [1] Readout from the quadrature
+           [2-151] clock counts of 150 data points
+           [152-301] corresponding clock overflow of the 150 data points (each overflow count
            is equal to 2^16 clock counts)
-           [301-450] corresponding absolute number of the 150 data points ((1, 2, 3, etc ...)
+           [302-451] corresponding absolute number of the 150 data points ((1, 2, 3, etc ...)
            or (150, 151, 152, etc ...) or (301, 302, 303, etc ...) etc ...)
 
            counter_queue structure:
@@ -416,72 +330,14 @@ class EncoderParser:
                             quadrature,
                             current system time]
         """
+        received_time = time.time()
 
-        # Convert the Encoder Packet structure into a numpy array
-        derter = np.array(struct.unpack('<' + 'I' + 'III' * COUNTER_INFO_LENGTH, data))
-
-        # self.quad_queue.append(derter[0].item()) # merged to counter_queue
-        self.counter_queue.append((derter[1:COUNTER_INFO_LENGTH + 1]
-                                   + (derter[COUNTER_INFO_LENGTH + 1:2 * COUNTER_INFO_LENGTH + 1] << 32),
-                                   derter[2 * COUNTER_INFO_LENGTH + 1:3 * COUNTER_INFO_LENGTH + 1],
-                                   derter[0].item(), time.time()))
-
-    def parse_irig_info(self, data):
-        """Method to parse the IRIG Packet and put them to the irig_queue
-
-        Parameters
-        ----------
-        data : str
-           string for the IRIG info
-
-        Note
-        ----
-           'data' structure:
-           [0] clock count of the IRIG Packet which the UTC time corresponds to
-           [1] overflow count of initial rising edge
-           [2] binary encoding of the second data
-           [3] binary encoding of the minute data
-           [4] binary encoding of the hour data
-           [5-11] additional IRIG information which we do mot use
-           [12-21] synchronization pulse clock counts
-           [22-31] overflow count at each synchronization pulse
-
-           irig_queue structure:
-           irig_queue = [Packet clock count,
-                         Packet UTC time in sec,
-                         [binary encoded IRIG data],
-                         [synch pulses clock counts],
-                         current system time]
-
-        """
-
-        # Convert the IRIG Packet structure into a numpy array
-        unpacked_data = struct.unpack('<L' + 'L' + 'L' * 10 + 'L' * 10 + 'L' * 10, data)
-
-        # Start of the packet clock count
-        # overflow.append(unpacked_data[1])
-        # print "overflow: ", overflow
-
-        rising_edge_time = unpacked_data[0] + (unpacked_data[1] << 32)
-
-        # Stores IRIG time data
-        irig_info = unpacked_data[2:12]
-
-        # Prints the time information and returns the current time in seconds
-        irig_time = self.pretty_print_irig_info(irig_info, rising_edge_time)
-
-        # Stores synch pulse clock counts accounting for overflow of 32 bit counter
-        synch_pulse_clock_times = (np.asarray(unpacked_data[12:22])
-                                   + (np.asarray(unpacked_data[22:32]) << 32)).tolist()
+        counts = combine_overflow(packets['clock'], packets['overflow'])
+        indexes = packets['index'].astype(np.int64)
+        quads = packets['quad'].tolist()
 
-        # self.irig_queue = [Packet clock count,Packet UTC time in sec,
-        #                    [binary encoded IRIG data],[synch pulses clock counts],
-        #                    [current system time]]
-        self.irig_queue.append((rising_edge_time, irig_time, irig_info,
-                                synch_pulse_clock_times, time.time()))
-
-    def __del__(self):
-        self.sock.close()
+        for i in range(len(packets)):
+            self.counter_queue.append((counts[i], indexes[i], quads[i], received_time))
 
 
 class HWPBBBAgent:
@@ -558,11 +414,7 @@ class HWPBBBAgent:
 
         """
         time_encoder_published = 0
-        counter_list = []
-        counter_index_list = []
-        quad_list = []
-        quad_counter_list = []
-        received_time_list = []
+        encoder = EncoderAccumulator()
 
         with self.lock.acquire_timeout(timeout=0, job='acq') as acquired:
             if not acquired:
@@ -598,12 +450,9 @@ class HWPBBBAgent:
                     data['data']['irig_time'] = irig_time
                     data['data']['irig_minus_sys'] = irig_time - sys_time
                     data['data']['rising_edge_count'] = rising_edge_count
-                    data['data']['irig_sec'] = de_irig(irig_info[0], 1)
-                    data['data']['irig_min'] = de_irig(irig_info[1], 0)
-                    data['data']['irig_hour'] = de_irig(irig_info[2], 0)
-                    data['data']['irig_day'] = de_irig(irig_info[3], 0) \
-                        + de_irig(irig_info[4], 0) * 100
-                    data['data']['irig_year'] = de_irig(irig_info[5], 0)
+                    (data['data']['irig_sec'], data['data']['irig_min'],
+                     data['data']['irig_hour'], data['data']['irig_day'],
+                     data['data']['irig_year']) = decode_irig(irig_info)
 
                     # Beagleboneblack clock frequency measured by IRIG
                     if self.rising_edge_count > 0 and irig_time > 0:
@@ -635,73 +484,63 @@ class HWPBBBAgent:
                 # Reducing the packet size, less frequent publishing
                 # Encoder data; packet coming rate = 570*2*2/150/4 ~ 4Hz packet at 2 Hz rotation
                 while len(self.parser.counter_queue):
-                    counter_data = self.parser.counter_queue.popleft()
-
-                    counter_list += counter_data[0].tolist()
-                    counter_index_list += counter_data[1].tolist()
-
-                    quad_data = counter_data[2]
-                    sys_time = counter_data[3]
-
-                    received_time_list.append(sys_time)
-                    quad_list.append(quad_data)
-                    quad_counter_list.append(counter_data[0][0])
+                    encoder.append(*self.parser.counter_queue.popleft())
                     ct = time.time()
 
-                    if len(counter_list) >= NUM_ENCODER_TO_PUBLISH \
-                       or (len(counter_list)
+                    if encoder.num_samples >= NUM_ENCODER_TO_PUBLISH \
+                       or (encoder.num_samples
                            and (ct - time_encoder_published) > SEC_ENCODER_TO_PUBLISH):
+                        counter = encoder.counter
+                        counter_index = encoder.counter_index
+                        received_time = encoder.received_time
+
                         # Publishing quadratic data first
                         data = {'timestamps': [], 'block_name': 'HWPEncoder_quad', 'data': {}}
-                        data['timestamps'] = received_time_list
-                        data['data']['quad'] = quad_list
+                        data['timestamps'] = received_time.tolist()
+                        data['data']['quad'] = encoder.quad.tolist()
                         self.agent.publish_to_feed('HWPEncoder', data)
-                        if quad_list:
-                            self.last_quad = quad_list[-1]
+                        if encoder.num_packets:
+                            self.last_quad = data['data']['quad'][-1]
                             self.last_quad_time = time.time()
 
                         # Publishing counter data
                         # (full sampled data will not be recorded in influxdb)
+                        timestamps = count2time(counter, received_time[0])
                         data = {'timestamps': [], 'block_name': 'HWPEncoder_counter', 'data': {}}
-                        data['data']['counter'] = counter_list
-                        data['data']['counter_index'] = counter_index_list
-
-                        data['timestamps'] = count2time(counter_list, received_time_list[0])
+                        data['data']['counter'] = counter.tolist()
+                        data['data']['counter_index'] = counter_index.tolist()
+                        data['timestamps'] = timestamps.tolist()
                         self.agent.publish_to_feed('HWPEncoder_full', data)
 
                         # Subsampled data for influxdb display
                         data_subsampled = {'block_name': 'HWPEncoder_counter_sub', 'data': {}}
-                        data_subsampled['timestamps'] = np.array(data['timestamps'])[::NUM_SUBSAMPLE].tolist()
-                        data_subsampled['data']['counter_sub'] = np.array(counter_list)[::NUM_SUBSAMPLE].tolist()
-                        data_subsampled['data']['counter_index_sub'] = np.array(counter_index_list)[::NUM_SUBSAMPLE].tolist()
+                        data_subsampled['timestamps'] = timestamps[::NUM_SUBSAMPLE].tolist()
+                        data_subsampled['data']['counter_sub'] = counter[::NUM_SUBSAMPLE].tolist()
+                        data_subsampled['data']['counter_index_sub'] = counter_index[::NUM_SUBSAMPLE].tolist()
                         self.agent.publish_to_feed('HWPEncoder', data_subsampled)
 
                         # For rough estimation of HWP rotation frequency
-                        data = {'timestamp': received_time_list[0],
+                        data = {'timestamp': float(received_time[0]),
                                 'block_name': 'HWPEncoder_freq', 'data': {}}
-                        dclock_counter = counter_list[-1] - counter_list[0]
-                        dindex_counter = counter_index_list[-1] - counter_index_list[0]
+                        dclock_counter = int(counter[-1] - counter[0])
+                        dindex_counter = int(counter_index[-1] - counter_index[0])
                         # Assuming Beagleboneblack clock is 200 MHz
                         pulse_rate = dindex_counter * 2.e8 / dclock_counter
                         hwp_freq = pulse_rate / 2. / NUM_SLITS
 
-                        diff_counter = np.diff(counter_list)
-                        diff_index = np.diff(counter_index_list)
+                        diff_counter = np.diff(counter)
+                        diff_index = np.diff(counter_index)
 
                         self.log.debug(f'pulse_rate {pulse_rate} {hwp_freq}')
                         data['data']['approx_hwp_freq'] = hwp_freq
-                        data['data']['diff_counter_mean'] = np.mean(diff_counter)
-                        data['data']['diff_index_mean'] = np.mean(diff_index)
-                        data['data']['diff_counter_std'] = np.std(diff_counter)
-                        data['data']['diff_index_std'] = np.std(diff_index)
+                        data['data']['diff_counter_mean'] = float(np.mean(diff_counter))
+                        data['data']['diff_index_mean'] = float(np.mean(diff_index))
+                        data['data']['diff_counter_std'] = float(np.std(diff_counter))
+                        data['data']['diff_index_std'] = float(np.std(diff_index))
                         self.agent.publish_to_feed('HWPEncoder', data)
 
-                        # Initialize lists
-                        counter_list = []
-                        counter_index_list = []
-                        quad_list = []
-                        quad_counter_list = []
-                        received_time_list = []
+                        # Initialize accumulator
+                        encoder.clear()
 
                         time_encoder_published = ct
 
@@ -3,9 +3,11 @@ import os
 import threading
 import time
 import traceback
+from concurrent.futures import Future, wait
 from contextlib import contextmanager
 from dataclasses import asdict, dataclass, field
-from typing import Any, Dict, Generator, List, Literal, Optional, Tuple
+from typing import (Any, Callable, Dict, Generator, List, Literal, Optional,
+                    Tuple)
 
 import numpy as np
 import ocs
@@ -19,6 +21,9 @@ MAX_SPIN_UP_DURATION: float = 1800.
 
 client_cache: Dict[str, ControlClient] = {}
 
+#: Statuses of op data (see ``get_op_data``) for which session data is available
+OP_DATA_STATUSES = ('ok', 'cached', 'feed')
+
 
 def get_op_data(agent_id, op_name, log=None, test_mode=False):
     """
@@ -61,6 +66,19 @@ def get_op_data(agent_id, op_name, log=None, test_mode=False):
         - ``no_active_session``: This means the operation specified exists but
            was never run.
         - ``ok``: Operation and session.data exist
+
+        When queried through an ``OpDataPoller``, the status can also be:
+
+        - ``cached``: The query did not complete within the poll timeout, and
+          ``data`` is the session data from the last successful query.
+        - ``timeout``: The query did not complete within the poll timeout, and
+          there is no recent enough successful query to use instead.
+        - ``query_error``: The query raised an unexpected exception.
+
+        When the supervisor subscribes to feeds, the status can also be:
+
+        - ``feed``: ``data`` was built from the data published on the agent's
+          feed, in the same format as the session data (see ``FeedSource``).
     """
     if log is None:
         log = txaio.make_logger()  # pylint: disable=E1101
@@ -105,6 +123,235 @@ def get_op_data(agent_id, op_name, log=None, test_mode=False):
     return data
 
 
+class OpDataPoller:
+    """
+    Queries the session data of agent operations concurrently, using
+    ``get_op_data``, so that the time taken by each poll is bounded by
+    ``timeout``, rather than by the sum of the time taken by each query.
+
+    A query that does not complete within the timeout keeps running in the
+    background, and is not repeated until it completes. Meanwhile, the last
+    successful reply for the operation is used instead, if it is no older
+    than ``max_cache_age``.
+
+    Args
+    ------
+    timeout : float
+        Max time to wait for the queries of each poll [sec]
+    max_cache_age : float
+        Max age of the last successful reply to use in place of a query that
+        did not complete [sec]
+    """
+
+    def __init__(self, timeout: float = 5.0, max_cache_age: float = 30.0) -> None:
+        self.timeout = timeout
+        self.max_cache_age = max_cache_age
+        self.log = txaio.make_logger()  # pylint: disable=E1101
+
+        # Queries in progress or completed since the last poll, as
+        # {(agent_id, op_name): (start time, future)}
+        self._queries: Dict[Tuple[str, str], Tuple[float, Future]] = {}
+        # Last successful reply for each operation
+        self._cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _query(self, agent_id: str, op_name: str, future: Future) -> None:
+        start = time.time()
+        try:
+            op = get_op_data(agent_id, op_name, log=self.log)
+        except Exception as e:
+            self.log.error("Error querying {agent_id}.{op_name}: {e}",
+                           agent_id=agent_id, op_name=op_name, e=e)
+            op = {'agent_id': agent_id, 'op_name': op_name, 'timestamp': start,
+                  'data': None, 'status': 'query_error'}
+        op['latency'] = time.time() - start
+        if op['status'] == 'ok':
+            self._cache[(agent_id, op_name)] = op
+        future.set_result(op)
+
+    def _start_query(self, agent_id: str, op_name: str) -> Tuple[float, Future]:
+        key = (agent_id, op_name)
+        query = self._queries.get(key)
+        if query is None or query[1].done():
+            future: Future = Future()
+            # Daemon threads, so that a hung request can't block shutdown
+            threading.Thread(target=self._query, args=(agent_id, op_name, future),
+                             daemon=True).start()
+            query = (time.time(), future)
+            self._queries[key] = query
+        return query
+
+    def poll(self, queries: Dict[str, Tuple[Optional[str], str, bool]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Queries operations concurrently, waiting at most ``timeout`` seconds
+        for them to complete.
+
+        Args
+        -----
+        queries : dict
+            Operations to query, as ``{name: (agent_id, op_name, test_mode)}``
+
+        Returns
+        --------
+        Dictionary of the op data of each operation (see ``get_op_data``),
+        by name, with the additional fields:
+
+        latency : float
+            Time taken by the query, or waited for it so far if it did not
+            complete [sec]
+        age : float
+            Time since the query that returned ``data`` was made [sec]. This
+            is None if there is no data.
+        """
+        ops = {}
+        started = {}
+        for name, (agent_id, op_name, test_mode) in queries.items():
+            if agent_id is None or test_mode:
+                # These don't connect to the agent
+                ops[name] = get_op_data(agent_id, op_name, log=self.log,
+                                        test_mode=test_mode)
+                ops[name]['latency'] = 0.
+            else:
+                started[name] = self._start_query(agent_id, op_name)
+
+        wait([future for _, future in started.values()], timeout=self.timeout)
+
+        now = time.time()
+        for name, (start, future) in started.items():
+            if future.done():
+                ops[name] = dict(future.result())
+                continue
+
+            agent_id, op_name, _ = queries[name]
+            cached = self._cache.get((agent_id, op_name))
+            if cached is not None and now - cached['timestamp'] <= self.max_cache_age:
+                op = dict(cached, status='cached')
+            else:
+                self.log.warn("Timed out querying {agent_id}.{op_name}",
+                              agent_id=agent_id, op_name=op_name)
+                op = {'agent_id': agent_id, 'op_name': op_name, 'timestamp': start,
+                      'data': None, 'status': 'timeout'}
+            op['latency'] = now - start
+            ops[name] = op
+
+        for op in ops.values():
+            op['age'] = None if op['data'] is None else now - op['timestamp']
+        return ops
+
+
+class FeedSource:
+    """
+    Keeps the latest values of fields published on an agent's OCS feed, and
+    presents them like the session data of the operation that publishes them,
+    so that they can be used in place of polling it.
+
+    Args
+    ------
+    instance_id : str
+        Instance ID of the agent
+    op_name : str
+        Operation that publishes the feed
+    feed_name : str
+        Name of the feed
+    fields : tuple of str
+        Fields to keep. A field is kept if its name starts with one of these.
+    to_session_data : callable
+        Function converting the kept fields, as ``{field: (value,
+        timestamp)}``, to session data in the format of ``op_name``.
+
+    Attributes
+    ------------
+    values : dict
+        Latest value and timestamp of each field kept, as ``{field: (value,
+        timestamp)}``
+    last_timestamp : float
+        Latest timestamp of the fields kept
+    interval : float
+        Time between the last two timestamps of the fields kept
+    """
+
+    def __init__(self, instance_id: str, op_name: str, feed_name: str,
+                 fields: Tuple[str, ...],
+                 to_session_data: Callable[[Dict[str, Tuple[Any, float]]], Dict[str, Any]]) -> None:
+        self.instance_id = instance_id
+        self.op_name = op_name
+        self.feed_name = feed_name
+        self.fields = tuple(fields)
+        self.to_session_data = to_session_data
+
+        self.values: Dict[str, Tuple[Any, float]] = {}
+        self.last_timestamp: Optional[float] = None
+        self.interval: Optional[float] = None
+        self.lock = threading.Lock()
+
+    @property
+    def address(self) -> str:
+        return f'observatory.{self.instance_id}.feeds.{self.feed_name}'
+
+    def on_message(self, message) -> bool:
+        """
+        Keeps the fields of interest from a message published on the feed.
+
+        Args
+        -----
+        message : tuple
+            (data, feed) as received by a subscriber to the feed, where data
+            contains the blocks published, as ``{block_name: {'timestamps':
+            [...], 'data': {field: [...]}}}``
+
+        Returns
+        --------
+        True if any field of interest was updated.
+        """
+        data, _ = message
+        updated = False
+        with self.lock:
+            for block in data.values():
+                timestamps = block.get('timestamps')
+                if not timestamps:
+                    continue
+                t = timestamps[-1]
+                fields = [k for k in block['data'] if k.startswith(self.fields)]
+                if not fields:
+                    continue
+                for k in fields:
+                    self.values[k] = (block['data'][k][-1], t)
+                updated = True
+                if self.last_timestamp is None:
+                    self.last_timestamp = t
+                elif t > self.last_timestamp:
+                    self.interval = t - self.last_timestamp
+                    self.last_timestamp = t
+        return updated
+
+    def op_data(self, max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        Returns the latest data from the feed in the format of ``get_op_data``,
+        with status ``feed``, or None if the feed is stale.
+
+        Args
+        -----
+        max_age : float
+            The feed is stale if nothing has been published on it for longer
+            than this, or than twice the interval between its last two
+            messages, if that is longer [sec].
+        """
+        now = time.time()
+        with self.lock:
+            if self.last_timestamp is None:
+                return None
+            age = now - self.last_timestamp
+            if self.interval is not None:
+                max_age = max(max_age, 2 * self.interval)
+            if age > max_age:
+                return None
+            data = self.to_session_data(dict(self.values))
+            timestamp = self.last_timestamp
+
+        return {'agent_id': self.instance_id, 'op_name': self.op_name,
+                'timestamp': timestamp, 'data': data, 'status': 'feed',
+                'latency': 0., 'age': age}
+
+
 @dataclass
 class HWPClients:
     encoder: Optional[OCSClient] = None
@@ -151,6 +398,8 @@ class GripperState:
     last_updated: Optional[float] = None
     gripper_max_time_since_update: float = 60.0
 
+    op_name = 'monitor_state'
+
     def _verify_update_time(self) -> None:
         """
         Will check if gripper state has been updated within the allowed time.
@@ -161,9 +410,14 @@ class GripperState:
         elif time.time() - self.last_updated > self.gripper_max_time_since_update:
             self.grip_state = 'unknown'
 
-    def update(self) -> None:
-        op = get_op_data(self.instance_id, 'monitor_state', test_mode=False)
-        if op['status'] != 'ok':
+    def update(self, op: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Updates the gripper state from the op data of the gripper agent's
+        ``monitor_state`` process, which is queried if not given.
+        """
+        if op is None:
+            op = get_op_data(self.instance_id, self.op_name, test_mode=False)
+        if op['status'] not in OP_DATA_STATUSES:
             self._verify_update_time()
             return
 
@@ -199,13 +453,16 @@ class IBootState:
     outlet_state: Dict[int, Optional[int]] = None
     op_data: Optional[Dict] = None
 
+    op_name = 'acq'
+
     def __post_init__(self):
         self.outlet_state = {o: None for o in self.outlets}
 
-    def update(self):
-        op = get_op_data(self.instance_id, 'acq', test_mode=False)
+    def update(self, op=None):
+        if op is None:
+            op = get_op_data(self.instance_id, self.op_name, test_mode=False)
         self.op_data = op
-        if op['status'] != 'ok':
+        if op['status'] not in OP_DATA_STATUSES:
             self.outlet_state = {o: None for o in self.outlets}
             return
 
@@ -290,13 +547,16 @@ class ACUState:
     use_acu_blocking: bool = False
     block_motion_timeout: float = 60.0
 
+    op_name = 'monitor'
+
     def set_request_block_motion(self, state: bool) -> None:
         self.request_block_motion = state
         self.request_block_motion_timestamp = time.time()
 
-    def update(self):
-        op = get_op_data(self.instance_id, 'monitor')
-        if op['status'] != 'ok':
+    def update(self, op=None):
+        if op is None:
+            op = get_op_data(self.instance_id, self.op_name)
+        if op['status'] not in OP_DATA_STATUSES:
             return
 
         d = op['data'].get("StatusDetailed")
@@ -312,7 +572,7 @@ class ACUState:
 
         t = d.get('timestamp_agent')
         if t is None:
-            t = time.time()
+            t = op['timestamp']
         self.last_updated = t
 
 
@@ -369,8 +629,24 @@ class HWPState:
 
     supervisor_control_state: Optional[Dict[str, Any]] = None
 
+    poll_timeout: float = 5.0
+    poll_max_cache_age: float = 30.0
+
+    subscribe_feeds: bool = False
+    feed_max_age: float = 10.0
+
     def __post_init__(self) -> None:
         self.lock: threading.Semaphore = threading.Semaphore()
+        self.poller = OpDataPoller(timeout=self.poll_timeout,
+                                   max_cache_age=self.poll_max_cache_age)
+
+        # Set whenever a feed message updates a FeedSource
+        self.feed_event = threading.Event()
+        self.feed_sources: Dict[str, FeedSource] = {}
+        if self.subscribe_feeds:
+            self.feed_sources = self._make_feed_sources()
+        # Latest op data of each monitored operation
+        self._ops: Dict[str, Dict[str, Any]] = {}
 
     @classmethod
     def from_args(cls, args: argparse.Namespace) -> "HWPState":
@@ -386,6 +662,10 @@ class HWPState:
             ups_minutes_remaining_thresh=args.ups_minutes_remaining_thresh,
             pid_max_time_since_update=args.pid_max_time_since_update,
             forward_is_cw=args.forward_dir == 'cw',
+            poll_timeout=args.poll_timeout,
+            poll_max_cache_age=args.poll_max_cache_age,
+            subscribe_feeds=args.subscribe_feeds,
+            feed_max_age=args.feed_max_age,
         )
 
         if args.gripper_iboot_id is not None:
@@ -426,7 +706,7 @@ class HWPState:
         return self
 
     def _update_from_keymap(self, op, keymap):
-        if op['status'] != 'ok':
+        if op['status'] not in OP_DATA_STATUSES:
             for k in keymap:
                 setattr(self, k, None)
             return
@@ -434,17 +714,18 @@ class HWPState:
         for k, v in keymap.items():
             setattr(self, k, op['data'].get(v))
 
-    def update_enc_state(self, test_mode=False):
+    def update_enc_state(self, op=None, test_mode=False):
         """
         Updates state values from the encoder acq operation results.
 
         Args
         -----
-        op : dict
+        op : dict, optional
             Dict containing the operations (from get_op_data) from the encoder
             ``acq`` process
         """
-        op = get_op_data(self.enc_instance_id, 'acq', test_mode=test_mode)
+        if op is None:
+            op = get_op_data(self.enc_instance_id, 'acq', test_mode=test_mode)
         self._update_from_keymap(op, {
             'enc_freq': 'approx_hwp_freq',
             'encoder_last_updated': 'encoder_last_updated',
@@ -453,18 +734,19 @@ class HWPState:
         })
         return op
 
-    def update_temp_state(self, test_mode=False):
+    def update_temp_state(self, op=None, test_mode=False):
         """
         Updates state values from the Lakeshore acq operation results.
 
         Args
         -----
-        op : dict
+        op : dict, optional
             Dict containing the operations (from get_op_data) from the lakeshore
             ``acq`` process
         """
-        op = get_op_data(self.lakeshore_instance_id, 'acq', test_mode=test_mode)
-        if op['status'] != 'ok':
+        if op is None:
+            op = get_op_data(self.lakeshore_instance_id, 'acq', test_mode=test_mode)
+        if op['status'] not in OP_DATA_STATUSES:
             self.temp = None
             self.temp_status = 'no_data'
             return op
@@ -486,33 +768,35 @@ class HWPState:
             self.temp_status = 'ok'
         return op
 
-    def update_pmx_state(self, test_mode=False):
+    def update_pmx_state(self, op=None, test_mode=False):
         """
         Updates state values from the pmx main operation results.
 
         Args
         -----
-        op : dict
+        op : dict, optional
             Dict containing the operations (from get_op_data) from the pmx
             ``main`` process
         """
-        op = get_op_data(self.pmx_instance_id, 'main', test_mode=test_mode)
+        if op is None:
+            op = get_op_data(self.pmx_instance_id, 'main', test_mode=test_mode)
         keymap = {'pmx_current': 'curr', 'pmx_voltage': 'volt',
                   'pmx_source': 'source', 'pmx_last_updated': 'last_updated'}
         self._update_from_keymap(op, keymap)
         return op
 
-    def update_pid_state(self, test_mode=False):
+    def update_pid_state(self, op=None, test_mode=False):
         """
         Updates state values from the pid main operation results.
 
         Args
         -----
-        op : dict
+        op : dict, optional
             Dict containing the operations (from get_op_data) from the pid
             ``main`` process
         """
-        op = get_op_data(self.pid_instance_id, 'main', test_mode=test_mode)
+        if op is None:
+            op = get_op_data(self.pid_instance_id, 'main', test_mode=test_mode)
         self._update_from_keymap(op, {
             'pid_current_freq': 'current_freq',
             'pid_target_freq': 'target_freq',
@@ -521,17 +805,18 @@ class HWPState:
         })
         return op
 
-    def update_ups_state(self, test_mode=False):
+    def update_ups_state(self, op=None, test_mode=False):
         """
         Updates state values from the UPS acq operation results.
 
         Args
         -----
-        op : dict
+        op : dict, optional
             Dict containing the operations (from get_op_data) from the UPS
             ``acq`` process
         """
-        op = get_op_data(self.ups_instance_id, 'acq', test_mode=test_mode)
+        if op is None:
+            op = get_op_data(self.ups_instance_id, 'acq', test_mode=test_mode)
         ups_keymap = {
             'ups_output_source': ('upsOutputSource', 'description'),
             'ups_estimated_minutes_remaining': ('upsEstimatedMinutesRemaining', 'status'),
@@ -540,10 +825,10 @@ class HWPState:
             'ups_battery_current': ('upsBatteryCurrent', 'status'),
         }
 
-        if op['status'] != 'ok':
+        if op['status'] not in OP_DATA_STATUSES:
             for k in ups_keymap:
                 setattr(self, k, None)
-            return
+            return op
 
         # get oid
         data = op['data']
@@ -554,13 +839,14 @@ class HWPState:
         else:
             for k in ups_keymap:
                 setattr(self, k, None)
-            return
+            return op
 
         for k, f in ups_keymap.items():
             setattr(self, k, data[f'{f[0]}_{ups_oid}'][f[1]])
 
         self.ups_last_connection_attempt = data['ups_connection']['last_attempt']
         self.ups_connected = data['ups_connection']['connected']
+        return op
 
     def update_spin_state(self):
         """
@@ -616,29 +902,160 @@ class HWPState:
 
         return 'ok'
 
-    def update(self, test_mode=False) -> Dict[str, Any]:
+    def _make_feed_sources(self) -> Dict[str, FeedSource]:
+        """
+        Returns the FeedSource for each monitored agent that publishes the
+        state info on a feed, by the name of its op data.
+        """
+        sources = {}
+
+        if self.enc_instance_id is not None:
+            def enc_data(values):
+                data = {}
+                if 'approx_hwp_freq' in values:
+                    data['approx_hwp_freq'], data['encoder_last_updated'] = \
+                        values['approx_hwp_freq']
+                if 'quad' in values:
+                    data['last_quad'], data['last_quad_time'] = values['quad']
+                return data
+            sources['encoder'] = FeedSource(
+                self.enc_instance_id, 'acq', 'HWPEncoder',
+                ('approx_hwp_freq', 'quad'), enc_data)
+
+        if self.lakeshore_instance_id is not None and self.temp_field is not None:
+            temp_key = f'{self.temp_field}_T'
+
+            def temp_data(values):
+                if temp_key not in values:
+                    return {'fields': {}}
+                return {'fields': {self.temp_field: {'T': values[temp_key][0]}}}
+            sources['temperature'] = FeedSource(
+                self.lakeshore_instance_id, 'acq', 'temperatures', (temp_key,),
+                temp_data)
+
+        if self.pmx_instance_id is not None:
+            def pmx_data(values):
+                data = {}
+                for k, feed_field in [('curr', 'current'), ('volt', 'voltage'),
+                                      ('source', 'source')]:
+                    if feed_field in values:
+                        data[k], t = values[feed_field]
+                        data['last_updated'] = max(t, data.get('last_updated', t))
+                return data
+            sources['pmx'] = FeedSource(
+                self.pmx_instance_id, 'main', 'hwppmx',
+                ('current', 'voltage', 'source'), pmx_data)
+
+        if self.pid_instance_id is not None:
+            def pid_data(values):
+                data = {}
+                for k in ['current_freq', 'target_freq', 'direction']:
+                    if k in values:
+                        data[k], t = values[k]
+                        data['last_updated'] = max(t, data.get('last_updated', t))
+                return data
+            sources['pid'] = FeedSource(
+                self.pid_instance_id, 'main', 'hwppid',
+                ('current_freq', 'target_freq', 'direction'), pid_data)
+
+        if self.ups_instance_id is not None:
+            def ups_data(values):
+                data = {}
+                last_updated = 0.
+                for k, (v, t) in values.items():
+                    if k.endswith('_description'):
+                        continue
+                    description = values.get(f'{k}_description', (None,))[0]
+                    data[k] = {'status': v, 'description': description}
+                    last_updated = max(last_updated, t)
+                data['ups_connection'] = {'last_attempt': last_updated,
+                                          'connected': True}
+                return data
+            sources['ups'] = FeedSource(
+                self.ups_instance_id, 'acq', 'ups',
+                ('upsOutputSource', 'upsEstimatedMinutesRemaining',
+                 'upsEstimatedChargeRemaining', 'upsBatteryVoltage',
+                 'upsBatteryCurrent'), ups_data)
+
+        return sources
+
+    def on_feed_message(self, name: str, message) -> None:
+        """
+        Handles a message published on the feed of the FeedSource ``name``,
+        and sets ``feed_event`` if it updated the source.
+        """
+        if self.feed_sources[name].on_message(message):
+            self.feed_event.set()
+
+    def _op_queries(self, test_mode=False):
+        """
+        Returns the operations to query for an update, as
+        ``{name: (agent_id, op_name, test_mode)}``.
+        """
+        queries = {
+            'temperature': (self.lakeshore_instance_id, 'acq', test_mode),
+            'encoder': (self.enc_instance_id, 'acq', test_mode),
+            'pmx': (self.pmx_instance_id, 'main', test_mode),
+            'pid': (self.pid_instance_id, 'main', test_mode),
+            'ups': (self.ups_instance_id, 'acq', False),
+        }
+        for name in ['driver_iboot', 'gripper_iboot', 'acu', 'gripper']:
+            state = getattr(self, name)
+            if state is not None:
+                queries[name] = (state.instance_id, state.op_name, False)
+        return queries
+
+    def update(self, test_mode=False, poll=True) -> Dict[str, Any]:
+        """
+        Updates the state from the latest feed data of monitored agents, if
+        subscribed to their feeds, and queries the other monitored operations
+        concurrently.
+
+        Args
+        -----
+        test_mode : bool
+            If True, operations will not be queried, and feeds are not used.
+        poll : bool
+            If False, only the operations with feed data are updated, and the
+            others keep their state from the last update.
+
+        Returns
+        --------
+        Dictionary of the latest op data of each operation (see
+        ``get_op_data`` and ``OpDataPoller.poll``)
+        """
         now = time.time()
         with self.lock:
-            ops = {
-                'temperature': self.update_temp_state(test_mode=test_mode),
-                'encoder': self.update_enc_state(test_mode=test_mode),
-                'pmx': self.update_pmx_state(test_mode=test_mode),
-                'pid': self.update_pid_state(test_mode=test_mode),
-                'ups': self.update_ups_state(),
+            queries = self._op_queries(test_mode=test_mode)
+            ops = {}
+            if not test_mode:
+                for name, source in self.feed_sources.items():
+                    op = source.op_data(self.feed_max_age)
+                    if op is not None:
+                        ops[name] = op
+                        del queries[name]
+            if poll:
+                ops.update(self.poller.poll(queries))
+
+            updaters = {
+                'temperature': self.update_temp_state,
+                'encoder': self.update_enc_state,
+                'pmx': self.update_pmx_state,
+                'pid': self.update_pid_state,
+                'ups': self.update_ups_state,
             }
-            self.update_spin_state()
+            for name in ['driver_iboot', 'gripper_iboot', 'acu', 'gripper']:
+                state = getattr(self, name)
+                if state is not None:
+                    updaters[name] = state.update
 
+            for name, op in ops.items():
+                updaters[name](op)
+            self.update_spin_state()
             self.last_updated = now
-            if self.driver_iboot is not None:
-                self.driver_iboot.update()
-            if self.gripper_iboot is not None:
-                self.gripper_iboot.update()
-            if self.acu is not None:
-                self.acu.update()
-            if self.gripper is not None:
-                self.gripper.update()
 
-        return ops
+            self._ops.update(ops)
+            return dict(self._ops)
 
     @property
     def gripper_action(self):
@@ -1553,6 +1970,12 @@ class HWPSupervisor:
 
         self.agent.register_feed('actions', record=True)
 
+        for name, source in self.hwp_state.feed_sources.items():
+            self.agent.subscribe_on_start(
+                lambda message, name=name: self.hwp_state.on_feed_message(name, message),
+                source.address,
+            )
+
     def _get_hwp_clients(self):
         def get_client(id):
             args = []
@@ -1598,10 +2021,17 @@ class HWPSupervisor:
 
         This operation has three main steps:
 
-        - Query session data for all HWP and HWP adjacent agents. Session info for each
+        - Query session data for all HWP and HWP adjacent agents. The agents are
+          queried concurrently, and a query that takes longer than
+          ``--poll-timeout`` is replaced by its last successful reply, so a slow
+          agent doesn't delay the monitor. Session info for each
           queried operation will be stored in the ``monitored_sessions`` field of the
-          session data. See the docs for the ``get_op_data`` function for information on
-          what info will be saved.
+          session data. See the docs for the ``get_op_data`` function and
+          ``OpDataPoller.poll`` method for information on what info will be saved.
+          With ``--subscribe-feeds``, the encoder, temperature, UPS, PMX and PID
+          state is instead taken from the data published on their feeds as
+          it arrives, and their sessions are only queried when their feeds go
+          stale (see ``--feed-max-age``).
         - Parse session-data from monitored operations to create the ``state`` dict,
           containing info such as ``ybco_temp`` and ``hwp_freq``.
         - Determine subsystem actions based on the HWP state, which will be stored in
@@ -1620,12 +2050,18 @@ class HWPSupervisor:
                         'data': <session data for test.acq>,
                         'op_name': 'acq',
                         'status': 'ok',  # See ``get_op_data`` docstring for choices
-                        'timestamp': 1680273288.6200094},
+                        'timestamp': 1680273288.6200094,
+                        'latency': 0.0112,  # Time taken by the query [sec]
+                        'age': 0.0113},  # Time since the data was queried [sec]
                     },
                     'temperature': {see above},
                     'ups': {see above},
                     'pmx': {see above},
-                    'pid': {see above}}
+                    'pid': {see above},
+                    'driver_iboot': {see above},  # If configured
+                    'gripper_iboot': {see above},  # If configured
+                    'acu': {see above},  # If configured
+                    'gripper': {see above}}  # If configured
                 # State data parsed from monitored sessions
                 'state': {
                     'acu': None,
@@ -1702,11 +2138,17 @@ class HWPSupervisor:
             }
         }
 
+        next_poll_time = 0.
+        last_actions = None
+
         while session.status in ['starting', 'running']:
             now = time.time()
             session.data['timestamp'] = now
 
-            ops = self.hwp_state.update(test_mode=test_mode)
+            poll = now >= next_poll_time
+            if poll:
+                next_poll_time = now + self.sleep_time
+            ops = self.hwp_state.update(test_mode=test_mode, poll=poll)
             session.data['monitored_sessions'] = ops
             session.data['hwp_state'] = asdict(self.hwp_state)
 
@@ -1744,12 +2186,21 @@ class HWPSupervisor:
                     'shutdown_enabled': int(self.shutdown_enabled),
                 },
             }
-            self.agent.publish_to_feed('actions', data)
+            # Updates from feeds between polls are only published if they
+            # change the actions
+            if poll or data['data'] != last_actions:
+                self.agent.publish_to_feed('actions', data)
+                last_actions = data['data']
 
             if test_mode:
                 break
 
-            pm.sleep()
+            if self.hwp_state.feed_sources:
+                # Wake up for feed data, or the next poll
+                self.hwp_state.feed_event.wait(max(next_poll_time - time.time(), 0))
+                self.hwp_state.feed_event.clear()
+            else:
+                pm.sleep()
 
         return True, "Monitor process stopped"
 
@@ -2232,6 +2683,25 @@ def make_parser(parser=None):
     pgroup = parser.add_argument_group('Agent Options')
 
     pgroup.add_argument('--sleep-time', type=float, default=2.)
+    pgroup.add_argument(
+        '--poll-timeout', type=float, default=5.0,
+        help="Max time (sec) to wait for the monitored agents to reply to "
+             "each status query.")
+    pgroup.add_argument(
+        '--poll-max-cache-age', type=float, default=30.0,
+        help="Max age (sec) of the last reply from a monitored agent to use "
+             "when its status query times out.")
+    pgroup.add_argument(
+        '--subscribe-feeds', action='store_true',
+        help="If set, the encoder, temperature, UPS, PMX and PID state will be "
+             "updated from the data published on their feeds, instead of by "
+             "querying their session data.")
+    pgroup.add_argument(
+        '--feed-max-age', type=float, default=10.0,
+        help="Time (sec) without data on a subscribed feed after which the "
+             "agent's session data is queried instead. This is extended to "
+             "twice the interval between the feed's last two messages, if "
+             "that is longer.")
     pgroup.add_argument('--ybco-lakeshore-id',
                         help="Instance ID for lakeshore reading out HWP temp")
     pgroup.add_argument('--ybco-temp-field',
@@ -272,22 +272,17 @@ class ibootbarAgent:
                 get_list.append((self.ibootbar_type + '-MIB', 'outletStatus', i))
                 name_list.append((self.ibootbar_type + '-MIB', 'outletName', i))
 
-            # Issue SNMP GET commands
-            get_result = yield self.snmp.get(get_list, self.version)
-            if get_result is None:
+            # Issue a single SNMP GET command for the states and names
+            result = yield self.snmp.get(get_list + name_list, self.version)
+            if result is None:
                 self.connected = False
                 session.data['ibootbar_connection'] = {'last_attempt': time.time(),
                                                        'connected': False}
                 continue
             self.connected = True
 
-            name_result = yield self.snmp.get(name_list, self.version)
-            if name_result is None:
-                self.connected = False
-                session.data['ibootbar_connection'] = {'last_attempt': time.time(),
-                                                       'connected': False}
-                continue
-            self.connected = True
+            get_result = result[:len(get_list)]
+            name_result = result[len(get_list):]
             for item in name_result:
                 names.append(item[1].prettyPrint())
 
@@ -88,6 +88,42 @@ class LabJackFunctions:
 
     def __init__(self):
         self.log = txaio.make_logger()
+        self._RtoT = None
+
+    def compile(self, function_info):
+        """
+        Prepares the unit conversion described by function information from
+        the labjack_config.yaml file, so that it can be applied repeatedly
+        without parsing the function again.
+
+        Args:
+            function_info (dict):
+                Specifies the type of function. If custom, also gives the function.
+
+        Returns:
+            function: Takes a voltage array and returns the converted values
+            (as an array of the same shape) and their units.
+
+        """
+        if function_info["user_defined"] == 'False':
+            return getattr(self, function_info['type'])
+
+        # Custom function, compiled once for a float64 array 'v'. The
+        # function may also be a constant, not depending on 'v' at all.
+        units = function_info['units']
+        func = function_info["function"]
+        names = numexpr.NumExpr(func).input_names
+        if set(names) - {'v'}:
+            raise ValueError(f"Custom function '{func}' may only depend on "
+                             "the voltage, 'v'.")
+        expr = numexpr.NumExpr(func, signature=[(n, np.float64) for n in names])
+
+        def function(v_array):
+            v_array = np.asarray(v_array, dtype=np.float64)
+            if names:
+                return expr(v_array), units
+            return np.full(v_array.shape, expr()), units
+        return function
 
     def unit_conversion(self, v_array, function_info):
         """
@@ -101,27 +137,30 @@ class LabJackFunctions:
             function_info (dict):
                 Specifies the type of function. If custom, also gives the function.
         """
-        if function_info["user_defined"] == 'False':
-            function = getattr(self, function_info['type'])
-            return function(v_array)
-
-        # Custom function evaluation
-        else:
-            units = function_info['units']
-            new_values = []
-            for v in v_array:
-                new_values.append(float(numexpr.evaluate(function_info["function"])))
-            return new_values, units
+        return self.compile(function_info)(v_array)
 
     def MKS390(self, v_array):
         """
         Conversion function for the MKS390 Micro-Ion ATM
         Modular Vaccum Gauge.
         """
-        value = 1.3332 * 10**(2 * v_array - 11)
+        value = 1.3332 * np.power(10., 2 * np.asarray(v_array) - 11)
         units = 'mBar'
         return value, units
 
+    def _load_warm_therm_cal(self):
+        # Import the Ohms to Celsius cal curve and set up cubic
+        # interpolation, once.
+        if self._RtoT is None:
+            cal_curves = os.path.join(os.path.dirname(__file__),
+                                      'cal_curves/GA10K4D25_cal_curve.txt')
+            with open(cal_curves) as f:
+                lists = list(csv.reader(f, delimiter=' '))
+            T_cal = np.array([float(RT[0]) for RT in lists[1:]])
+            R_cal = np.array([float(RT[1]) for RT in lists[1:]])
+            self._RtoT = interp1d(np.flip(R_cal), np.flip(T_cal), kind='cubic')
+        return self._RtoT
+
     def warm_therm(self, v_array):
         """
         Conversion function for SO warm thermometry readout.
@@ -131,32 +170,71 @@ class LabJackFunctions:
         for the thermistor model, serial number 10K4D25.
         """
         # LJTick voltage to resistance conversion
+        v_array = np.asarray(v_array, dtype=np.float64)
         R = (2.5 - v_array) * 10000 / v_array
 
-        # Import the Ohms to Celsius cal curve and apply cubic
-        # interpolation to find the temperature
-        cal_curves = os.path.join(os.path.dirname(__file__),
-                                  'cal_curves/GA10K4D25_cal_curve.txt')
-        reader = csv.reader(open(cal_curves),
-                            delimiter=' ')
-        lists = [el for el in [row for row in reader]]
-        T_cal = np.array([float(RT[0]) for RT in lists[1:]])
-        R_cal = np.array([float(RT[1]) for RT in lists[1:]])
-        T_cal = np.flip(T_cal)
-        R_cal = np.flip(R_cal)
+        RtoT = self._load_warm_therm_cal()
         try:
-            RtoT = interp1d(R_cal, T_cal, kind='cubic')
             values = RtoT(R)
 
         except ValueError:
             self.log.error('Temperature outside thermometer range')
-            values = -1000 + np.zeros(len(R))
+            values = -1000 + np.zeros(np.shape(R))
 
         units = 'C'
 
         return values, units
 
 
+def _stream_blocks(raw_data, chs, conversions, timestamps):
+    """
+    Builds the data blocks to publish from one stream read.
+
+    Args:
+        raw_data (list):
+            Samples from the read, in the form ['AIN0_1', 'AIN1_1',
+            'AIN0_2', ...].
+        chs (list):
+            Names of the channels in the stream.
+        conversions (list):
+            Tuples (i, ch, conversion) of the index and name of each
+            channel with a unit conversion, and the compiled conversion.
+        timestamps (np.array):
+            Time of each scan in the read.
+
+    Returns:
+        tuple: The block for the 'sensors' feed, with every sample, and
+        the block for the 'sensors_downsampled' feed, with the mean of
+        each column over the read, at the mean time of its samples.
+
+    """
+    # Each row is a scan and each column a channel.
+    num_scans = len(timestamps)
+    output = np.asarray(raw_data, dtype=np.float64)
+    output = output.reshape(num_scans, len(chs))
+
+    # Rows of names and values, one for each published column
+    names = [ch + 'V' for ch in chs]
+    columns = [output.T]
+    for i, ch, conversion in conversions:
+        values, units = conversion(output[:, i])
+        names.append(ch + units)
+        columns.append(np.reshape(values, (1, num_scans)))
+    columns = np.concatenate(columns)
+
+    data = {
+        'block_name': 'sens',
+        'data': dict(zip(names, columns.tolist())),
+        'timestamps': timestamps.tolist(),
+    }
+    data_downsampled = {
+        'block_name': 'sens',
+        'data': dict(zip(names, columns.mean(axis=1).tolist())),
+        'timestamp': float(timestamps.mean()),
+    }
+    return data, data_downsampled
+
+
 class LabJackAgent:
     """Agent to collect data from LabJack device.
 
@@ -202,6 +280,10 @@ class LabJackAgent:
                     self.functions = {}
                 self.log.info(f"Applying conversion functions: {self.functions}")
 
+        # Parse the conversion functions once, rather than on every read
+        self.conversions = {ch: self.ljf.compile(info)
+                            for ch, info in self.functions.items()}
+
         self.initialized = False
         self.take_data = False
 
@@ -344,13 +426,15 @@ class LabJackAgent:
                                              ch_addrs, scan_rate_input)
             self.log.info(f"\nStream started with a scan rate of {scan_rate} Hz.")
 
+            # Offsets of the samples in each read from the time of its first
+            # sample, and conversions for the channels being read.
+            time_offsets = np.arange(scans_per_read) / scan_rate
+            conversions = [(i, ch, self.conversions[ch])
+                           for i, ch in enumerate(self.chs)
+                           if ch in self.conversions]
+
             cur_time = time.time()
             while self.take_data:
-                data = {
-                    'block_name': 'sens',
-                    'data': {}
-                }
-
                 # Query the labjack
                 try:
                     raw_output = ljm.eStreamRead(self.handle)
@@ -368,37 +452,15 @@ class LabJackAgent:
                     self.log.critical("Stopping reactor.")
                     reactor.callFromThread(reactor.stop)
                     return False, 'Acquisition failed.'
-                output = raw_output[0]
-
-                # Data comes in form ['AIN0_1', 'AIN1_1', 'AIN0_2', ...]
-                for i, ch in enumerate(self.chs):
-                    ch_output = output[i::num_chs]
-                    data['data'][ch + 'V'] = ch_output
-
-                    # Apply unit conversion function for this channel
-                    if ch in self.functions.keys():
-                        new_ch_output, units = \
-                            self.ljf.unit_conversion(np.array(ch_output),
-                                                     self.functions[ch])
-                        data['data'][ch + units] = list(new_ch_output)
 
                 # The labjack outputs at exactly the scan rate but doesn't
                 # generate timestamps. So create them here.
-                timestamps = [cur_time + i / scan_rate for i in range(scans_per_read)]
+                timestamps = cur_time + time_offsets
                 cur_time += scans_per_read / scan_rate
-                data['timestamps'] = timestamps
 
+                data, data_downsampled = _stream_blocks(
+                    raw_output[0], self.chs, conversions, timestamps)
                 self.agent.publish_to_feed('sensors', data)
-
-                # Publish to the downsampled data feed only the first
-                # timestamp and data point for each channel.
-                data_downsampled = {
-                    'block_name': 'sens',
-                    'data': {},
-                    'timestamp': timestamps[0]
-                }
-                for key, value in data['data'].items():
-                    data_downsampled['data'][key] = value[0]
                 self.agent.publish_to_feed('sensors_downsampled', data_downsampled)
                 session.data = data_downsampled
 
@@ -492,11 +554,9 @@ class LabJackAgent:
                     data['data'][ch] = ch_output
 
                     # Apply unit conversion function for this channel
-                    if ch in self.functions.keys():
-                        new_ch_output, units = \
-                            self.ljf.unit_conversion(ch_output,
-                                                     self.functions[ch])
-                        data['data'][ch + units] = new_ch_output
+                    if ch in self.conversions:
+                        new_ch_output, units = self.conversions[ch](ch_output)
+                        data['data'][ch + units] = float(new_ch_output)
 
                 data['timestamp'] = timestamp
                 self.agent.publish_to_feed('registers', data)
@@ -252,30 +252,45 @@ class LS372_Agent:
                                       f"currently held by {self._lock.job}.")
                         continue
 
+                # All queries for this iteration are sent in a single
+                # transmission. Readings are requested for the channel
+                # measured in the previous iteration, and only used if the
+                # scanner is still on that channel.
+                queries = ['SCAN?']
+                if previous_channel is not None:
+                    queries += [f'KRDG? {previous_channel.channel_num}',
+                                f'SRDG? {previous_channel.channel_num}']
+                control_chan = self.control_chan_enabled
+                if control_chan:
+                    queries += ['KRDG? A', 'SRDG? A']
+                if params.get("sample_heater", False):
+                    queries += ['HTR?']
+
                 try:
+                    resps = iter(self.module.msg_batch(queries))
+                    active_channel = self.module.get_channel_from_scan(next(resps))
+
                     # The 372 reports the last updated measurement repeatedly
                     # during the "pause change time", this results in several
                     # stale datapoints being recorded. To get around this we
                     # query the pause time and skip data collection during it
                     # if the channel has changed (as it would if autoscan is
                     # enabled.)
-                    active_channel = self.module.get_active_channel()
-
                     if previous_channel != active_channel:
                         if previous_channel is not None:
                             self._wait_for_channel_change(
                                 active_channel,
                                 previous_channel)
 
-                        # Track the last channel we measured
-                        previous_channel = self.module.get_active_channel()
+                        # Track the last channel we measured, and read it
+                        # from the next iteration on.
+                        previous_channel = active_channel
+                        continue
 
                     # Collect both temperature and resistance values from each Channel
                     channel_str = active_channel.name.replace(' ', '_')
-                    temp_reading = self.module.get_temp(unit='kelvin',
-                                                        chan=active_channel.channel_num)
-                    res_reading = self.module.get_temp(unit='ohms',
-                                                       chan=active_channel.channel_num)
+                    temp_reading = float(next(resps))
+                    res_reading = float(next(resps))
                     if session.degraded:
                         self.log.info("Connection re-established.")
                         session.degraded = False
@@ -304,19 +319,10 @@ class LS372_Agent:
                                             "timestamp": current_time}}
                 session.data['fields'].update(field_dict)
 
-                # Also queries control channel if enabled
-                if self.control_chan_enabled:
-                    try:
-                        temp = self.module.get_temp(unit='kelvin', chan=0)
-                        res = self.module.get_temp(unit='ohms', chan=0)
-                        if session.degraded:
-                            self.log.info("Connection re-established.")
-                            session.degraded = False
-                    except ConnectionError:
-                        self.log.error("Failed to get data from LS372. Check network connection.")
-                        session.degraded = True
-                        time.sleep(1)
-                        continue
+                # Also records control channel if enabled
+                if control_chan:
+                    temp = float(next(resps))
+                    res = float(next(resps))
 
                     cur_time = time.time()
                     data = {
@@ -338,17 +344,7 @@ class LS372_Agent:
 
                 if params.get("sample_heater", False):
                     # Sample Heater
-                    heater = self.module.sample_heater
-                    try:
-                        hout = heater.get_sample_heater_output()
-                        if session.degraded:
-                            self.log.info("Connection re-established.")
-                            session.degraded = False
-                    except ConnectionError:
-                        self.log.error("Failed to get data from LS372. Check network connection.")
-                        session.degraded = True
-                        time.sleep(1)
-                        continue
+                    hout = float(next(resps))
 
                     current_time = time.time()
                     htr_data = {
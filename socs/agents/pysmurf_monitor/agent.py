@@ -13,7 +13,8 @@ from ocs import ocs_agent, ocs_feed, site_config
 from twisted.internet import reactor
 from twisted.internet.protocol import DatagramProtocol
 
-from socs.db.suprsync import SupRsyncFilesManager, create_file
+from socs.db.suprsync import SupRsyncFilesManager
+from socs.util import CHECKSUM_COMMANDS
 
 
 def create_remote_path(meta: Dict[str, Any], archive_name: str) -> str:
@@ -92,6 +93,8 @@ class PysmurfMonitor(DatagramProtocol):
         echo_sql (bool):
             If True, will echo all sql statements whenever writing to the
             suprsync db.
+        checksum_algorithm (str):
+            Algorithm used to checksum registered files.
     """
 
     def __init__(self, agent: ocs_agent.OCSAgent, args: argparse.Namespace) -> None:
@@ -101,6 +104,7 @@ class PysmurfMonitor(DatagramProtocol):
         self.db_path: str = args.db_path
         self.running: bool = False
         self.echo_sql: bool = args.echo_sql
+        self.checksum_algorithm: str = args.checksum_algorithm
 
         self.agent.register_feed('pysmurf_session_data')
 
@@ -204,10 +208,8 @@ class PysmurfMonitor(DatagramProtocol):
                             if key in local_path:
                                 deletable = False
 
-                    files_to_add.append(
-                        create_file(local_path, remote_path, archive_name,
-                                    deletable=deletable)
-                    )
+                    files_to_add.append((local_path, remote_path,
+                                         archive_name, deletable))
                 except Exception as e:
                     self.agent.log.error(
                         "Could not generate SupRsync file object from "
@@ -218,8 +220,11 @@ class PysmurfMonitor(DatagramProtocol):
             if files_to_add:
                 try:
                     start = time.time()
-                    with srfm.Session.begin() as db_session:
-                        db_session.add_all(files_to_add)
+                    # Files are checksummed in parallel, and already
+                    # registered files are skipped, so a failed write can
+                    # simply be retried.
+                    srfm.add_files_bulk(files_to_add,
+                                        checksum_algorithm=self.checksum_algorithm)
                     duration = time.time() - start
                     self.log.debug(f"Database write completed in {duration:.3f} seconds")
                     session.degraded = False
@@ -262,6 +267,9 @@ def make_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.Ar
     pgroup.add_argument('--db-path', type=str, default='/data/so/databases/suprsync.db',
                         help="Path to suprsync sqlite database")
     pgroup.add_argument('--echo-sql', action='store_true')
+    pgroup.add_argument('--checksum-algorithm', default='md5',
+                        choices=list(CHECKSUM_COMMANDS),
+                        help="Checksum algorithm for registered files.")
     pgroup.add_argument("--test-mode", action='store_true',
                         help="Specifies whether agent should run in test mode, "
                         "meaning it shuts down after processing any file(s).")
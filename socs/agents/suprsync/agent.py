@@ -46,6 +46,14 @@ class SupRsync:
         Time (sec) for which cmds run on the remote will timeout
     copy_timeout : float
         Time (sec) after which a copy command will timeout
+    num_streams : int
+        Number of concurrent rsync processes used to copy each batch
+    pipeline : bool
+        If True, remote checksums for a batch are computed while the next
+        batch is being copied
+    ssh_control_persist : float, optional
+        Time (sec) to keep a shared ssh connection open after its last use.
+        If None, each command opens its own connection.
     """
 
     def __init__(self, agent: ocs_agent.OCSAgent, args: argparse.Namespace) -> None:
@@ -71,6 +79,9 @@ class SupRsync:
         self.db_pool_size: int = args.db_pool_size
         self.db_pool_max_overflow: int = args.db_pool_max_overflow
         self.chmod = args.chmod
+        self.num_streams = args.num_streams
+        self.pipeline = args.pipeline_checksums
+        self.ssh_control_persist = args.ssh_control_persist
 
         # Feed for counting transfer errors, loop iterations.
         self.agent.register_feed('transfer_stats',
@@ -116,6 +127,13 @@ class SupRsync:
                     "errors_nonzero": 0,
                     "errors_sqlite": 0
                   },
+                  "transfer_stats": {
+                    "bytes_copied": 1048576,
+                    "checksum_latency": 0.05,
+                    "stream0_bytes": 1048576,
+                    "stream0_latency": 0.02,
+                    "stream0_throughput": 52428800.0
+                  },
                 }
         """
 
@@ -130,7 +148,9 @@ class SupRsync:
             srfm, self.archive_name, self.remote_basedir, ssh_host=self.ssh_host,
             ssh_key=self.ssh_key, cmd_timeout=self.cmd_timeout,
             copy_timeout=self.copy_timeout, compression=self.compression,
-            bwlimit=self.bwlimit, chmod=self.chmod
+            bwlimit=self.bwlimit, chmod=self.chmod,
+            num_streams=self.num_streams, pipeline=self.pipeline,
+            ssh_control_persist=self.ssh_control_persist
         )
 
         self.running = True
@@ -236,11 +256,13 @@ class SupRsync:
             session.data['last_copy'] = op
             session.data['timestamp'] = now
 
+            session.data['transfer_stats'] = handler.transfer_stats
+
             if now >= next_feed_update:
                 self.agent.publish_to_feed('transfer_stats', {
                     'block_name': 'block0',
                     'timestamp': now,
-                    'data': counters})
+                    'data': dict(counters, **handler.transfer_stats)})
                 next_feed_update = now + 10 * 60
 
             # Delete transferred files from disk after specified time.
@@ -277,6 +299,12 @@ class SupRsync:
             session.data['activity'] = 'idle'
             time.sleep(self.sleep_time)
 
+        try:
+            # DB: Writes checksums for the last batch, if pipelining.
+            handler.close()
+        except (subprocess.SubprocessError, sqlalchemy.exc.OperationalError) as e:
+            self.log.error("Error while closing file handler: {e}", e=e)
+
         return True, "Stopped run process"
 
     def _stop(self, session, params=None):
@@ -338,6 +366,16 @@ def make_parser(parser=None):
                         help="Comma-separated chmod strings to apply to file permissions "
                              "on transfer. Defaults to making sure files are group-writeable "
                              "and world-readable.")
+    pgroup.add_argument('--num-streams', type=int, default=1,
+                        help="Number of concurrent rsync processes to copy "
+                             "each batch with.")
+    pgroup.add_argument('--pipeline-checksums', action='store_true',
+                        help="Compute remote checksums for a batch while the "
+                             "next batch is being copied.")
+    pgroup.add_argument('--ssh-control-persist', type=float, default=None,
+                        help="Share one ssh connection between rsync and "
+                             "remote commands, kept open for this many "
+                             "seconds after its last use.")
     return parser
 
 
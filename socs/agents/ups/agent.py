@@ -9,7 +9,7 @@ from ocs import ocs_agent, site_config
 from ocs.ocs_twisted import TimeoutLock
 from twisted.internet.defer import inlineCallbacks
 
-from socs.snmp import SNMPTwister
+from socs.snmp import SNMPPoll, SNMPTwister
 
 # For logging
 txaio.use_twisted()
@@ -98,6 +98,28 @@ def _build_message(get_result, time, blockname):
     return message
 
 
+def _table_rows(columns):
+    """Group the results of walking the columns of a table into rows.
+
+    Parameters
+    ----------
+    columns : list
+        List of pysnmp.smi.rfc1902.ObjectType results for each column, as
+        returned by SNMPTwister.walk(). The table must be indexed by a single
+        integer, such as upsInputLineIndex.
+
+    Returns
+    -------
+    rows : list
+        List of ObjectTypes in each row, in order of the row index.
+    """
+    rows = {}
+    for column in columns:
+        for item in column:
+            rows.setdefault(item[0].getOid()[-1], []).append(item)
+    return [rows[index] for index in sorted(rows)]
+
+
 def update_cache(get_result, timestamp):
     """Update the OID Value Cache.
 
@@ -187,6 +209,33 @@ class UPSAgent:
 
         self.lastGet = 0
 
+        # Create the list of OIDs to send get commands
+        oids = ['upsIdentManufacturer',
+                'upsIdentModel',
+                'upsBatteryStatus',
+                'upsSecondsOnBattery',
+                'upsEstimatedMinutesRemaining',
+                'upsEstimatedChargeRemaining',
+                'upsBatteryVoltage',
+                'upsBatteryCurrent',
+                'upsBatteryTemperature',
+                'upsOutputSource']
+        self.input_oids = ['upsInputVoltage',
+                           'upsInputCurrent',
+                           'upsInputTruePower']
+        self.output_oids = ['upsOutputVoltage',
+                            'upsOutputCurrent',
+                            'upsOutputPower',
+                            'upsOutputPercentLoad']
+
+        # Get the status OIDs, and walk the input and output tables to get
+        # however many lines the UPS has, in as few requests as possible
+        self.poll = SNMPPoll(
+            self.snmp, version,
+            get_list=[('UPS-MIB', oid, 0) for oid in oids],
+            walk_list=[('UPS-MIB', oid)
+                       for oid in self.input_oids + self.output_oids])
+
         agg_params = {
             'frame_length': 10 * 60  # [sec]
         }
@@ -324,82 +373,21 @@ class UPSAgent:
             if (read_time - self.lastGet) < 60:
                 continue
 
-            main_get_list = []
-            get_list = []
-
-            # Create the list of OIDs to send get commands
-            oids = ['upsIdentManufacturer',
-                    'upsIdentModel',
-                    'upsBatteryStatus',
-                    'upsSecondsOnBattery',
-                    'upsEstimatedMinutesRemaining',
-                    'upsEstimatedChargeRemaining',
-                    'upsBatteryVoltage',
-                    'upsBatteryCurrent',
-                    'upsBatteryTemperature',
-                    'upsOutputSource']
-
-            for oid in oids:
-                main_get_list.append(('UPS-MIB', oid, 0))
-                get_list.append(('UPS-MIB', oid, 0))
-
-            ups_get_result = yield self.snmp.get(get_list, self.version)
-            if ups_get_result is None:
+            # Issue SNMP GET and GETBULK commands
+            poll_result = yield self.poll.run()
+            if poll_result is None:
                 self.connected = False
                 continue
             self.connected = True
 
-            # Append input OIDs to GET list
-            input_oids = ['upsInputVoltage',
-                          'upsInputCurrent',
-                          'upsInputTruePower']
+            ups_get_result, columns = poll_result
+            num_input_oids = len(self.input_oids)
+            input_get_results = _table_rows(columns[:num_input_oids])
+            output_get_results = _table_rows(columns[num_input_oids:])
 
-            # Use number of input lines used to append correct number of input OIDs
-            input_num_lines = [('UPS-MIB', 'upsInputNumLines', 0)]
-            num_res = yield self.snmp.get(input_num_lines, self.version)
-            if num_res is None:
-                self.connected = False
-                continue
-            self.connected = True
-            input_get_results = []
-            inputs = num_res[0][1]._value
-            for i in range(inputs):
-                get_list = []
-                for oid in input_oids:
-                    main_get_list.append(('UPS-MIB', oid, i + 1))
-                    get_list.append(('UPS-MIB', oid, i + 1))
-                input_get_result = yield self.snmp.get(get_list, self.version)
-                input_get_results.append(input_get_result)
-
-            # Append output OIDs to GET list
-            output_oids = ['upsOutputVoltage',
-                           'upsOutputCurrent',
-                           'upsOutputPower',
-                           'upsOutputPercentLoad']
-
-            # Use number of output lines used to append correct number of output OIDs
-            output_num_lines = [('UPS-MIB', 'upsOutputNumLines', 0)]
-            num_res = yield self.snmp.get(output_num_lines, self.version)
-            if num_res is None:
-                self.connected = False
-                continue
-            self.connected = True
-            output_get_results = []
-            outputs = num_res[0][1]._value
-            for i in range(outputs):
-                get_list = []
-                for oid in output_oids:
-                    main_get_list.append(('UPS-MIB', oid, i + 1))
-                    get_list.append(('UPS-MIB', oid, i + 1))
-                output_get_result = yield self.snmp.get(get_list, self.version)
-                output_get_results.append(output_get_result)
-
-            # Issue SNMP GET command
-            get_result = yield self.snmp.get(main_get_list, self.version)
-            if get_result is None:
-                self.connected = False
-                continue
-            self.connected = True
+            get_result = list(ups_get_result)
+            for result in input_get_results + output_get_results:
+                get_result.extend(result)
 
             # Do not publish if UPS connection has dropped
             try:
@@ -7,6 +7,7 @@ from ocs import ocs_agent, site_config
 from ocs.ocs_twisted import TimeoutLock
 
 from socs.agents.wiregrid_encoder.drivers import EncoderParser
+from socs.common.encoder import count2time, decode_irig
 
 NUM_ENCODER_TO_PUBLISH = 1000
 SEC_ENCODER_TO_PUBLISH = 1
@@ -15,13 +16,6 @@ COUNTS_ON_BELT = 52000
 REFERENCE_COUNT_MAX = 2 << 15  # > that of belt on wiregrid (=nominal 52000)
 
 
-def count2time(counts, t_offset=0.):
-    t_array = np.array(counts, dtype=float) - counts[0]
-    t_array *= 5.e-9
-    t_array += t_offset
-    return t_array.tolist()
-
-
 class WiregridEncoderAgent:
     """ Agent to record the wiregrid rotary-encoder data.
     The encoder signal and IRIG timing signal is read
@@ -154,7 +148,7 @@ class WiregridEncoderAgent:
                 current_time = time.time()
 
                 # IRIG part mainly takes over CHWP scripts by H.Nishino
-                if len(self.parser.irig_queue):
+                while len(self.parser.irig_queue):
                     # IRIG data container initialization
                     irig_rdata = {
                         'timestamp': 0,
@@ -194,17 +188,11 @@ class WiregridEncoderAgent:
                     irig_rdata['data']['rising_edge_count'] = rising_edge_count
                     irig_rdata['data']['edge_diff']\
                         = rising_edge_count - self.rising_edge_count
-                    irig_rdata['data']['irig_sec']\
-                        = self.parser.de_irig(irig_info[0], 1)
-                    irig_rdata['data']['irig_min']\
-                        = self.parser.de_irig(irig_info[1], 0)
-                    irig_rdata['data']['irig_hour']\
-                        = self.parser.de_irig(irig_info[2], 0)
-                    irig_rdata['data']['irig_day']\
-                        = self.parser.de_irig(irig_info[3], 0)\
-                        + self.parser.de_irig(irig_info[4], 0) * 100
-                    irig_rdata['data']['irig_year']\
-                        = self.parser.de_irig(irig_info[5], 0)
+                    (irig_rdata['data']['irig_sec'],
+                     irig_rdata['data']['irig_min'],
+                     irig_rdata['data']['irig_hour'],
+                     irig_rdata['data']['irig_day'],
+                     irig_rdata['data']['irig_year']) = decode_irig(irig_info)
 
                     # Beagleboneblack clock frequency measured by IRIG
                     if self.rising_edge_count > 0 and irig_time > 0:
@@ -249,7 +237,7 @@ class WiregridEncoderAgent:
 
                     # End of IRIG case
 
-                if len(self.parser.encoder_queue):
+                while len(self.parser.encoder_queue):
                     enc_last_updated = current_time
                     encoder_data = self.parser.encoder_queue.popleft()
 
@@ -319,7 +307,7 @@ class WiregridEncoderAgent:
                             'wgencoder_rough', enc_rdata)
 
                         enc_fdata['timestamps'] =\
-                            count2time(pru_clock, received_time_list[0])
+                            count2time(pru_clock, received_time_list[0]).tolist()
                         enc_fdata['data']['quadrature'] = quad_data
                         enc_fdata['data']['pru_clock'] = pru_clock
                         enc_fdata['data']['reference_count'] = ref_count
@@ -1,43 +1,30 @@
-import calendar
-import select
-import socket
-import struct
 import time
 from collections import deque
 
 import numpy as np
-import txaio
 
-txaio.use_twisted()
+from socs.common.encoder import (COUNTER_HEADER, IRIG_HEADER, IRIG_PACKET_SIZE,
+                                 TIMEOUT_HEADER, TIMEOUT_PACKET_SIZE,
+                                 BBBPacketParser, combine_overflow)
 
 # should be consistent with the software on beaglebone
 COUNTER_INFO_LENGTH = 100
-# header, quad, clock[100], clock_overflow[100], refcount[100], error[100]
+# header, quad[100], clock[100], clock_overflow[100], refcount[100], error[100]
 COUNTER_PACKET_SIZE = 4 + 4 * 5 * COUNTER_INFO_LENGTH
-# header, clock, clock_overflow, info[10], synch[10], synch_overflow[10]
-IRIG_PACKET_SIZE = 132
-# header, type
-TIMEOUT_PACKET_SIZE = 8
+COUNTER_PACKET_DTYPE = np.dtype([('header', '<u4'),
+                                 ('quad', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('clock', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('overflow', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('refcount', '<u4', (COUNTER_INFO_LENGTH,)),
+                                 ('error', '<u4', (COUNTER_INFO_LENGTH,))])
 
 
-class EncoderParser:
+class EncoderParser(BBBPacketParser):
 
     def __init__(self, beaglebone_port=50007, read_chunk_size=8192):
+        super().__init__(beaglebone_port, read_chunk_size)
 
         self.encoder_queue = deque()
-        self.irig_queue = deque()
-
-        self.is_start = 1
-        self.start_time = [0, 0, 0]
-        self.current_time = 0
-
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind(('', beaglebone_port))
-
-        self.data = ''
-        self.read_chunk_size = read_chunk_size
-
-        self.log = txaio.make_logger()
 
     def check_once(self):
 
@@ -45,38 +32,43 @@ class EncoderParser:
         irig_oncetime = False
         checking_start = time.time()
         sampling_timeout = 30
+        receiver = self.receiver
 
         while True:
-            ready = select.select([self.sock], [], [], 2)
-            if ready[0]:
-                self.data = self.sock.recv(self.read_chunk_size)
-            if not self.check_data_length(0, 4):
+            if receiver.wait(2):
+                receiver.clear()
+                receiver.receive(max_packets=1)
+            if len(receiver) < 4:
                 self.log.error(
                     'Header data length error in check_once()')
-            header = self.data[0:4]
-            header = struct.unpack('<I', header)[0]
+                header = None
+            else:
+                header = receiver.header()
 
             if enc_oncetime and irig_oncetime:
                 print('---finished taking each data---')
                 break
-            if header == 0x1eaf and not enc_oncetime:  # Encoder data
-                if not self.check_data_length(0, COUNTER_PACKET_SIZE):
+            if header == COUNTER_HEADER and not enc_oncetime:  # Encoder data
+                if len(receiver) < COUNTER_PACKET_SIZE:
                     self.log.error(
                         'Failed to catch the Encoder data')
-                self.parse_counter_info(self.data[4: COUNTER_PACKET_SIZE])
-                res_bb = self.encoder_queue.popleft()
-                print('---Encoder Response---')
-                print(res_bb)
-                enc_oncetime = True
-            elif header == 0xcafe and not irig_oncetime:
-                if not self.check_data_length(0, IRIG_PACKET_SIZE):
+                else:
+                    self.parse_counter_info(
+                        receiver.unpack(COUNTER_PACKET_DTYPE))
+                    res_bb = self.encoder_queue.popleft()
+                    print('---Encoder Response---')
+                    print(res_bb)
+                    enc_oncetime = True
+            elif header == IRIG_HEADER and not irig_oncetime:
+                if len(receiver) < IRIG_PACKET_SIZE:
                     self.log.error(
                         'Failed to catch the IRIG data')
-                self.parse_irig_info(self.data[4:IRIG_PACKET_SIZE])
-                res_irig = self.irig_queue.popleft()
-                print('---IRIG Response---')
-                print(res_irig)
-                irig_oncetime = True
+                else:
+                    self.parse_irig_packet()
+                    res_irig = self.irig_queue.popleft()
+                    print('---IRIG Response---')
+                    print(res_irig)
+                    irig_oncetime = True
             else:
                 pass
 
@@ -85,167 +77,83 @@ class EncoderParser:
                 break
         # End of check_once()
 
-    def check_data_length(self, start_index, size_of_read):
-        if start_index + size_of_read > len(self.data):
-            self.data = self.data[start_index:]
-            return False
-        return True
-
     def grab_and_parse_data(self):
+        receiver = self.receiver
         while True:
-            ready = select.select([self.sock], [], [], 2)
-            if ready[0]:
-                data = self.sock.recv(self.read_chunk_size)
-                if len(self.data) > 0:
-                    self.data += data
-                else:
-                    self.data = data
+            if receiver.wait(2):
+                receiver.receive()
 
                 while True:
-                    if not self.check_data_length(0, 4):
+                    if len(receiver) < 4:
                         self.log.error(
                             'Header data length error in grab_and_parse_data()'
                         )
                         break
 
-                    header = self.data[0:4]
-                    header = struct.unpack('<I', header)[0]
+                    header = receiver.header()
 
                     # 0x1EAF = Encoder Packet
                     # 0xCAFE = IRIG Packet
                     # 0xE12A = Error Packet
 
                     # Encoder
-                    if header == 0x1eaf:
-                        if not self.check_data_length(0, COUNTER_PACKET_SIZE):
+                    if header == COUNTER_HEADER:
+                        count = receiver.count_packets(COUNTER_HEADER,
+                                                       COUNTER_PACKET_SIZE)
+                        if count == 0:
                             self.log.error(
                                 'Failed to catch the Encoder data')
                             break
                         self.parse_counter_info(
-                            self.data[4: COUNTER_PACKET_SIZE])
-                        if len(self.data) >= COUNTER_PACKET_SIZE:
-                            self.data = self.data[COUNTER_PACKET_SIZE:]
+                            receiver.unpack(COUNTER_PACKET_DTYPE, count))
 
                     # IRIG
-                    elif header == 0xcafe:
-                        if not self.check_data_length(0, IRIG_PACKET_SIZE):
+                    elif header == IRIG_HEADER:
+                        if len(receiver) < IRIG_PACKET_SIZE:
                             self.log.error(
                                 'Failed to catch the IRIG data')
                             break
-                        self.parse_irig_info(self.data[4: IRIG_PACKET_SIZE])
-                        if len(self.data) >= IRIG_PACKET_SIZE:
-                            self.data = self.data[IRIG_PACKET_SIZE:]
+                        self.parse_irig_packet()
 
-                    elif header == 0x1234:
-                        if not self.check_data_length(0, TIMEOUT_PACKET_SIZE):
+                    elif header == TIMEOUT_HEADER:
+                        # Drop only this packet, or what is left of its
+                        # datagram if it is truncated.
+                        if receiver.datagram_size() < TIMEOUT_PACKET_SIZE:
                             self.log.error(
                                 'Failed to catch the Timeout data')
-                            self.data = ''
-                            break
-                        timeout_type = self.data[4:TIMEOUT_PACKET_SIZE]
-                        timeout_type = struct.unpack('<I', timeout_type)[0]
-                        if timeout_type == 1:
-                            self.log.error('Recieved Encoder timeout packet.')
-                        elif timeout_type == 2:
-                            self.log.error('Recieved IRIG timeout packet.')
+                            receiver.skip_datagram()
                         else:
-                            self.log.error('Recieved timeout packet but '
-                                           'timeout-type(={}) is unknown type.'
-                                           .format(timeout_type))
-                        self.data = ''
-                        break
+                            timeout_type = receiver.header(4)
+                            if timeout_type == 1:
+                                self.log.error('Recieved Encoder timeout packet.')
+                            elif timeout_type == 2:
+                                self.log.error('Recieved IRIG timeout packet.')
+                            else:
+                                self.log.error('Recieved timeout packet but '
+                                               'timeout-type(={}) is unknown type.'
+                                               .format(timeout_type))
+                            receiver.consume(TIMEOUT_PACKET_SIZE)
                     else:
                         self.log.error('Bad header')
-                        self.data = ''
+                        receiver.skip_datagram()
 
-                    if len(self.data) == 0:
+                    if len(receiver) == 0:
                         break
                 break
 
-    def parse_counter_info(self, data):
-        derter = np.array(
-            struct.unpack('<' + 'LLLLL' * COUNTER_INFO_LENGTH, data))
-
-        self.encoder_queue.append(
-            (derter[0:COUNTER_INFO_LENGTH],
-             derter[COUNTER_INFO_LENGTH:2 * COUNTER_INFO_LENGTH]
-             + (derter[2 * COUNTER_INFO_LENGTH:3 * COUNTER_INFO_LENGTH] << 32),
-             derter[3 * COUNTER_INFO_LENGTH:4 * COUNTER_INFO_LENGTH],
-             derter[4 * COUNTER_INFO_LENGTH:5 * COUNTER_INFO_LENGTH],
-             time.time()))
-
-    def parse_irig_info(self, data):
-
-        unpacked_data = struct.unpack('<' + 'LL' + 'LLL' * 10, data)
-        rising_edge_time = unpacked_data[0] + (unpacked_data[1] << 32)
-        irig_info = unpacked_data[2:12]
-        irig_time = self.pretty_print_irig_info(irig_info, rising_edge_time)
-        synch_pulse_clock_times = (np.asarray(unpacked_data[12:22])
-                                   + (np.asarray(unpacked_data[22:32]) << 32)
-                                   ).tolist()
-        self.irig_queue.append((rising_edge_time, irig_time, irig_info,
-                                synch_pulse_clock_times, time.time()))
-
-    def pretty_print_irig_info(self, irig_info, edge, print_out=False):
-
-        secs = self.de_irig(irig_info[0], 1)
-        mins = self.de_irig(irig_info[1], 0)
-        hours = self.de_irig(irig_info[2], 0)
-        day = self.de_irig(irig_info[3], 0)\
-            + self.de_irig(irig_info[4], 0) * 100
-        year = self.de_irig(irig_info[5], 0)
-
-        if self.is_start == 1:
-            self.start_time = [hours, mins, secs]
-            self.is_start = 0
-
-        if print_out:
-
-            dsecs = secs - self.start_time[2]
-            dmins = mins - self.start_time[1]
-            dhours = hours - self.start_time[0]
-
-            if dhours < 0:
-                dhours = dhours + 24
-
-            if (dmins < 0) or ((dmins == 0) and (dsecs < 0)):
-                dmins = dmins + 60
-                dhours = dhours - 1
-
-            if dsecs < 0:
-                dsecs = dsecs + 60
-                dmins = dmins - 1
-
-            print('Current Time:', ('%d:%d:%d' % (hours, mins, secs)),
-                  'Run Time', ('%d:%d:%d' % (dhours, dmins, dsecs)),
-                  'Clock Count\n', edge)
-
-        try:
-            st_time = time.strptime(
-                "%d %d %d:%d:%d" % (year, day, hours, mins, secs),
-                "%y %j %H:%M:%S")
-            self.current_time = calendar.timegm(st_time)
-        except ValueError:
-            self.log.error(f'Invalid IRIG-B timestamp: '
-                           f'{year} {day} {hours} {mins} {secs}')
-            self.current_time = -1
-
-        return self.current_time
-
-    def de_irig(self, val, base_shift=0):
-        return (
-            ((val >> (0 + base_shift)) & 1)
-            + ((val >> (1 + base_shift)) & 1) * 2
-            + ((val >> (2 + base_shift)) & 1) * 4
-            + ((val >> (3 + base_shift)) & 1) * 8
-            + ((val >> (5 + base_shift)) & 1) * 10
-            + ((val >> (6 + base_shift)) & 1) * 20
-            + ((val >> (7 + base_shift)) & 1) * 40
-            + ((val >> (8 + base_shift)) & 1) * 80
-        )
-
-    def __del__(self):
-        self.sock.close()
+    def parse_counter_info(self, packets):
+        """Puts encoder packets, decoded with COUNTER_PACKET_DTYPE, to
+        encoder_queue as (quad, 64 bit clock, refcount, error, received
+        time)."""
+        received_time = time.time()
+        quads = packets['quad'].astype(np.int64)
+        clocks = combine_overflow(packets['clock'], packets['overflow'])
+        refcounts = packets['refcount'].astype(np.int64)
+        errors = packets['error'].astype(np.int64)
+
+        for i in range(len(packets)):
+            self.encoder_queue.append(
+                (quads[i], clocks[i], refcounts[i], errors[i], received_time))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,517 @@
+"""Common decoding of the encoder and IRIG-B data sent by the BeagleBone Black
+(BBB) readouts of rotating hardware, such as the HWP and wiregrid encoders.
+
+The BBB sends UDP packets, each starting with a 32 bit little-endian header
+which identifies the packet type. The encoder packet layouts differ between
+the readouts, and are described to :class:`BBBPacketParser` subclasses by
+numpy structured dtypes, so that consecutive packets can be decoded at once.
+The IRIG packet layout is common to all of them.
+"""
+import calendar
+import functools
+import select
+import socket
+import struct
+import time
+from collections import deque
+
+import numpy as np
+import txaio
+
+txaio.use_twisted()
+
+# Packet headers
+COUNTER_HEADER = 0x1eaf
+IRIG_HEADER = 0xcafe
+ERROR_HEADER = 0xe12a
+TIMEOUT_HEADER = 0x1234
+
+# header, type
+TIMEOUT_PACKET_SIZE = 8
+
+# header, clock, clock_overflow, info[10], synch[10], synch_overflow[10]
+IRIG_PACKET_SIZE = 132
+IRIG_PACKET_FORMAT = '<' + 'L' + 'L' + 'L' * 10 + 'L' * 10 + 'L' * 10
+
+# Assumed frequency of the BBB clock counter, in Hz
+BBB_CLOCK_FREQ = 2.e8
+
+# Maximum number of UDP packets to receive at once
+MAX_PACKETS_PER_RECEIVE = 64
+
+
+def _bcd_table(bit8_weight):
+    # Value of each 9 bit IRIG-B BCD field, indexed by the field's bits:
+    # units in bits 0-3, bit 4 unused, tens in bits 5-8.
+    weights = np.array([1, 2, 4, 8, 0, 10, 20, 40, bit8_weight])
+    bits = (np.arange(512)[:, None] >> np.arange(9)) & 1
+    return bits @ weights
+
+
+# The 80s bit is only used by fields other than seconds, which are shifted
+# by one bit; for seconds, that bit is the following position identifier.
+_BCD_TABLES = {True: _bcd_table(80), False: _bcd_table(0)}
+
+
+def de_irig(val, base_shift=0):
+    """Converts the IRIG signal into sec/min/hours/day/year depending on the parameters
+
+    Parameters
+    ----------
+    val : int or array of int
+       raw IRIG bit info of each 100msec chunk
+    base_shift : int, optional
+       number of bit shifts. This should be 0 except for seconds
+
+    Returns
+    -------
+    int or array of int
+       Either of sec/min/hours/day/year
+
+    """
+    table = _BCD_TABLES[base_shift == 0]
+    if isinstance(val, (int, np.integer)):
+        return int(table[(val >> base_shift) & 0x1ff])
+    return table[(np.asarray(val, dtype=np.int64) >> base_shift) & 0x1ff]
+
+
+def decode_irig(irig_info):
+    """Decodes the time fields of IRIG bit info.
+
+    Parameters
+    ----------
+    irig_info : list of int, or array
+       IRIG bit info of a packet, or an array of shape (number of packets, 10)
+       with the bit info of several packets
+
+    Returns
+    -------
+    tuple of int or array of int
+       (secs, mins, hours, day, year)
+
+    """
+    info = np.asarray(irig_info, dtype=np.int64)
+    secs = de_irig(info[..., 0], 1)
+    mins, hours, day, day_hundreds, year = (
+        _BCD_TABLES[True][info[..., 1:6] & 0x1ff].T)
+    day = day + day_hundreds * 100
+    if info.ndim == 1:
+        return int(secs), int(mins), int(hours), int(day), int(year)
+    return secs, mins, hours, day, year
+
+
+@functools.lru_cache(maxsize=8)
+def _year_start(year):
+    # Unix time at the start of a two digit year, interpreted like the %y
+    # directive of time.strptime
+    return calendar.timegm((year + (2000 if year < 69 else 1900), 1, 1, 0, 0, 0))
+
+
+def irig_to_unix(year, day, hours, mins, secs):
+    """Converts an IRIG-B timestamp to unix time.
+
+    This is equivalent to ``calendar.timegm(time.strptime(...,
+    '%y %j %H:%M:%S'))``, but caches the start of each year.
+
+    Parameters
+    ----------
+    year : int
+       two digit year
+    day : int
+       day of the year, starting at 1
+    hours, mins, secs : int
+       time of day
+
+    Returns
+    -------
+    int
+       Seconds since the unix epoch
+
+    Raises
+    ------
+    ValueError
+       If any of the fields is out of range
+
+    """
+    if not (0 <= year <= 99 and 1 <= day <= 366 and 0 <= hours <= 23
+            and 0 <= mins <= 59 and 0 <= secs <= 61):
+        raise ValueError(f'Invalid IRIG-B timestamp: {year} {day} {hours} {mins} {secs}')
+    return _year_start(year) + (day - 1) * 86400 + hours * 3600 + mins * 60 + secs
+
+
+def count2time(counts, t_offset=0.):
+    """Quick etimation of time using Beagleboneblack clock counts
+
+    Parameters
+    ----------
+    counts : list or array of int
+       Beagleboneblack clock counter value
+    t_offset : int, optional
+       time offset in seconds
+
+    Returns
+    -------
+    numpy.ndarray of float
+       Estimated time in seconds assuming the Beagleboneblack clock frequency is 200 MHz.
+       Without specifying t_offset, output is just the difference
+       from the first sample in the input list
+
+    """
+    counts = np.asarray(counts)
+    t_array = (counts - counts[0]).astype(float)
+    t_array *= 1. / BBB_CLOCK_FREQ
+    t_array += t_offset
+
+    return t_array
+
+
+def combine_overflow(clock, overflow):
+    """Combines 32 bit clock counts with their overflow counts, into 64 bit
+    clock counts.
+
+    Parameters
+    ----------
+    clock, overflow : array of int
+       clock counts, and corresponding overflow counts
+
+    Returns
+    -------
+    numpy.ndarray of int64
+
+    """
+    return (np.asarray(clock, dtype=np.int64)
+            + (np.asarray(overflow, dtype=np.int64) << 32))
+
+
+class UDPPacketReceiver:
+    """Receives UDP packets into a reusable buffer, for parsing.
+
+    Packets are received with ``recv_into()`` into the space following the
+    data not yet parsed, which is ``data[start:end]``. The unparsed data is
+    only moved when that space runs out.
+
+    The end of each received datagram is recorded, so that unparseable data
+    can be dropped up to the end of its datagram with :meth:`skip_datagram`,
+    without losing the datagrams received after it.
+
+    Parameters
+    ----------
+    port : int
+       Port number to receive UDP packets on
+    read_chunk_size : int, optional
+       Maximum data size to receive UDP packets in bytes
+    reuse_addr : bool, optional
+       Set SO_REUSEADDR on the socket, to allow rebinding to the port
+
+    Attributes
+    ----------
+    sock : socket.socket
+       The UDP socket
+    data : bytearray
+       The buffer
+    start, end : int
+       Indices of the unparsed data in the buffer
+    datagram_ends : deque of int
+       Indices in the buffer of the ends of the datagrams in the unparsed data
+
+    """
+
+    def __init__(self, port, read_chunk_size=8192, reuse_addr=False):
+        self.read_chunk_size = read_chunk_size
+        self.data = bytearray(4 * read_chunk_size)
+        self.start = 0
+        self.end = 0
+        self.datagram_ends = deque()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if reuse_addr:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # The ip address can be blank for accepting any UDP packet to the port
+        self.sock.bind(('', port))
+
+    def __len__(self):
+        return self.end - self.start
+
+    def wait(self, timeout):
+        """Waits for a packet to arrive.
+
+        Returns
+        -------
+        bool
+           True if a packet is ready to be received
+
+        """
+        return bool(select.select([self.sock], [], [], timeout)[0])
+
+    def _recv(self):
+        if len(self.data) - self.end < self.read_chunk_size:
+            num_bytes = len(self)
+            if num_bytes + self.read_chunk_size > len(self.data) // 2:
+                # Mostly full: move the unparsed data to a larger buffer
+                data = bytearray(2 * (num_bytes + self.read_chunk_size))
+                data[:num_bytes] = self.data[self.start:self.end]
+                self.data = data
+            else:
+                # Move the unparsed data to the start of the buffer
+                self.data[:num_bytes] = self.data[self.start:self.end]
+            self.datagram_ends = deque(end - self.start
+                                       for end in self.datagram_ends)
+            self.start = 0
+            self.end = num_bytes
+
+        with memoryview(self.data) as view:
+            num_bytes = self.sock.recv_into(view[self.end:], self.read_chunk_size)
+        if num_bytes:
+            self.end += num_bytes
+            self.datagram_ends.append(self.end)
+
+    def receive(self, max_packets=MAX_PACKETS_PER_RECEIVE):
+        """Receives a packet, waiting for one if needed, and then any further
+        packets that are already waiting, up to max_packets in total."""
+        for _ in range(max_packets):
+            self._recv()
+            if not self.wait(0):
+                break
+
+    def header(self, offset=0):
+        """Returns the 32 bit header at the given offset into the unparsed
+        data."""
+        return struct.unpack_from('<I', self.data, self.start + offset)[0]
+
+    def count_packets(self, header, size):
+        """Counts the consecutive complete packets of a type at the start of
+        the unparsed data.
+
+        Parameters
+        ----------
+        header : int
+           header of the packet type
+        size : int
+           size of the packets in bytes
+
+        """
+        count = 0
+        index = self.start
+        while (index + size <= self.end
+               and struct.unpack_from('<I', self.data, index)[0] == header):
+            count += 1
+            index += size
+        return count
+
+    def unpack(self, dtype, count=1):
+        """Decodes packets at the start of the unparsed data, as a view of
+        the buffer, and consumes them.
+
+        The returned array is only valid until the next :meth:`receive`;
+        copy any data to be kept.
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+           structured dtype describing a packet, including its header
+        count : int, optional
+           number of consecutive packets to decode
+
+        """
+        packets = np.frombuffer(self.data, dtype=dtype, count=count,
+                                offset=self.start)
+        self.consume(dtype.itemsize * count)
+        return packets
+
+    def datagram_size(self):
+        """Returns the number of unparsed bytes left in the datagram at the
+        start of the unparsed data."""
+        if self.datagram_ends:
+            return self.datagram_ends[0] - self.start
+        return len(self)
+
+    def consume(self, num_bytes):
+        """Discards bytes from the start of the unparsed data."""
+        self.start = min(self.start + num_bytes, self.end)
+        if self.start == self.end:
+            self.clear()
+            return
+        while self.datagram_ends and self.datagram_ends[0] <= self.start:
+            self.datagram_ends.popleft()
+
+    def skip_datagram(self):
+        """Discards the rest of the datagram at the start of the unparsed
+        data, such as after a bad header."""
+        self.consume(self.datagram_size())
+
+    def clear(self):
+        """Discards all of the unparsed data."""
+        self.start = 0
+        self.end = 0
+        self.datagram_ends.clear()
+
+    def close(self):
+        self.sock.close()
+
+
+class BBBPacketParser:
+    """Base class for parsers of the packets from a BeagleBone Black readout,
+    handling the reception of packets and the parsing of IRIG packets.
+
+    Subclasses parse the encoder packets, whose layout depends on the
+    readout.
+
+    Parameters
+    ----------
+    beaglebone_port : int
+       Port number to receive UDP packets from Beagleboneblack
+       This must be the same as the localPort in the Beaglebone code
+    read_chunk_size : int, optional
+       Maximum data size to receive UDP packets in bytes
+    reuse_addr : bool, optional
+       Allow rebinding to the same port after reset
+
+    Attributes
+    ----------
+    receiver : UDPPacketReceiver
+       Receiver holding the raw data from the Beaglebone before it is parsed
+    sock : socket.socket
+       a UDP socket to connect to the Beagleboneblack
+    irig_queue : deque object
+       deque to store the IRIG data
+    is_start : int
+       Used for procedures that only run when data collection begins
+       Initialized to be 1, until the first IRIG parsing happens and set to 0
+    start_time : list of int
+       Will hold the time at which data collection started [hours, mins, secs]
+    current_time : int
+       Current unix timestamp in seconds parased from IRIG
+
+    """
+
+    def __init__(self, beaglebone_port, read_chunk_size=8192, reuse_addr=False):
+        self.receiver = UDPPacketReceiver(beaglebone_port, read_chunk_size,
+                                          reuse_addr=reuse_addr)
+        self.sock = self.receiver.sock
+        self.read_chunk_size = read_chunk_size
+
+        self.irig_queue = deque()
+
+        # Used for procedures that only run when data collection begins
+        self.is_start = 1
+        # Will hold the time at which data collection started [hours, mins, secs]
+        self.start_time = [0, 0, 0]
+        # Will be continually updated with unix in seconds
+        self.current_time = 0
+
+        self.log = txaio.make_logger()
+
+    def pretty_print_irig_info(self, irig_info, edge, print_out=False):
+        """Takes the IRIG information, prints it to the screen, sets the current time,
+        and returns the current time
+
+        Parameters
+        ----------
+        irig_info : list of int
+           IRIG bit info
+        edge : int
+           Clock count of rising edge of a reference marker bit
+        print_out : bool, optional
+           Set True to print out the parsed timestamp
+
+        Returns
+        -------
+        current_time : int
+           Current unix timestamp in seconds parased from IRIG
+
+        """
+        secs, mins, hours, day, year = decode_irig(irig_info)
+
+        # If it is the first time that the function is called then set self.start_time
+        # to the current time
+        if self.is_start == 1:
+            self.start_time = [hours, mins, secs]
+            self.is_start = 0
+
+        if print_out:
+            # Find the sec/min/hour digit difference from the start time
+            dsecs = secs - self.start_time[2]
+            dmins = mins - self.start_time[1]
+            dhours = hours - self.start_time[0]
+
+            # Corrections to make sure that dsecs/dmins/dhours are all positive
+            if dhours < 0:
+                dhours = dhours + 24
+
+            if (dmins < 0) or ((dmins == 0) and (dsecs < 0)):
+                dmins = dmins + 60
+                dhours = dhours - 1
+
+            if dsecs < 0:
+                dsecs = dsecs + 60
+                dmins = dmins - 1
+
+            # Print UTC time, run time, and current clock count of the beaglebone
+            print('Current Time:', ('%d:%d:%d' % (hours, mins, secs)),
+                  'Run Time', ('%d:%d:%d' % (dhours, dmins, dsecs)),
+                  'Clock Count', edge)
+
+        # Set the current time in seconds from the unix epoch
+        try:
+            self.current_time = irig_to_unix(year, day, hours, mins, secs)
+        except ValueError as e:
+            self.log.error(str(e))
+            self.current_time = -1
+
+        return self.current_time
+
+    def parse_irig_info(self, data, offset=0):
+        """Method to parse the IRIG Packet and put them to the irig_queue
+
+        Parameters
+        ----------
+        data : bytes or bytearray
+           buffer holding the IRIG info
+        offset : int, optional
+           index in data of the IRIG info, following the packet header
+
+        Note
+        ----
+           'data' structure:
+           [0] clock count of the IRIG Packet which the UTC time corresponds to
+           [1] overflow count of initial rising edge
+           [2] binary encoding of the second data
+           [3] binary encoding of the minute data
+           [4] binary encoding of the hour data
+           [5-11] additional IRIG information which we do mot use
+           [12-21] synchronization pulse clock counts
+           [22-31] overflow count at each synchronization pulse
+
+           irig_queue structure:
+           irig_queue = [Packet clock count,
+                         Packet UTC time in sec,
+                         [binary encoded IRIG data],
+                         [synch pulses clock counts],
+                         current system time]
+
+        """
+        unpacked_data = struct.unpack_from(IRIG_PACKET_FORMAT, data, offset)
+
+        rising_edge_time = unpacked_data[0] + (unpacked_data[1] << 32)
+
+        # Stores IRIG time data
+        irig_info = unpacked_data[2:12]
+
+        # Prints the time information and returns the current time in seconds
+        irig_time = self.pretty_print_irig_info(irig_info, rising_edge_time)
+
+        # Stores synch pulse clock counts accounting for overflow of 32 bit counter
+        synch_pulse_clock_times = combine_overflow(unpacked_data[12:22],
+                                                   unpacked_data[22:32]).tolist()
+
+        self.irig_queue.append((rising_edge_time, irig_time, irig_info,
+                                synch_pulse_clock_times, time.time()))
+
+    def parse_irig_packet(self):
+        """Parses the IRIG packet at the start of the received data, and
+        consumes it."""
+        self.parse_irig_info(self.receiver.data, self.receiver.start + 4)
+        self.receiver.consume(IRIG_PACKET_SIZE)
+
+    def __del__(self):
+        self.receiver.close()
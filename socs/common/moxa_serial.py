@@ -4,10 +4,12 @@
 #  readbuf() dumps current buffer contents
 #  readpacket() has old broken behavior of read() - lowest level / fastest
 
+import select
 import socket
 import time
 
 MOXA_DEFAULT_TIMEOUT = 1.0
+MOXA_RECV_SIZE = 4096
 
 # Socket modes:
 # Nonblocking
@@ -25,6 +27,9 @@ MOXA_DEFAULT_TIMEOUT = 1.0
 #  This is the default mode for sockets
 #  Check socket.getdefaulttimeout() to see what mode sockets are created in
 
+# Received data is kept in a buffer in Serial_TCPServer, and select() is used
+# to wait for more, so reads never peek at or spin on the socket.
+
 # pyserial style wrapper over IA 5250 TCP Server mode
 
 
@@ -61,11 +66,74 @@ class Serial_TCPServer(object):
         self.port = port
         self.encoded = encoded
 
+        # Bytes received from the socket, but not yet returned by a read
+        self._buffer = bytearray()
+
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setblocking(0)
         self.settimeout(timeout)
         self.sock.connect(self.port)
 
+    def _decode(self, msg):
+        if self.encoded:
+            return msg.decode()
+        return msg
+
+    def _take(self, n):
+        """Removes and returns up to n bytes from the front of the buffer."""
+        msg = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return msg
+
+    def _recv(self, timeout):
+        """Waits up to timeout seconds for data to arrive, and adds
+        everything that is available to the buffer.
+
+        Returns:
+            bool: False if nothing was received, due to the timeout or the
+            connection being closed.
+
+        """
+        try:
+            readable, _, _ = select.select([self.sock], [], [], max(timeout, 0.))
+        except (OSError, ValueError) as e:
+            print(f"Caught unexpected {type(e).__name__} exception:")
+            print(f"  {e}")
+            return False
+        if not readable:
+            return False
+
+        received = False
+        while readable:
+            try:
+                data = self.sock.recv(MOXA_RECV_SIZE)
+            except (TimeoutError, BlockingIOError):
+                break
+            except Exception as e:
+                print(f"Caught unexpected {type(e).__name__} exception:")
+                print(f"  {e}")
+                break
+            if not data:  # Connection closed
+                break
+            self._buffer += data
+            received = True
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        return received
+
+    def _fill(self, n):
+        """Waits until the buffer has at least n bytes, or the timeout has
+        passed.
+
+        Returns:
+            bool: True if the buffer has at least n bytes.
+
+        """
+        deadline = time.time() + self.gettimeout()
+        while len(self._buffer) < n:
+            if not self._recv(deadline - time.time()):
+                return len(self._buffer) >= n
+        return True
+
     def readexactly(self, n):
         """Tries to read exactly n bytes within the timeout.
 
@@ -77,80 +145,36 @@ class Serial_TCPServer(object):
             ``len(message) != n``.
 
         """
-        t0 = time.time()
-        msg = ""
-        timeout = self.gettimeout()
-        while len(msg) < n:
-            newtimeout = timeout - (time.time() - t0)
-            if newtimeout <= 0.0:
-                break
-            self.settimeout(newtimeout)
-            try:
-                msg = self.sock.recv(n, socket.MSG_PEEK)
-            except (TimeoutError, BlockingIOError):
-                pass
-            except Exception as e:
-                print(f"Caught unexpected {type(e).__name__} exception:")
-                print(f"  {e}")
-        # Flush the message out if you got everything
-        if len(msg) == n:
-            if self.encoded:
-                msg = self.sock.recv(n).decode()
-            else:
-                msg = self.sock.recv(n)
-        # Otherwise tell nothing and leave the data in the buffer
-        else:
-            msg = ''
-        self.settimeout(timeout)
-        return msg
+        if not self._fill(n):
+            # Tell nothing and leave the data in the buffer
+            return ''
+        return self._decode(self._take(n))
 
     def readbuf_slow(self, n):
-        """Reads whatever is in the buffer right now, but is O(N) in buffer
-        size.
+        """Reads whatever is in the buffer right now, up to n bytes.
+
+        Kept for compatibility; this is now the same as ``readbuf()``.
 
         Args:
             n: Number of bytes to read.
 
         """
-        msg = ''
-        self.sock.setblocking(0)
-        try:
-            for i in range(n):
-                msg += self.sock.recv(1)
-        except (TimeoutError, BlockingIOError):
-            pass
-        except Exception as e:
-            print(f"Caught unexpected {type(e).__name__} exception:")
-            print(f"  {e}")
-        self.sock.setblocking(1)  # belt and suspenders
-        self.settimeout(self.__timeout)
-        return msg
+        return self.readbuf(n)
 
     def readbuf(self, n, max_loop=10):
-        """Returns whatever is currently in the buffer. Suitable for large
-        buffers.
+        """Returns whatever is currently in the buffer, without waiting.
+        Suitable for large buffers.
 
         Args:
             n: Number of bytes to read.
+            max_loop: Unused, kept for compatibility.
 
-        """
-        n_current = n
-        msg = b''
-        for i in range(max_loop):
-            if n_current <= 0:
-                return msg
-            try:
-                msg_current = self.sock.recv(n)
-            except (TimeoutError, BlockingIOError):
-                msg_current = b''
-            except Exception as e:
-                print(f"Caught unexpected {type(e).__name__} exception:")
-                print(f"  {e}")
-                msg_current = b''
-            msg += msg_current
-            n_current -= len(msg_current)
+        Returns:
+            bytes: Up to n bytes.
 
-        return msg
+        """
+        self._recv(0)
+        return self._take(n)
 
     def readpacket(self, n):
         """Like ``read()``, but may not return everything if the moxa box
@@ -160,15 +184,9 @@ class Serial_TCPServer(object):
         timeout. Use ``read()`` for certainty.
 
         """
-        try:
-            msg = self.sock.recv(n)
-        except (TimeoutError, BlockingIOError):
-            msg = ''
-        except Exception as e:
-            print(f"Caught unexpected {type(e).__name__} exception:")
-            print(f"  {e}")
-            msg = ''
-        return msg
+        if not self._buffer and not self._recv(self.gettimeout()):
+            return ''
+        return self._take(n)
 
     def read(self, n):
         """Like ``readexactly()``, but returns whatever is in the buffer if it
@@ -185,31 +203,81 @@ class Serial_TCPServer(object):
             str: Returned message of up to n bytes.
 
         """
-        msg = self.readexactly(n)
-        n2 = n - len(msg)
-        if n2 > 0:
-            msg += self.readbuf(n2)
-        return msg
+        self._fill(n)
+        return self._decode(self._take(n))
 
-    def readline(self, term='\n'):
-        msg = ''
-        while True:
-            c = self.readexactly(1)
-            if c == term or c == '':
-                return msg
-            msg += c
+    def read_until(self, expected='\n', size=None):
+        """Reads until the expected terminator is received, size bytes have
+        been read, or no more data arrives within the timeout.
 
-    def readall(self):
-        msg = ""
+        Like the pyserial method of the same name, the timeout applies to
+        waiting for each new piece of the message, not the message as a
+        whole.
+
+        Args:
+            expected (str or bytes): Terminator to read up to.
+            size (int): Maximum number of bytes to read.
+
+        Returns:
+            str: Message read, including the terminator if it was found.
+
+        """
+        if isinstance(expected, str):
+            expected = expected.encode()
+
+        start = 0
         while True:
-            c = self.readexactly(1)
-            if c == '\r':
-                return msg
-            if c == '':
-                return False
-            msg += c
+            index = self._buffer.find(expected, start)
+            if index >= 0:
+                end = index + len(expected)
+                break
+            if size is not None and len(self._buffer) >= size:
+                end = size
+                break
+            # Don't search again the part of the buffer already searched
+            start = max(0, len(self._buffer) - len(expected) + 1)
+            if not self._recv(self.gettimeout()):
+                end = len(self._buffer)
+                break
+
+        if size is not None:
+            end = min(end, size)
+        return self._decode(self._take(end))
+
+    def readline(self, term='\n'):
+        """Reads until the terminator, or until no more data arrives within
+        the timeout.
+
+        Args:
+            term (str): Terminator to read up to.
+
+        Returns:
+            str: Message read, without the terminator.
+
+        """
+        msg = self.read_until(term)
+        if self.encoded:
+            term = term if isinstance(term, str) else term.decode()
+        elif isinstance(term, str):
+            term = term.encode()
+        if msg.endswith(term):
+            msg = msg[:-len(term)]
         return msg
 
+    def readall(self):
+        """Reads until a carriage return.
+
+        Returns:
+            str: Message read, without the carriage return, or False if no
+            carriage return was received within the timeout.
+
+        """
+        msg = self.read_until('\r')
+        term = '\r' if self.encoded else b'\r'
+        if not msg.endswith(term):
+            return False
+        return msg[:-1]
+
     def write(self, msg):
         """Sends message to the moxa box.
 
@@ -236,17 +304,8 @@ class Serial_TCPServer(object):
         front.
 
         """
-        self.sock.setblocking(0)
-        try:
-            while len(self.sock.recv(1)) > 0:
-                pass
-        except (TimeoutError, BlockingIOError):
-            pass
-        except Exception as e:
-            print(f"Caught unexpected {type(e).__name__} exception:")
-            print(f"  {e}")
-        self.sock.setblocking(1)
-        self.sock.settimeout(self.__timeout)
+        self._recv(0)
+        self._buffer.clear()
 
     def settimeout(self, timeout):
         """Sets the socket in timeout mode."""
@@ -1,18 +1,23 @@
+import itertools
 import os
+import shutil
 import subprocess
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
 from functools import wraps
 
 import txaio
 import yaml
-from sqlalchemy import (Boolean, Column, Float, ForeignKey, Integer, String,
-                        asc, create_engine, text)
+from sqlalchemy import (Boolean, Column, Float, ForeignKey, Index, Integer,
+                        String, and_, asc, case, create_engine, desc, func,
+                        inspect, or_, text)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 
-from socs.util import get_md5sum
+from socs.util import CHECKSUM_COMMANDS, get_checksum, get_checksums
 
 TABLE_VERSION = 0
 txaio.use_twisted()
@@ -24,6 +29,9 @@ Base = declarative_base()
 # the subsequent timecode dir has not been created.
 DAYS_TO_COMPLETE_TCDIR = 1
 
+# Checksum algorithm used for new files, unless otherwise specified.
+DEFAULT_CHECKSUM_ALGORITHM = 'md5'
+
 
 class TimecodeDir(Base):
     """
@@ -68,7 +76,8 @@ class SupRsyncFile(Base):
         local_path : String
             Absolute path of the local file to be copied
         local_md5sum : String
-            locally calculated checksum
+            locally calculated checksum (despite the name, computed with
+            ``checksum_algorithm``)
         archive_name : String
             Name of the archive, i.e. `timestreams` or `smurf`. Each archive
             is managed by its own SupRsync instance, so they can be copied to
@@ -77,7 +86,13 @@ class SupRsyncFile(Base):
             Path of the file on the remote server relative to the base-dir.
             specified in the SupRsync agent config.
         remote_md5sum : String, optional
-            Md5sum calculated on remote machine
+            Checksum calculated on remote machine
+        timecode : Int, optional
+            5-digit timecode of the top-level directory of remote_path, if
+            there is one (see ``check_timecode``).
+        checksum_algorithm : String
+            Algorithm used for the local and remote checksums (see
+            ``socs.util.CHECKSUM_COMMANDS``).
         timestamp : Float
             Timestamp that file was added to db
         copied : Float, optional
@@ -93,14 +108,23 @@ class SupRsyncFile(Base):
             included in `finalized_until`.
     """
     __tablename__ = f"supersync_v{TABLE_VERSION}"
+    __table_args__ = (
+        # Supports the get_copyable_files / get_deletable_files queries.
+        Index(f"ix_supersync_v{TABLE_VERSION}_archive_state",
+              "archive_name", "removed", "ignore", "failed_copy_attempts"),
+    )
 
     id = Column(Integer, primary_key=True)
     local_path = Column(String, nullable=False)
     local_md5sum = Column(String, nullable=False)
     archive_name = Column(String, nullable=False)
     remote_path = Column(String, nullable=False)
-    timestamp = Column(Float, nullable=False)
+    timestamp = Column(Float, nullable=False, index=True)
     remote_md5sum = Column(String)
+    timecode = Column(Integer)
+    checksum_algorithm = Column(String, nullable=False,
+                                default=DEFAULT_CHECKSUM_ALGORITHM,
+                                server_default=DEFAULT_CHECKSUM_ALGORITHM)
     copied = Column(Float)
     removed = Column(Float)
     failed_copy_attempts = Column(Integer, default=0)
@@ -122,6 +146,33 @@ class SupRsyncFile(Base):
         return s
 
 
+def _uncopied_filter():
+    """
+    Returns criteria selecting files that have not been successfully copied,
+    and are not ignored.
+    """
+    return and_(
+        SupRsyncFile.ignore == False,  # noqa: E712
+        or_(SupRsyncFile.remote_md5sum == None,  # noqa: E711
+            SupRsyncFile.local_md5sum != SupRsyncFile.remote_md5sum),
+    )
+
+
+# Supports looking up files by local path, to avoid registering them twice.
+Index(f"ix_supersync_v{TABLE_VERSION}_local_path", SupRsyncFile.local_path)
+# Supports the timecode dir queries.
+Index(f"ix_supersync_v{TABLE_VERSION}_archive_timecode",
+      SupRsyncFile.archive_name, SupRsyncFile.timecode)
+# Supports the archive stats queries.  The partial index only holds files
+# that are yet to be copied, so finding the earliest of them (for
+# finalized_until) does not depend on the number of files already copied.
+Index(f"ix_supersync_v{TABLE_VERSION}_archive_timestamp",
+      SupRsyncFile.archive_name, SupRsyncFile.timestamp)
+Index(f"ix_supersync_v{TABLE_VERSION}_uncopied",
+      SupRsyncFile.archive_name, SupRsyncFile.timestamp,
+      sqlite_where=_uncopied_filter())
+
+
 def split_path(path):
     """Splits path into a list where each element is a subdirectory"""
     return os.path.normpath(path).strip('/').split('/')
@@ -132,7 +183,15 @@ def check_timecode(file: SupRsyncFile):
     Tries to extract timecode from the remote path. If it fails, returns
     None.
     """
-    split = split_path(file.remote_path)
+    return timecode_from_path(file.remote_path)
+
+
+def timecode_from_path(remote_path):
+    """
+    Returns the 5-digit timecode of the top-level directory of a remote path,
+    or None if it doesn't start with one.
+    """
+    split = split_path(remote_path)
     try:
         timecode = int(split[0])
         if len(str(timecode)) != 5:  # Timecode must be 5 digits
@@ -143,7 +202,7 @@ def check_timecode(file: SupRsyncFile):
 
 
 def create_file(local_path, remote_path, archive_name, local_md5sum=None,
-                timestamp=None, deletable=True):
+                timestamp=None, deletable=True, checksum_algorithm=None):
     """
     Creates SupRsyncFiles object.
 
@@ -160,18 +219,24 @@ def create_file(local_path, remote_path, archive_name, local_md5sum=None,
             different base-dirs or hosts.
         local_md5sum : String, optional
             locally calculated checksum. If not specified, will calculate
-            md5sum automatically.
+            checksum automatically.
         timestamp:
             Timestamp of file. If None is specified, will use the current
             time.
         deletable : bool
             If true, can be deleted by suprsync agent
+        checksum_algorithm : String, optional
+            Algorithm for the checksum (see ``socs.util.CHECKSUM_COMMANDS``).
+            Defaults to DEFAULT_CHECKSUM_ALGORITHM.
     """
     local_path = str(local_path)
     remote_path = str(remote_path)
 
+    if checksum_algorithm is None:
+        checksum_algorithm = DEFAULT_CHECKSUM_ALGORITHM
+
     if local_md5sum is None:
-        local_md5sum = get_md5sum(local_path)
+        local_md5sum = get_checksum(local_path, checksum_algorithm)
 
     if timestamp is None:
         timestamp = time.time()
@@ -179,12 +244,14 @@ def create_file(local_path, remote_path, archive_name, local_md5sum=None,
     file = SupRsyncFile(
         local_path=local_path, local_md5sum=local_md5sum,
         remote_path=remote_path, archive_name=archive_name,
-        timestamp=timestamp
+        timestamp=timestamp, checksum_algorithm=checksum_algorithm
     )
 
     if deletable is not None:
         file.deletable = deletable
 
+    file.timecode = check_timecode(file)
+
     return file
 
 
@@ -248,40 +315,82 @@ class SupRsyncFilesManager:
 
         if create_all:
             Base.metadata.create_all(self._engine)
+            self._migrate()
+
+    def _migrate(self):
+        """
+        Updates tables created by older versions of this code, which
+        create_all will not modify.  Missing columns are added (using their
+        server_default to fill existing rows), and missing indexes are
+        created.
+        """
+        inspector = inspect(self._engine)
+        added = set()
+        for table in Base.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            with self._engine.begin() as conn:
+                for column in table.columns:
+                    if column.name not in existing:
+                        self.log.info(f"Adding column {column.name} to {table.name}")
+                        ddl = CreateColumn(column).compile(dialect=self._engine.dialect)
+                        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                        added.add(column)
+            for index in table.indexes:
+                index.create(self._engine, checkfirst=True)
+
+        if SupRsyncFile.__table__.c.timecode in added:
+            self._backfill_timecodes()
+
+    def _backfill_timecodes(self, batch_size=10000):
+        """
+        Sets the timecode of files added before the timecode column existed.
+        """
+        self.log.info("Setting timecodes of existing files")
+        with self.Session.begin() as session:
+            rows = session.query(SupRsyncFile.id, SupRsyncFile.remote_path).all()
+            updates = []
+            for id, remote_path in rows:
+                tc = timecode_from_path(remote_path)
+                if tc is not None:
+                    updates.append({'id': id, 'timecode': tc})
+            for i in range(0, len(updates), batch_size):
+                session.bulk_update_mappings(SupRsyncFile, updates[i:i + batch_size])
 
     @beginsession
     def get_archive_stats(self, archive_name, session=None):
-        files = session.query(SupRsyncFile).filter(
-            SupRsyncFile.archive_name == archive_name,
-        ).order_by(asc(SupRsyncFile.timestamp)).all()
-
-        finalized_until = None
-        num_files_to_copy = 0
-        last_file_added = ''
-        last_file_copied = ''
-
-        for f in files:
-            last_file_added = f.local_path
-            if (f.local_md5sum == f.remote_md5sum):
-                last_file_copied = f.local_path
+        """
+        Returns summary information for an archive.  This is computed with
+        SQL aggregates, using the indexes on archive_name and timestamp.
 
-            if (not f.ignore) and (f.local_md5sum != f.remote_md5sum):
-                num_files_to_copy += 1
+        Args
+        ------
+            archive_name : String
+                Archive name to get stats for
+            session : sqlalchemy session
+                SQLAlchemy session to use. If none is passed, will create a new
+                session
+        """
+        in_archive = SupRsyncFile.archive_name == archive_name
 
-            if finalized_until is None and not (f.ignore):
-                if f.local_md5sum != f.remote_md5sum:
-                    finalized_until = f.timestamp - 1
+        num_files = session.query(func.count(SupRsyncFile.id)).filter(
+            in_archive).scalar()
+        num_files_to_copy = session.query(func.count(SupRsyncFile.id)).filter(
+            in_archive, _uncopied_filter()).scalar()
 
-        # There are no more uncopied files that aren't ignored
-        if finalized_until is None:
-            finalized_until = time.time()
+        def last_file(*criteria):
+            return session.query(SupRsyncFile.local_path).filter(
+                in_archive, *criteria,
+            ).order_by(desc(SupRsyncFile.timestamp), desc(SupRsyncFile.id)) \
+                .limit(1).scalar() or ''
 
         stats = {
-            'finalized_until': finalized_until,
-            'num_files': len(files),
+            'finalized_until': self.get_finalized_until(
+                archive_name, session=session),
+            'num_files': num_files,
             'uncopied_files': num_files_to_copy,
-            'last_file_added': last_file_added,
-            'last_file_copied': last_file_copied,
+            'last_file_added': last_file(),
+            'last_file_copied': last_file(
+                SupRsyncFile.local_md5sum == SupRsyncFile.remote_md5sum),
         }
 
         return stats
@@ -300,22 +409,20 @@ class SupRsyncFilesManager:
                 SQLAlchemy session to use. If none is passed, will create a new
                 session
         """
-        query = session.query(SupRsyncFile).filter(
+        first_uncopied = session.query(func.min(SupRsyncFile.timestamp)).filter(
             SupRsyncFile.archive_name == archive_name,
-        ).order_by(asc(SupRsyncFile.timestamp))
+            _uncopied_filter(),
+        ).scalar()
 
-        for file in query.all():
-            if file.ignore:
-                continue
-            if file.local_md5sum != file.remote_md5sum:
-                return file.timestamp - 1
-        else:
+        # There are no more uncopied files that aren't ignored
+        if first_uncopied is None:
             return time.time()
+        return first_uncopied - 1
 
     @beginsession
     def add_file(self, local_path, remote_path, archive_name,
                  local_md5sum=None, timestamp=None, session=None,
-                 deletable=True):
+                 deletable=True, checksum_algorithm=None):
         """
         Adds file to the SupRsyncFiles table.
 
@@ -332,24 +439,124 @@ class SupRsyncFilesManager:
                 different base-dirs or hosts.
             local_md5sum : String, optional
                 locally calculated checksum. If not specified, will calculate
-                md5sum automatically.
+                checksum automatically.
             session : sqlalchemy session
                 Session to use to add the SupRsyncFile. If None, will create
                 a new session and commit afterwards.
             deletable : bool
                 If true, can be deleted by suprsync agent
+            checksum_algorithm : String, optional
+                Algorithm for the checksum; see create_file.
         """
         file = create_file(local_path, remote_path, archive_name,
                            local_md5sum=local_md5sum, timestamp=timestamp,
-                           deletable=deletable)
+                           deletable=deletable,
+                           checksum_algorithm=checksum_algorithm)
         self._add_file_tcdir(file, session)
         session.add(file)
 
         return file
 
+    def add_files_bulk(self, entries, checksum_algorithm=None, deletable=True,
+                       skip_known=True, batch_size=500, max_workers=None):
+        """
+        Adds many files to the SupRsyncFiles table. Files are handled in
+        batches: each batch is checksummed in parallel, and added (along with
+        any new timecode dirs) in a single transaction.
+
+        Files already in the db for the same archive are skipped before
+        being checksummed, so an interrupted call can be resumed by calling
+        again with the same entries.
+
+        Args
+        ----
+            entries : iterable of tuples
+                (local_path, remote_path, archive_name) for each file, with an
+                optional fourth element to override ``deletable``.
+            checksum_algorithm : String, optional
+                Algorithm for the checksums; see create_file.
+            deletable : bool
+                If true, files can be deleted by suprsync agent
+            skip_known : bool
+                If true, skips files whose local path is already registered
+                in the same archive, or repeated in entries.
+            batch_size : int
+                Number of files per transaction.
+            max_workers : int, optional
+                Number of threads used for checksumming; see
+                ``socs.util.get_checksums``.
+
+        Returns
+        -------
+            num_added : int
+                Number of files added to the db.
+        """
+        if checksum_algorithm is None:
+            checksum_algorithm = DEFAULT_CHECKSUM_ALGORITHM
+
+        seen = set()
+        num_added = 0
+        entries = iter(entries)
+        while True:
+            batch = []
+            for entry in itertools.islice(entries, batch_size):
+                local_path, remote_path, archive_name = entry[:3]
+                key = (str(local_path), archive_name)
+                if skip_known:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                batch.append((str(local_path), str(remote_path), archive_name,
+                              entry[3] if len(entry) > 3 else deletable))
+            if not batch:
+                break
+
+            if skip_known:
+                with self.Session() as session:
+                    known = set(session.query(
+                        SupRsyncFile.local_path, SupRsyncFile.archive_name
+                    ).filter(
+                        SupRsyncFile.local_path.in_({e[0] for e in batch})
+                    ))
+                batch = [e for e in batch if (e[0], e[2]) not in known]
+
+            checksums = get_checksums([e[0] for e in batch], checksum_algorithm,
+                                      max_workers=max_workers,
+                                      return_exceptions=True)
+            rows = []
+            for (local_path, remote_path, archive_name, _deletable), checksum \
+                    in zip(batch, checksums):
+                if isinstance(checksum, Exception):
+                    self.log.error("Could not checksum {path}: {e}",
+                                   path=local_path, e=checksum)
+                    continue
+                rows.append({
+                    'local_path': local_path,
+                    'local_md5sum': checksum,
+                    'remote_path': remote_path,
+                    'archive_name': archive_name,
+                    'timestamp': time.time(),
+                    'checksum_algorithm': checksum_algorithm,
+                    'timecode': timecode_from_path(remote_path),
+                    'deletable': _deletable,
+                })
+
+            if rows:
+                with self.Session.begin() as session:
+                    session.bulk_insert_mappings(SupRsyncFile, rows)
+                    self._add_tcdirs(
+                        {(r['archive_name'], r['timecode']) for r in rows
+                         if r['timecode'] is not None},
+                        session,
+                    )
+                num_added += len(rows)
+
+        return num_added
+
     @beginsession
     def get_copyable_files(self, archive_name, session=None,
-                           max_copy_attempts=None, num_files=None):
+                           max_copy_attempts=None, num_files=None,
+                           exclude_ids=None):
         """
         Gets all SupRsyncFiles that are copyable, meaning they satisfy:
          - local and remote md5sums do not match
@@ -367,6 +574,9 @@ class SupRsyncFilesManager:
                 Max number of failed copy atempts
             num_files : int
                 Number of files to return
+            exclude_ids : list of int, optional
+                Ids of files to leave out, such as files whose remote
+                checksums are still being computed.
         """
         if max_copy_attempts is None:
             max_copy_attempts = 2**10
@@ -376,17 +586,17 @@ class SupRsyncFilesManager:
             SupRsyncFile.archive_name == archive_name,
             SupRsyncFile.failed_copy_attempts < max_copy_attempts,
             SupRsyncFile.ignore == False,  # noqa: E712
+            or_(SupRsyncFile.remote_md5sum == None,  # noqa: E711
+                SupRsyncFile.local_md5sum != SupRsyncFile.remote_md5sum),
         )
+        if exclude_ids:
+            query = query.filter(SupRsyncFile.id.notin_(list(exclude_ids)))
+        query = query.order_by(asc(SupRsyncFile.id))
 
-        files = []
-        for f in query.all():
-            if f.local_md5sum != f.remote_md5sum:
-                files.append(f)
-            if num_files is not None:
-                if len(files) >= num_files:
-                    break
+        if num_files is not None:
+            query = query.limit(num_files)
 
-        return files
+        return query.all()
 
     @beginsession
     def get_deletable_files(self, archive_name, delete_after, session=None):
@@ -409,16 +619,11 @@ class SupRsyncFilesManager:
             SupRsyncFile.removed == None,  # noqa: E711
             SupRsyncFile.archive_name == archive_name,
             SupRsyncFile.deletable,
-        )
+            SupRsyncFile.local_md5sum == SupRsyncFile.remote_md5sum,
+            SupRsyncFile.timestamp < time.time() - delete_after,
+        ).order_by(asc(SupRsyncFile.id))
 
-        files = []
-        now = time.time()
-        for f in query.all():
-            if f.local_md5sum == f.remote_md5sum:
-                if now > f.timestamp + delete_after:
-                    files.append(f)
-
-        return files
+        return query.all()
 
     @beginsession
     def get_known_files(self, archive_name, session=None, min_ctime=None):
@@ -448,11 +653,10 @@ class SupRsyncFilesManager:
     def _add_file_tcdir(self, file: SupRsyncFile, session):
         """
         Creates and adds a TimecodeDir for a file if possible.  This will
-        attempt to extract the timecode from the remote filename, and will
+        use the timecode extracted from the remote filename, and will
         create a new TimecodeDir if it doesn't already exist.
         """
-        # print(file.remote_path)
-        tc = check_timecode(file)
+        tc = file.timecode
         if tc is None:
             return None
 
@@ -468,22 +672,82 @@ class SupRsyncFilesManager:
         session.add(tcdir)
         return tcdir
 
+    def _add_tcdirs(self, archive_timecodes, session):
+        """
+        Adds a TimecodeDir for each (archive_name, timecode) pair that doesn't
+        already have one.
+        """
+        by_archive = {}
+        for archive_name, tc in archive_timecodes:
+            by_archive.setdefault(archive_name, set()).add(tc)
+
+        for archive_name, tcs in by_archive.items():
+            existing = {tc for tc, in session.query(TimecodeDir.timecode).filter(
+                TimecodeDir.archive_name == archive_name,
+                TimecodeDir.timecode.in_(tcs),
+            )}
+            session.bulk_insert_mappings(TimecodeDir, [
+                {'timecode': tc, 'archive_name': archive_name}
+                for tc in sorted(tcs - existing)
+            ])
+
     def create_all_timecode_dirs(self, archive_name, min_ctime=None):
+        """
+        Adds a TimecodeDir for each timecode of the archive's files (added
+        after min_ctime) that doesn't have one yet.
+        """
+        if min_ctime is None:
+            min_ctime = 0
+
         with self.Session.begin() as session:
-            files = self.get_known_files(
-                archive_name, session=session, min_ctime=min_ctime)
-            for file in files:
-                self._add_file_tcdir(file, session)
+            file_tcs = session.query(SupRsyncFile.timecode).filter(
+                SupRsyncFile.archive_name == archive_name,
+                SupRsyncFile.timecode != None,  # noqa: E711
+                SupRsyncFile.timestamp > min_ctime,
+            ).distinct()
+            existing_tcs = session.query(TimecodeDir.timecode).filter(
+                TimecodeDir.archive_name == archive_name,
+            )
+            new_tcs = file_tcs.except_(existing_tcs).all()
+            session.bulk_insert_mappings(TimecodeDir, [
+                {'timecode': tc, 'archive_name': archive_name}
+                for tc, in sorted(new_tcs)
+            ])
 
     def update_all_timecode_dirs(self, archive_name, file_root, sync_id):
         with self.Session.begin() as session:
             tcdirs = session.query(TimecodeDir).filter(
                 TimecodeDir.archive_name == archive_name,
+                TimecodeDir.finalized == False,  # noqa: E712
             ).all()
+            if not tcdirs:
+                return
+
+            # Any later timecode dir, in any archive, completes a tc dir.
+            max_timecode = session.query(func.max(TimecodeDir.timecode)).scalar()
+
+            # Number of files, and number of files not synced, per timecode
+            unsynced = or_(SupRsyncFile.remote_md5sum == None,  # noqa: E711
+                           SupRsyncFile.local_md5sum != SupRsyncFile.remote_md5sum)
+            file_counts = {
+                tc: (num_files, num_unsynced)
+                for tc, num_files, num_unsynced in session.query(
+                    SupRsyncFile.timecode,
+                    func.count(SupRsyncFile.id),
+                    func.sum(case((unsynced, 1), else_=0)),
+                ).filter(
+                    SupRsyncFile.archive_name == archive_name,
+                    SupRsyncFile.timecode.in_([tcdir.timecode for tcdir in tcdirs]),
+                ).group_by(SupRsyncFile.timecode)
+            }
+
             for tcdir in tcdirs:
-                self._update_tcdir(tcdir, session, file_root, sync_id)
+                self._update_tcdir(tcdir, session, file_root, sync_id,
+                                   max_timecode,
+                                   file_counts.get(tcdir.timecode, (0, 0)))
 
-    def _update_tcdir(self, tcdir, session, file_root, sync_id):
+    def _update_tcdir(self, tcdir, session, file_root, sync_id, max_timecode,
+                      file_counts):
         """
         Takes the next series of actions for a timecode dir object.
         - If we expect no more files to be added to the tc dir, marks it as
@@ -491,48 +755,49 @@ class SupRsyncFilesManager:
         - If all files in the tc dir have been synced, marks it as synced
         - If the tc dir is synced and not finalized, creates the finalization
           file and marks as finalized.
+
+        Args
+        ----
+            max_timecode : int
+                Latest timecode of any timecode dir.
+            file_counts : (int, int)
+                Number of files in the tc dir, and how many of them have not
+                been synced.
         """
         if tcdir.finalized:
             return
 
         now = time.time()
+        num_files, num_unsynced = file_counts
 
         if not tcdir.completed:
-            all_tcs = session.query(TimecodeDir.timecode).all()
-            for tc, in all_tcs:
-                if tc > tcdir.timecode:
-                    # Mark as complete if there's a timecode after this one
-                    tcdir.completed = True
-                    break
-            else:
+            if max_timecode is not None and max_timecode > tcdir.timecode:
+                # Mark as complete if there's a timecode after this one
+                tcdir.completed = True
+            elif (now // 1e5 - tcdir.timecode) > DAYS_TO_COMPLETE_TCDIR:
                 # No timecodes after this one. Mark after complete if we are
                 # over a full day away.
-                if (now // 1e5 - tcdir.timecode) > DAYS_TO_COMPLETE_TCDIR:
-                    tcdir.completed = True
-
-        # Gets all files in this tcdir
-        files = session.query(SupRsyncFile).filter(
-            SupRsyncFile.remote_path.like(f'{tcdir.timecode}/%')
-        ).all()
+                tcdir.completed = True
 
         if tcdir.completed and not tcdir.synced:
-            for f in files:
-                if f.local_md5sum != f.remote_md5sum:
-                    break  # File is not synced properly
-            else:
+            if not num_unsynced:
                 tcdir.synced = True
 
         if tcdir.synced and not tcdir.finalized:  # Finalize file
             # Get subdirs this suprsync instance is responsible for
+            remote_paths = session.query(SupRsyncFile.remote_path).filter(
+                SupRsyncFile.archive_name == tcdir.archive_name,
+                SupRsyncFile.timecode == tcdir.timecode,
+            )
             subdirs = set()
-            for f in files:
-                split = split_path(f.remote_path)
+            for remote_path, in remote_paths:
+                split = split_path(remote_path)
                 if len(split) > 2:
                     subdirs.add(split[1])
 
             tcdir_summary = {
                 'timecode': tcdir.timecode,
-                'num_files': len(files),
+                'num_files': num_files,
                 'subdirs': list(subdirs),
                 'finalized_at': now,
                 'finalized_until': self.get_finalized_until(tcdir.archive_name),
@@ -568,12 +833,31 @@ class SupRsyncFileHandler:
     """
     Helper class to handle files in the suprsync db and copy them to their
     dest / delete them if enough time has passed.
+
+    Files in a batch can be copied by several concurrent rsync processes
+    (``num_streams``), with the batch split between them so each moves a
+    similar number of bytes. If ``pipeline`` is set, the remote checksums
+    for a batch are computed in the background, and are only checked during
+    the following call to ``copy_files``, while the next batch is being
+    copied. If ``ssh_control_persist`` is set, rsync and remote commands
+    share a single persistent ssh connection instead of opening a new one
+    each time.
+
+    Attributes
+    ----------
+    transfer_stats : dict
+        Statistics on the most recent transfer. Contains the total bytes
+        copied by the handler, the latency of the last remote checksum, and
+        the bytes, latency (s) and throughput (bytes/s) of each rsync stream
+        in the last batch (``stream<i>_bytes``, ``stream<i>_latency``,
+        ``stream<i>_throughput``).
     """
 
     def __init__(self, file_manager, archive_name, remote_basedir,
                  ssh_host=None, ssh_key=None, cmd_timeout=None,
                  copy_timeout=None, compression=None, bwlimit=None,
-                 chmod=None):
+                 chmod=None, num_streams=1, pipeline=False,
+                 ssh_control_persist=None):
         self.srfm = file_manager
         self.archive_name = archive_name
         self.ssh_host = ssh_host
@@ -585,6 +869,49 @@ class SupRsyncFileHandler:
         self.compression = compression
         self.bwlimit = bwlimit
         self.chmod = chmod
+        self.num_streams = max(1, num_streams)
+        self.pipeline = pipeline
+        self.ssh_control_persist = ssh_control_persist
+        self.transfer_stats = {'bytes_copied': 0}
+
+        self._control_dir = None
+        # Background remote checksum of the previous batch, when pipelining:
+        # (future, {remote_path: file id})
+        self._pending = None
+        self._checksum_executor = None
+
+    def _ssh_opts(self):
+        """Options to pass to ssh, for both rsync and remote commands."""
+        opts = []
+        if self.ssh_key is not None:
+            opts.extend(['-i', self.ssh_key])
+        if self.ssh_host is not None and self.ssh_control_persist is not None:
+            if self._control_dir is None:
+                self._control_dir = tempfile.mkdtemp(prefix='suprsync-ssh-')
+            opts.extend([
+                '-o', 'ControlMaster=auto',
+                '-o', 'ControlPath=' + os.path.join(self._control_dir, '%C'),
+                '-o', f'ControlPersist={int(self.ssh_control_persist)}',
+            ])
+        return opts
+
+    def _start_control_master(self):
+        """
+        Makes sure the persistent ssh connection is up, so concurrent rsync
+        streams don't each race to become the master connection.
+        """
+        if self.ssh_host is None or self.ssh_control_persist is None:
+            return
+        opts = self._ssh_opts()
+        res = subprocess.run(['ssh'] + opts + ['-O', 'check', self.ssh_host],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if res.returncode == 0:
+            return
+        self.log.info("Opening persistent ssh connection to {host}",
+                      host=self.ssh_host)
+        subprocess.run(['ssh'] + opts + ['-f', '-N', self.ssh_host],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       timeout=self.cmd_timeout, check=True)
 
     def run_on_remote(self, cmd, timeout=None):
         """
@@ -597,9 +924,7 @@ class SupRsyncFileHandler:
         """
         _cmd = []
         if self.ssh_host is not None:
-            _cmd += ['ssh', self.ssh_host]
-            if self.ssh_key is not None:
-                _cmd.extend(['-i', self.ssh_key])
+            _cmd += ['ssh'] + self._ssh_opts() + [self.ssh_host]
         _cmd += cmd
 
         if timeout is None:
@@ -612,6 +937,141 @@ class SupRsyncFileHandler:
                            cmd=_cmd, err=res.stderr.decode())
         return res
 
+    def _get_remote_checksums(self, algorithms):
+        """
+        Computes checksums on the remote.
+
+        Args
+        ----
+            algorithms : dict
+                Map from remote path to the checksum algorithm of that file.
+
+        Returns
+        -------
+            checksums : dict
+                Map from remote path to checksum, for each file that could be
+                found on the remote.
+        """
+        by_algorithm = {}
+        for remote_path, algorithm in algorithms.items():
+            by_algorithm.setdefault(algorithm, []).append(remote_path)
+
+        checksums = {}
+        for algorithm, remote_paths in by_algorithm.items():
+            res = self.run_on_remote([CHECKSUM_COMMANDS[algorithm]] + remote_paths)
+            for line in res.stdout.decode().split('\n'):
+                split = line.split()
+
+                # If file cannot be found, line will say:
+                # "md5sum: file: No such file or directory
+                if len(split) != 2:
+                    continue
+
+                checksum, path = split
+                key = os.path.normpath(path)
+                if key in algorithms:
+                    checksums[key] = checksum
+        return checksums
+
+    def _timed_remote_checksums(self, algorithms):
+        t0 = time.time()
+        checksums = self._get_remote_checksums(algorithms)
+        self.transfer_stats['checksum_latency'] = time.time() - t0
+        return checksums
+
+    def _check_files(self, file_map, checksums):
+        """
+        Stores remote checksums, and counts a failed copy attempt for each
+        file whose checksums do not match.
+
+        Args
+        ----
+            file_map : dict
+                Map from remote path to SupRsyncFile.
+            checksums : dict
+                Map from remote path to remote checksum.
+
+        Returns
+        -------
+            copy_attempts : list of (str, bool)
+                Path to each file, and whether the remote checksum matched.
+        """
+        output = []
+        for remote_path, file in file_map.items():
+            file.remote_md5sum = checksums.get(remote_path)
+            md5_ok = (file.remote_md5sum == file.local_md5sum)
+            output.append((file.local_path, md5_ok))
+            if not md5_ok:
+                file.failed_copy_attempts += 1
+                self.log.info(
+                    f"Copy failed for file {file.local_path}! "
+                    f"(copy attempts: {file.failed_copy_attempts})"
+                )
+                self.log.info(f"Local md5: {file.local_md5sum}, "
+                              f"remote_md5: {file.remote_md5sum}")
+        return output
+
+    def _finish_pending(self):
+        """
+        Waits for the remote checksums of the previous batch, and checks
+        them against the local checksums in their own db session.
+        """
+        if self._pending is None:
+            return []
+        future, id_map = self._pending
+        self._pending = None
+        checksums = future.result()
+        with self.srfm.Session.begin() as session:
+            files = session.query(SupRsyncFile).filter(
+                SupRsyncFile.id.in_(list(id_map.values()))
+            ).all()
+            files_by_id = {file.id: file for file in files}
+            file_map = {path: files_by_id[file_id]
+                        for path, file_id in id_map.items()
+                        if file_id in files_by_id}
+            return self._check_files(file_map, checksums)
+
+    def _split_streams(self, files):
+        """
+        Splits files between rsync streams, largest first, each going to
+        the stream with the fewest bytes so far.
+
+        Returns
+        -------
+            streams : list of (list of SupRsyncFile, int)
+                Files, and their total size, for each non-empty stream.
+        """
+        sizes = {file.id: os.path.getsize(file.local_path) for file in files}
+        streams = [([], 0) for _ in range(min(self.num_streams, len(files)))]
+        for file in sorted(files, key=lambda f: sizes[f.id], reverse=True):
+            i = min(range(len(streams)), key=lambda i: streams[i][1])
+            streams[i] = (streams[i][0] + [file], streams[i][1] + sizes[file.id])
+        return streams
+
+    def _rsync(self, src_dir, dest, nbytes):
+        """Copies the contents of src_dir to dest, and returns its stats."""
+        cmd = ['rsync', '-Lrt']
+        if self.chmod:
+            cmd += ['-p', f'--chmod={self.chmod}']
+        if self.compression:
+            cmd.append('-z')
+        if self.bwlimit:
+            cmd.append(f'--bwlimit={self.bwlimit}')
+        ssh_opts = self._ssh_opts()
+        if ssh_opts:
+            cmd.extend(['--rsh', ' '.join(['ssh'] + ssh_opts)])
+        cmd.extend([src_dir + '/', dest])
+
+        self.log.debug(f"Running: {' '.join(cmd)}")
+        t0 = time.time()
+        subprocess.run(cmd, check=True, timeout=self.copy_timeout)
+        latency = time.time() - t0
+        return {
+            'bytes': nbytes,
+            'latency': latency,
+            'throughput': nbytes / latency if latency > 0 else 0.,
+        }
+
     def copy_files(self, max_copy_attempts=None, num_files=None):
         """
         Copies a batch of files, and computes remote md5sums.
@@ -627,99 +1087,127 @@ class SupRsyncFileHandler:
         -------
             copy_attempts : list of (str, bool)
                 Each entry of the list provides the path to the copied file,
-                and a bool indicating wheter the remote md5sum matched.
+                and a bool indicating wheter the remote md5sum matched. When
+                pipelining, these are the files of the previous batch.
         """
         output = []
+        exclude_ids = None
+        if self._pending is not None:
+            exclude_ids = list(self._pending[1].values())
+
         with self.srfm.Session.begin() as session:
             files = self.srfm.get_copyable_files(
                 self.archive_name, max_copy_attempts=max_copy_attempts,
-                num_files=num_files, session=session
+                num_files=num_files, session=session, exclude_ids=exclude_ids
             )
 
             if not files:
-                return []
+                return self._finish_pending()
 
             if self.ssh_host is not None:
                 dest = self.ssh_host + ':' + self.remote_basedir
             else:
                 dest = self.remote_basedir
 
-            # Creates temp directory with remote dir structure of symlinks for
-            # rsync to copy.
+            copyable = []
+            self.log.info("Copying files:")
+            for file in files:
+                self.log.info(f"- {file.local_path}")
+                if not os.path.exists(file.local_path):
+                    self.log.warn("Cannot find file {path}", path=file.local_path)
+                    file.failed_copy_attempts += 1
+                    output.append((file.local_path, False))
+                    continue
+                copyable.append(file)
+            streams = self._split_streams(copyable)
+
+            # Creates temp directories with remote dir structure of symlinks
+            # for rsync to copy, one per stream.
             file_map = {}
-            remote_paths = []
             with tempfile.TemporaryDirectory() as tmp_dir:
-                self.log.info("Copying files:")
-                for file in files:
-                    self.log.info(f"- {file.local_path}")
-                    tmp_path = os.path.join(tmp_dir, file.remote_path)
-                    os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
-
-                    if not os.path.exists(file.local_path):
-                        self.log.warn("Cannot find file {path}", path=file.local_path)
-                        file.failed_copy_attempts += 1
-                        continue
-
-                    if os.path.exists(tmp_path):
-                        self.log.warn("Temp file {path} already exists!", path=tmp_path)
-                        file.failed_copy_attempts += 1
-                        continue
-
-                    os.symlink(file.local_path, tmp_path)
-
-                    remote_path = os.path.normpath(
-                        os.path.join(self.remote_basedir, file.remote_path)
-                    )
-                    remote_paths.append(remote_path)
-                    file_map[remote_path] = file
-
-                cmd = ['rsync', '-Lrt']
-                if self.chmod:
-                    cmd += ['-p', f'--chmod={self.chmod}']
-                if self.compression:
-                    cmd.append('-z')
-                if self.bwlimit:
-                    cmd.append(f'--bwlimit={self.bwlimit}')
-                if self.ssh_key is not None:
-                    cmd.extend(['--rsh', f'ssh -i {self.ssh_key}'])
-                cmd.extend([tmp_dir + '/', dest])
-
-                self.log.debug(f"Running: {' '.join(cmd)}")
-                subprocess.run(cmd, check=True, timeout=self.copy_timeout)
+                src_dirs = []
+                for i, (stream_files, _) in enumerate(streams):
+                    src_dir = os.path.join(tmp_dir, f'stream{i}')
+                    src_dirs.append(src_dir)
+                    for file in stream_files:
+                        tmp_path = os.path.join(src_dir, file.remote_path)
+                        os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+
+                        if os.path.exists(tmp_path):
+                            self.log.warn("Temp file {path} already exists!",
+                                          path=tmp_path)
+                            file.failed_copy_attempts += 1
+                            output.append((file.local_path, False))
+                            continue
+
+                        os.symlink(file.local_path, tmp_path)
+
+                        remote_path = os.path.normpath(
+                            os.path.join(self.remote_basedir, file.remote_path)
+                        )
+                        file_map[remote_path] = file
+
+                if streams:
+                    self._start_control_master()
+                with ThreadPoolExecutor(max_workers=max(1, len(streams))) as pool:
+                    futures = [pool.submit(self._rsync, src_dir, dest, nbytes)
+                               for src_dir, (_, nbytes) in zip(src_dirs, streams)]
+                    # Checks the previous batch while this one is copied.
+                    output += self._finish_pending()
+                    stream_stats = [f.result() for f in futures]
+
+            # Drops stats from streams that weren't used in this batch.
+            for k in [k for k in self.transfer_stats if k.startswith('stream')]:
+                del self.transfer_stats[k]
+            for i, stats in enumerate(stream_stats):
+                self.transfer_stats['bytes_copied'] += stats['bytes']
+                for k, v in stats.items():
+                    self.transfer_stats[f'stream{i}_{k}'] = v
 
             # Mark all files as 'copied' to remote.
             for file in files:
                 file.copied = time.time()
 
-            self.log.info("Checksumming on remote.")
-            res = self.run_on_remote(['md5sum'] + remote_paths)
-            for line in res.stdout.decode().split('\n'):
-                split = line.split()
-
-                # If file cannot be found, line will say:
-                # "md5sum: file: No such file or directory
-                if len(split) != 2:
-                    continue
+            algorithms = {path: file.checksum_algorithm
+                          for path, file in file_map.items()}
+            if self.pipeline:
+                if self._checksum_executor is None:
+                    self._checksum_executor = ThreadPoolExecutor(max_workers=1)
+                self.log.info("Checksumming on remote in the background.")
+                future = self._checksum_executor.submit(
+                    self._timed_remote_checksums, algorithms)
+                self._pending = (future, {path: file.id
+                                          for path, file in file_map.items()})
+            else:
+                self.log.info("Checksumming on remote.")
+                checksums = self._timed_remote_checksums(algorithms)
+                output += self._check_files(file_map, checksums)
 
-                md5sum, path = line.split()
-                key = os.path.normpath(path)
-                if key in file_map:
-                    file_map[key].remote_md5sum = md5sum
+            self.log.info("Copy session complete.")
 
-            for file in files:
-                md5_ok = (file.remote_md5sum == file.local_md5sum)
-                output.append((file.local_path, md5_ok))
-                if not md5_ok:
-                    file.failed_copy_attempts += 1
-                    self.log.info(
-                        f"Copy failed for file {file.local_path}! "
-                        f"(copy attempts: {file.failed_copy_attempts})"
-                    )
-                    self.log.info(f"Local md5: {file.local_md5sum}, "
-                                  f"remote_md5: {file.remote_md5sum}")
+        return output
 
-            self.log.info("Copy session complete.")
+    def close(self):
+        """
+        Checks any remote checksums still pending, and closes the persistent
+        ssh connection.
 
+        Returns
+        -------
+            copy_attempts : list of (str, bool)
+                Results for the pending files, as returned by copy_files.
+        """
+        try:
+            output = self._finish_pending()
+        finally:
+            if self._checksum_executor is not None:
+                self._checksum_executor.shutdown()
+                self._checksum_executor = None
+            if self._control_dir is not None:
+                subprocess.run(['ssh'] + self._ssh_opts() + ['-O', 'exit', self.ssh_host],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                shutil.rmtree(self._control_dir, ignore_errors=True)
+                self._control_dir = None
         return output
 
     def delete_files(self, delete_after):
@@ -6,9 +6,10 @@ import argparse
 import os
 import time
 
-from tqdm.auto import trange
+from tqdm.auto import tqdm
 
 from socs.db.suprsync import SupRsyncFile, SupRsyncFilesManager
+from socs.util import CHECKSUM_COMMANDS
 
 
 def check_func(args):
@@ -49,10 +50,6 @@ def add_local_files_func(args):
 
     args.local_root = os.path.abspath(args.local_root)
 
-    # Needs access to a session to build `known_paths`.
-    with srfm.Session.begin() as session:
-        known_files = srfm.get_known_files(args.archive_name, session=session)
-        known_paths = [f.local_path for f in known_files]
     local_paths = []
     remote_paths = []
     now = time.time()
@@ -61,26 +58,38 @@ def add_local_files_func(args):
         for file in files:
             path = os.path.join(root, file)
             path = os.path.abspath(path)
-            if path not in known_paths and now - os.stat(path).st_mtime >= args.last_edit:
+            if now - os.stat(path).st_mtime >= args.last_edit:
                 local_paths.append(path)
                 remote_paths.append(os.path.relpath(path, args.local_root))
 
     if args.dry:
         print("Dry run\n" + 40 * '-')
 
-        if len(local_paths) == 0:
+        with srfm.Session() as session:
+            known_paths = {path for path, in session.query(SupRsyncFile.local_path).filter(
+                SupRsyncFile.archive_name == args.archive_name
+            )}
+        new = [i for i, path in enumerate(local_paths) if path not in known_paths]
+        if len(new) == 0:
             print("No files to add")
             return
 
-        print(f"Would add {len(local_paths)} files, including:")
-        n = min(len(local_paths), 10)
-        for i in range(n):
+        print(f"Would add {len(new)} files, including:")
+        for i in new[:10]:
             print(f"{i}: {local_paths[i]} --> {remote_paths[i]}")
         return
 
-    print(f"Adding {len(local_paths)} files to the add to {args.db} from {args.local_root}")
-    for i in trange(len(local_paths)):
-        srfm.add_file(local_paths[i], remote_paths[i], args.archive_name)
+    # Files already in the db are skipped, so an interrupted run can be
+    # resumed by running the same command again.
+    print(f"Adding files from {args.local_root} to {args.db}")
+    entries = ((local_path, remote_path, args.archive_name)
+               for local_path, remote_path in zip(local_paths, remote_paths))
+    num_added = srfm.add_files_bulk(
+        tqdm(entries, total=len(local_paths)),
+        checksum_algorithm=args.checksum_algorithm,
+        batch_size=args.batch_size,
+    )
+    print(f"Added {num_added} files")
 
 
 def main():
@@ -129,6 +138,11 @@ def main():
     )
     add_local_files_parser.add_argument('--dry', action='store_true',
                                         help="Does a dry run and prints what files would be added")
+    add_local_files_parser.add_argument('--checksum-algorithm', default='md5',
+                                        choices=list(CHECKSUM_COMMANDS),
+                                        help="Checksum algorithm for added files. Default: md5")
+    add_local_files_parser.add_argument('--batch-size', type=int, default=500,
+                                        help="Number of files to add per db transaction. Default: 500")
 
     args = parser.parse_args()
 
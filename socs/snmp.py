@@ -3,7 +3,10 @@ import os
 import txaio
 from pysnmp.hlapi.twisted import (CommunityData, ContextData, ObjectIdentity,
                                   ObjectType, SnmpEngine, UdpTransportTarget,
-                                  UsmUserData, getCmd, setCmd)
+                                  UsmUserData, bulkCmd, getCmd, nextCmd,
+                                  setCmd)
+from pysnmp.proto.rfc1905 import EndOfMibView
+from twisted.internet.defer import inlineCallbacks, succeed
 
 from socs import mibs
 
@@ -48,6 +51,42 @@ class SNMPTwister:
         self.udp_transport = UdpTransportTarget((address, port))
         self.log = txaio.make_logger()
 
+        # Cache of MIB objects, keyed by their (MIB, name, index) tuples.
+        # pysnmp resolves an object against the MIBs the first time it is
+        # sent, and keeps the result, so reusing them avoids resolving the
+        # same OIDs on every request.
+        self._identities = {}
+        self._object_types = {}
+
+    def _object_identity(self, oid):
+        """Get the cached ObjectIdentity for an OID tuple."""
+        identity = self._identities.get(oid)
+        if identity is None:
+            identity = ObjectIdentity(*oid).addMibSource(MIB_SOURCE)
+            self._identities[oid] = identity
+        return identity
+
+    def _object_type(self, oid):
+        """Get the cached ObjectType for an OID tuple, for use in requests
+        for the OID's value. ObjectTypes are returned unchanged."""
+        if not isinstance(oid, tuple):
+            return oid
+        object_type = self._object_types.get(oid)
+        if object_type is None:
+            object_type = ObjectType(self._object_identity(oid))
+            self._object_types[oid] = object_type
+        return object_type
+
+    @staticmethod
+    def _auth_data(version, community_name):
+        if version == 1:
+            return CommunityData(community_name, mpModel=0)  # SNMPv1
+        elif version == 2:
+            return CommunityData(community_name)  # SNMPv2c
+        elif version == 3:
+            return UsmUserData('ocs')  # SNMPv3 (no auth, no privacy)
+        raise ValueError(f'SNMP version {version} not supported.')
+
     def _success(self, args):
         """Success callback.
 
@@ -83,6 +122,30 @@ class SNMPTwister:
         """
         self.log.error('%s failure: %s' % (self.address, error_indication))
 
+    def _success_table(self, args):
+        """Success callback for GETNEXT and GETBULK requests.
+
+        Returns
+        -------
+        list
+            The table of var_binds returned in the SNMP response, as a list of
+            rows, or None if the response reported an error.
+
+        """
+        (error_status, error_index, var_bind_table) = args
+
+        if error_status:
+            self.log.error('%s: %s at index %s' % (self.address,
+                                                   error_status.prettyPrint(),
+                                                   error_index))
+            return None
+
+        for row in var_bind_table:
+            for var in row:
+                self.log.debug(var.prettyPrint())
+
+        return var_bind_table
+
     def get(self, oid_list, version):
         """Issue a getCmd to get SNMP OID states.
 
@@ -132,20 +195,8 @@ class SNMPTwister:
             instances representing MIB variables returned in SNMP response.
 
         """
-        oid_list = [ObjectType(ObjectIdentity(*x).addMibSource(MIB_SOURCE))
-                    if isinstance(x, tuple)
-                    else x
-                    for x
-                    in oid_list]
-
-        if version == 1:
-            version_object = CommunityData('public', mpModel=0)  # SNMPv1
-        elif version == 2:
-            version_object = CommunityData('public')  # SNMPv2c
-        elif version == 3:
-            version_object = UsmUserData('ocs')  # SNMPv3 (no auth, no privacy)
-        else:
-            raise ValueError(f'SNMP version {version} not supported.')
+        oid_list = [self._object_type(x) for x in oid_list]
+        version_object = self._auth_data(version, 'public')
 
         datagram = getCmd(self.snmp_engine,
                           version_object,
@@ -157,6 +208,156 @@ class SNMPTwister:
 
         return datagram
 
+    def get_next(self, oid_list, version):
+        """Issue a nextCmd to get the SNMP OIDs following each of those given.
+
+        Parameters
+        ----------
+        oid_list : list
+            List of high-level MIB Object OIDs, as for :meth:`get`.
+        version : int
+            SNMP version for communicaton (1, 2, or 3).
+
+        Returns
+        ------
+        twisted.internet.defer.Deferred
+            A Deferred which will callback with the table of var_binds from
+            self._success_table. This has a single row, with an ObjectType for
+            each requested OID, or is None if the request failed.
+
+        """
+        oid_list = [self._object_type(x) for x in oid_list]
+        version_object = self._auth_data(version, 'public')
+
+        datagram = nextCmd(self.snmp_engine,
+                           version_object,
+                           self.udp_transport,
+                           ContextData(),
+                           *oid_list)
+
+        datagram.addCallback(self._success_table).addErrback(self._failure)
+
+        return datagram
+
+    def get_bulk(self, oid_list, version, non_repeaters=0, max_repetitions=25):
+        """Issue a bulkCmd to get the SNMP OIDs following those given, in a
+        single request. Not supported by SNMPv1.
+
+        Example
+        -------
+        >>> snmp = SNMPTwister('localhost', 161)
+        >>> table = yield snmp.get_bulk([('UPS-MIB', 'upsOutputVoltage'),
+                                         ('UPS-MIB', 'upsOutputCurrent')],
+                                        version=2, max_repetitions=3)
+        >>> print(table[0][0])
+        UPS-MIB::upsOutputVoltage.1 = 120
+
+        Parameters
+        ----------
+        oid_list : list
+            List of high-level MIB Object OIDs, as for :meth:`get`.
+        version : int
+            SNMP version for communicaton (2 or 3).
+        non_repeaters : int
+            Number of OIDs, at the start of oid_list, for which only the
+            following OID is returned.
+        max_repetitions : int
+            Number of following OIDs to return for each of the remaining OIDs.
+            The SNMP agent may return fewer.
+
+        Returns
+        ------
+        twisted.internet.defer.Deferred
+            A Deferred which will callback with the table of var_binds from
+            self._success_table, with a row per repetition, or None if the
+            request failed.
+
+        """
+        if version == 1:
+            raise ValueError('GETBULK is not supported by SNMPv1.')
+
+        oid_list = [self._object_type(x) for x in oid_list]
+        version_object = self._auth_data(version, 'public')
+
+        datagram = bulkCmd(self.snmp_engine,
+                           version_object,
+                           self.udp_transport,
+                           ContextData(),
+                           non_repeaters,
+                           max_repetitions,
+                           *oid_list)
+
+        datagram.addCallback(self._success_table).addErrback(self._failure)
+
+        return datagram
+
+    @inlineCallbacks
+    def walk(self, oid_list, version, max_repetitions=25):
+        """Get all of the OIDs within each of the given subtrees, such as the
+        columns of a table.
+
+        All of the subtrees are walked together, with GETBULK requests (or
+        GETNEXT requests with SNMPv1), until each reaches its end.
+
+        Example
+        -------
+        >>> snmp = SNMPTwister('localhost', 161)
+        >>> voltages, currents = yield snmp.walk(
+                [('UPS-MIB', 'upsOutputVoltage'),
+                 ('UPS-MIB', 'upsOutputCurrent')], version=2)
+        >>> print(voltages[0])
+        UPS-MIB::upsOutputVoltage.1 = 120
+
+        Parameters
+        ----------
+        oid_list : list
+            List of high-level MIB Object OIDs for the root of each subtree,
+            as for :meth:`get`.
+        version : int
+            SNMP version for communicaton (1, 2, or 3).
+        max_repetitions : int
+            Number of OIDs to request at once for each subtree.
+
+        Returns
+        ------
+        twisted.internet.defer.Deferred
+            A Deferred which will callback with a list of ObjectTypes in each
+            subtree, for each in oid_list, or None if a request failed.
+
+        """
+        roots = [self._object_type(x) for x in oid_list]
+        results = [[] for _ in roots]
+
+        # (index in oid_list, OID to continue from) for unfinished subtrees
+        active = list(enumerate(roots))
+        while active:
+            request = [oid for _, oid in active]
+            if version == 1:
+                table = yield self.get_next(request, version)
+            else:
+                table = yield self.get_bulk(request, version,
+                                            max_repetitions=max_repetitions)
+            if table is None:
+                return None
+
+            still_active = []
+            for j, (i, oid) in enumerate(active):
+                # Roots have been resolved against the MIBs by the request
+                prefix = roots[i][0].getOid()
+                ended = not table
+                for row in table:
+                    var = row[j]
+                    if (isinstance(var[1], EndOfMibView)
+                            or not prefix.isPrefixOf(var[0].getOid())):
+                        ended = True
+                        break
+                    results[i].append(var)
+                if not ended:
+                    still_active.append((i, ObjectType(results[i][-1][0])))
+            active = still_active
+
+        return results
+
     def set(self, oid_list, version, setvalue, community_name='private'):
         """Issue a setCmd to set SNMP OID states.
         See `Modifying MIB variables`_ for more info on setting OID states.
@@ -184,20 +385,12 @@ class SNMPTwister:
             instances representing MIB variables returned in SNMP response.
 
         """
-        oid_list = [ObjectType(ObjectIdentity(*x).addMibSource(MIB_SOURCE), setvalue)
+        oid_list = [ObjectType(self._object_identity(x), setvalue)
                     if isinstance(x, tuple)
                     else x
                     for x
                     in oid_list]
-
-        if version == 1:
-            version_object = CommunityData(community_name, mpModel=0)  # SNMPv1
-        elif version == 2:
-            version_object = CommunityData(community_name)  # SNMPv2c
-        elif version == 3:
-            version_object = UsmUserData('ocs')  # SNMPv3 (no auth, no privacy)
-        else:
-            raise ValueError(f'SNMP version {version} not supported.')
+        version_object = self._auth_data(version, community_name)
 
         datagram = setCmd(self.snmp_engine,
                           version_object,
@@ -208,3 +401,73 @@ class SNMPTwister:
         datagram.addCallback(self._success).addErrback(self._failure)
 
         return datagram
+
+
+class SNMPPoll:
+    """A set of OIDs that are polled together, declared once and requested
+    with as few SNMP requests as possible on each poll.
+
+    Individual OIDs are requested in a single GET, while subtrees (such as
+    the columns of a table with a varying number of rows) are walked
+    together, at the same time.
+
+    Example
+    -------
+    >>> snmp = SNMPTwister('localhost', 161)
+    >>> poll = SNMPPoll(snmp, 2,
+                        get_list=[('UPS-MIB', 'upsBatteryStatus', 0)],
+                        walk_list=[('UPS-MIB', 'upsOutputVoltage'),
+                                   ('UPS-MIB', 'upsOutputCurrent')])
+    >>> get_result, (voltages, currents) = yield poll.run()
+
+    Parameters
+    ----------
+    snmp : SNMPTwister
+        SNMPTwister for the SNMP Agent to poll.
+    version : int
+        SNMP version for communicaton (1, 2, or 3).
+    get_list : list
+        List of high-level MIB Object OIDs to GET, as for
+        :meth:`SNMPTwister.get`.
+    walk_list : list
+        List of high-level MIB Object OIDs for subtrees to walk, as for
+        :meth:`SNMPTwister.walk`.
+    max_repetitions : int
+        Number of OIDs to request at once for each subtree.
+
+    """
+
+    def __init__(self, snmp, version, get_list=(), walk_list=(),
+                 max_repetitions=25):
+        self.snmp = snmp
+        self.version = version
+        self.get_list = list(get_list)
+        self.walk_list = list(walk_list)
+        self.max_repetitions = max_repetitions
+
+    @inlineCallbacks
+    def run(self):
+        """Poll all of the OIDs.
+
+        Returns
+        ------
+        twisted.internet.defer.Deferred
+            A Deferred which will callback with a tuple of the results of the
+            GET and of the walk, as returned by :meth:`SNMPTwister.get` and
+            :meth:`SNMPTwister.walk`, or None if either failed.
+
+        """
+        # Send both requests before waiting for either response
+        get_deferred = succeed([])
+        walk_deferred = succeed([])
+        if self.get_list:
+            get_deferred = self.snmp.get(self.get_list, self.version)
+        if self.walk_list:
+            walk_deferred = self.snmp.walk(self.walk_list, self.version,
+                                           max_repetitions=self.max_repetitions)
+
+        get_result = yield get_deferred
+        walk_result = yield walk_deferred
+        if get_result is None or walk_result is None:
+            return None
+        return get_result, walk_result
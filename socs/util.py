@@ -1,9 +1,67 @@
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
+#: Size of the blocks read from disk when computing checksums.
+CHECKSUM_BLOCK_SIZE = 1 << 20
 
-def get_md5sum(filename):
-    m = hashlib.md5()
+#: Checksum algorithms supported by get_checksum, and the command that
+#: produces the same checksum (in the same output format) on a remote
+#: host.
+CHECKSUM_COMMANDS = {
+    'md5': 'md5sum',
+    'blake2b': 'b2sum',
+}
+
+
+def get_checksum(filename, algorithm='md5'):
+    """Compute the checksum of a file, as a hex string.
+
+    Args:
+        filename (str): Path to the file.
+        algorithm (str): One of the keys of CHECKSUM_COMMANDS.
 
-    for line in open(filename, 'rb'):
-        m.update(line)
+    """
+    if algorithm not in CHECKSUM_COMMANDS:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    m = hashlib.new(algorithm)
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b''):
+            m.update(block)
     return m.hexdigest()
+
+
+def get_checksums(filenames, algorithm='md5', max_workers=None,
+                  return_exceptions=False):
+    """Compute checksums for many files, using a pool of threads (hashlib
+    releases the GIL while hashing large blocks).
+
+    Args:
+        filenames (list of str): Paths to the files.
+        algorithm (str): Checksum algorithm; see get_checksum.
+        max_workers (int): Number of threads; defaults to the
+            ThreadPoolExecutor default.
+        return_exceptions (bool): If True, an error for a file (such as
+            it not existing) is returned in place of its checksum, instead
+            of being raised.
+
+    Returns:
+        List of checksums, in the same order as filenames.
+
+    """
+    def _get(filename):
+        try:
+            return get_checksum(filename, algorithm)
+        except Exception as e:
+            if return_exceptions:
+                return e
+            raise
+
+    filenames = list(filenames)
+    if len(filenames) <= 1:
+        return [_get(f) for f in filenames]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_get, filenames))
+
+
+def get_md5sum(filename):
+    return get_checksum(filename, 'md5')
@@ -1,8 +1,12 @@
+import struct
+
 import numpy as np
+from twisted.internet import defer
+from twisted.python.failure import Failure
 
 from socs.agents.acu import avoidance as av
-from socs.agents.acu import drivers, hvac, hwp_iface
-from socs.agents.acu.agent import ACUAgent  # noqa: F401
+from socs.agents.acu import drivers, hvac, hwp_iface, publisher
+from socs.agents.acu.agent import MONITOR_DATASET_PERIODS, ACUAgent
 
 HWP_IFACE_TEST_CONFIG = {
     'enabled': True,
@@ -175,6 +179,15 @@ def test_avoidance_night():
     assert info['sun_dist_min'] < 1.
     assert info['sun_time'] > 12 * 3600
 
+    # Per-point results for a longer trajectory.
+    az, el = az0 + np.linspace(-20, 20, 5), np.zeros(5) + el0
+    sun_delta, sun_dists = sun.check_trajectory(az, el, raw=True)
+    assert sun_delta.shape == (5,) and sun_dists.shape == (5,)
+    info = sun.check_trajectory(az, el)
+    assert sun_delta.min() == info['sun_time']
+    assert sun_dists[0] == info['sun_dist_start']
+    assert abs(sun_dists.mean() - info['sun_dist_mean']) < 1e-9
+
     # Find safe paths
     paths = sun.analyze_paths(az0 - 50, el0, az0 + 50, el0)
     path, analysis = sun.select_move(paths)
@@ -283,6 +296,111 @@ def test_avoidance_sunset():
     assert info['sun_time'] > 16 * 3600
 
 
+def test_avoidance_incremental():
+    # Rotated maps should closely match full recomputation.
+    t0 = 1698850000
+    sun0 = av.SunTracker(fake_now=t0)
+    sun1 = av.SunTracker(fake_now=t0 + 6 * 3600, compute=False)
+    sun1.reset(reference=sun0)
+    sun2 = av.SunTracker(fake_now=t0 + 6 * 3600)
+    assert sun1.base_time == sun2.base_time
+    assert np.all(abs(sun1.sun_dist - sun2.sun_dist) < 0.5)
+    assert np.mean(sun1.sun_times_up != sun2.sun_times_up) < 0.2
+    for az, el in [(90, 60), (270, 60), (72, 170)]:
+        assert (sun1.check_trajectory([az], [el])['sun_time'] > 0) == \
+            (sun2.check_trajectory([az], [el])['sun_time'] > 0)
+
+    # Incompatible reference triggers full recomputation.
+    sun3 = av.SunTracker(fake_now=t0 + 6 * 3600, compute=False,
+                         policy={'exclusion_radius': 30})
+    sun3.reset(reference=sun0)
+    sun4 = av.SunTracker(fake_now=t0 + 6 * 3600,
+                         policy={'exclusion_radius': 30})
+    assert np.all(sun3.sun_times_up == sun4.sun_times_up)
+
+
+def _check_point(sun, az, el, t, ref_t):
+    # Per-point reference for check_trajectory: look up the Sun
+    # Safety Time at (az, el, t), applying the Sun-below-horizon
+    # correction for time ref_t.
+    (j,), (i,) = sun._azel_pix([az], [el], dt=t - sun.base_time)
+    sun_time = sun.sun_times_up[j, i]
+    az_sun, el_sun = sun.get_sun_pos(t=ref_t)['sun_azel']
+    if el_sun < sun.policy['el_horizon']:
+        if az_sun > 180:
+            sun_time = sun.sun_times_dn[j, i]
+        else:
+            sun_time = max(sun_time, sun._next_rise_time(ref_t) - ref_t)
+    if sun.get_sun_pos(az, el, t=t)['platform_down']:
+        sun_time = av.NO_TIME
+    return sun_time, sun.sun_dist[j, i]
+
+
+def test_avoidance_batch():
+    # Batched evaluation should match per-point evaluation.  The
+    # tracker's map covers a sunset (Sun down, setting), the following
+    # sunrise (Sun down, rising) and the day after it.
+    t_set, t_rise, t_day = 1750110900, 1750158000, 1750170000
+    sun = av.SunTracker(fake_now=t_set)
+    assert sun.get_sun_pos(t=t_set)['sun_down']
+    assert sun.get_sun_pos(t=t_rise)['sun_down']
+    assert not sun.get_sun_pos(t=t_day)['sun_down']
+
+    arc = (np.linspace(240, 330, 20), np.zeros(20) + 10)
+    az_day, el_day = sun.get_sun_pos(t=t_day)['sun_azel']
+    trajs = [
+        arc,
+        arc + (t_rise,),
+        arc + (t_day,),
+        (np.array([az_day]), np.array([el_day]), t_day),
+        (np.array([60., 70.]), np.array([-60., 20.]), t_rise),
+        # A trajectory with its own time for each point.
+        (np.linspace(90, 100, 10), np.linspace(20, 80, 10),
+         t_day + np.arange(10) * 600.),
+    ]
+    info = sun.check_trajectories(trajs, t=t_set)
+
+    for idx, traj in enumerate(trajs):
+        az, el = traj[0], traj[1]
+        t = np.broadcast_to(traj[2] if len(traj) > 2 else t_set, az.shape)
+        times, dists = np.transpose([
+            _check_point(sun, _az, _el, _t, t[0])
+            for _az, _el, _t in zip(az, el, t)])
+        assert info['sun_time'][idx] == times.min()
+        assert info['sun_time_start'][idx] == times[0]
+        assert info['sun_time_stop'][idx] == times[-1]
+        assert info['sun_dist_min'][idx] == dists.min()
+        assert info['sun_dist_start'][idx] == dists[0]
+        assert info['sun_dist_stop'][idx] == dists[-1]
+        assert abs(info['sun_dist_mean'][idx] - dists.mean()) < 1e-9
+
+        # Single-trajectory and raw evaluation agree too.
+        if len(traj) == 2 or np.ndim(traj[2]) == 0:
+            single = sun.check_trajectory(az, el, t=t[0])
+            for k, v in single.items():
+                assert info[k][idx] == v
+            raw_times, raw_dists = sun.check_trajectory(
+                az, el, t=t[0], raw=True)
+            assert np.all(raw_times == times)
+            assert np.all(raw_dists == dists)
+
+    # After sunset, sun_time uses the setting map; before sunrise, it
+    # is at least the time until sunrise.
+    assert info['sun_time'][0] > 16 * 3600
+    dt_rise = sun._next_rise_time(t_rise) - t_rise
+    assert np.all(info['sun_time'][[1, 4]] >= dt_rise)
+    assert info['sun_time'][3] == 0
+
+    # Bad trajectories.
+    for bad in [(np.zeros(2), np.zeros(3)), (np.zeros(0), np.zeros(0))]:
+        try:
+            sun.check_trajectories([bad])
+        except ValueError:
+            pass
+        else:
+            assert False, 'Expected ValueError.'
+
+
 def test_tracks():
     # Basic function testing.
     g = drivers.generate_constant_velocity_scan(
@@ -293,6 +411,353 @@ def test_tracks():
                                   timestamp_offset=3)
 
 
+def test_tracks_const_vel_reference():
+    # Point counts, flags and times, as produced by the original
+    # point-by-point generator.
+    kw = dict(start_time=1800000000, step_time=.1, num_scans=2)
+    for extra, count, flag2, t_end in [
+            ({}, 150, [49, 149], 5.),
+            ({'az_first_pos': 65.3}, 174, [73, 173], 7.35),
+            ({'az_first_pos': 65.3, 'turnaround_method': 'two_leg'},
+             194, list(range(73, 94)) + [193], 7.35)]:
+        g = drivers.generate_constant_velocity_scan(
+            60, 80, 2, 2, 50, 50, **kw, **extra)
+        points = [p for block in g for p in block]
+        assert len(points) == count
+        flags = np.array([p.az_flag for p in points])
+        assert flags[0] == 0 and np.all(flags[1:] > 0)
+        assert list((flags == 2).nonzero()[0]) == flag2
+        assert sum(p.group_flag for p in points) == 3
+
+        # End of the first leg, and of the scan.
+        p = points[flag2[0]]
+        assert p.az == 80
+        assert abs(p.timestamp - 1800000000 - t_end) < 1e-6
+        p = points[-1]
+        assert p.az == 60 and p.az_vel == 0
+        assert abs(p.timestamp - 1800000000 - t_end - 12) < 1e-6
+
+
+def test_tracks_arrays():
+    # Array output should match the TrackPoint output.
+    for gen, args in [(drivers.generate_constant_velocity_scan,
+                       (60, 80, 1, 1, 50, 50)),
+                      (drivers.generate_type3_scan,
+                       (60, 80, 1, 1, 50, 50))]:
+        kw = dict(start_time=1800000000, step_time=.1, num_scans=3,
+                  batch_size=100, turnaround_method='standard_gen')
+        points = [p for block in gen(*args, **kw) for p in block]
+        blocks = list(gen(*args, as_arrays=True, **kw))
+        assert all(len(b) <= 100 for b in blocks)
+        arr = np.concatenate(blocks)
+        assert arr.dtype == drivers.TRACK_POINT_DTYPE
+        assert drivers.track_points_from_array(arr) == points
+
+
+def test_track_point_buffer():
+    # Buffer access and vectorized encoding should match the
+    # TrackPoint-based equivalents.
+    g = drivers.generate_constant_velocity_scan(
+        60, 80, 1, 1, 50, 50, start_time=1800000000.999,
+        step_time=.1, turnaround_method='standard_gen')
+    points = next(iter(g))
+    buf = drivers.TrackPointBuffer(points)
+    assert len(buf) == len(points)
+    assert buf[3] == points[3]
+    assert list(buf[10:20]) == points[10:20]
+    shifted = drivers.track_point_time_shift(buf, 10.)
+    assert shifted[0] == drivers.track_point_time_shift(points[0], 10.)
+    lines = drivers.get_track_points_text(buf, with_group_flag=True)
+    for p, (group_flag, line) in zip(points, lines):
+        assert group_flag == p.group_flag
+        assert line == (f'{drivers._progtrack_format_time(p.timestamp)}; '
+                        f'{p.az:.6f}; {p.el:.6f}; {p.az_vel:.4f}; '
+                        f'{p.el_vel:.4f}; {p.az_flag}; {p.el_flag}\r\n')
+
+    # Block retrieval respects the time and grouping constraints.
+    prov = drivers.PointProvider(iter([points[:7], buf[7:]]))
+    block = prov.pop_block(min_count=3, until=points[20].timestamp)
+    assert len(block) >= 21 and block.group_flag[-1] == 0
+    assert prov.pop() == points[len(block)]
+
+
+def test_from_file(tmp_path):
+    # All formats should give the same points; loopable tracks
+    # should repeat.
+    n = 100
+    t = 1800000000 + np.arange(n) * .1
+    az = 100 + np.sin(t)
+    data = {'timestamp': t, 'az': az, 'el': az * 0 + 50,
+            'az_vel': np.cos(t), 'el_vel': az * 0}
+    np.save(tmp_path / 'scan.npy', np.array(list(data.values())))
+    np.savetxt(tmp_path / 'scan.txt', np.transpose(list(data.values())))
+    np.savez(tmp_path / 'scan.npz', loopable=True, **data)
+    scans = [drivers.from_file(str(tmp_path / f'scan.{ext}'), chunk_size=30)
+             for ext in ['npy', 'txt', 'npz']]
+    for scan in scans:
+        assert scan.az_range == (az.min(), az.max())
+        assert abs(scan.step_time - .1) < 1e-6
+        assert abs(scan.max_accel['az'] - 1) < .01
+        assert abs(scan.max_vel['az'] - 1) < .01
+        assert scan.max_vel['el'] == 0
+    ref = scans[0].points
+    assert len(ref) == n
+    for scan in scans[1:]:
+        assert np.allclose(scan.points.az, ref.az[:len(scan.points)])
+    blocks = list(scans[0].iter_blocks(t_shift=100., block_time=2.))
+    assert all(b.timestamp[-1] - b.timestamp[0] < 2. for b in blocks)
+    assert np.all(np.concatenate([b.timestamp for b in blocks]) == ref.timestamp + 100.)
+    loop = scans[2].iter_blocks()
+    points = drivers.TrackPointBuffer.concatenate([next(loop) for i in range(10)])
+    assert len(points) > n
+    assert np.all(abs(points.timestamp[n - 1:n + 1] - t[-1:]) - [0, .1] < 1e-6)
+
+
+def test_udp_decoding():
+    # Bulk decoding of packed records should match struct.unpack.
+    fmt = '<iddi'
+    names = ['Day', 'Time', 'Azimuth', 'Flag']
+    records = [(100, 3600. * k, 180. + k, k) for k in range(5)]
+    data = b''.join([struct.pack(fmt, *r) for r in records])
+    dtype = drivers.struct_format_to_dtype(fmt, names)
+    assert dtype.itemsize == struct.calcsize(fmt)
+    samples = np.frombuffer(data, dtype=dtype)
+    for r, s in zip(records, samples):
+        assert tuple(s) == r
+
+    # Native alignment, pad bytes.
+    for fmt in ['@bid', '>h2xq', '=?f']:
+        assert drivers.struct_format_to_dtype(fmt).itemsize == struct.calcsize(fmt)
+
+    # Vectorized timecode.
+    now = 1750000000
+    acutimes = np.array([1.5, 100.25, 364.75])
+    ctimes = drivers.timecode(acutimes, now=now)
+    for a, c in zip(acutimes, ctimes):
+        assert c == drivers.timecode(a, now=now)
+
+
+def test_ring_buffer():
+    dtype = drivers.struct_format_to_dtype('<id', ['Day', 'Time'])
+    rb = drivers.RingBuffer(10, dtype)
+
+    def recs(start, n):
+        r = np.zeros(n, dtype)
+        r['Day'] = np.arange(start, start + n)
+        return r
+
+    rb.push(recs(0, 6), 1.)
+    times, r = rb.pop(4)
+    assert list(r['Day']) == [0, 1, 2, 3]
+    assert np.all(times == 1.)
+
+    # Wrap around, without overflow.
+    rb.push(recs(6, 8), np.arange(8.))
+    assert len(rb) == 10
+    assert rb.get_stats()['dropped'] == 0
+    times, r = rb.pop(3)
+    assert list(r['Day']) == [4, 5, 6]
+    assert list(times) == [1., 1., 0.]
+
+    # Overflow discards the oldest samples.
+    rb.push(recs(14, 5), 2.)
+    stats = rb.get_stats()
+    assert stats['depth'] == 10
+    assert stats['max_depth'] == 10
+    assert stats['dropped'] == 2
+    assert stats['overflows'] == 1
+    times, r = rb.pop(100)
+    assert list(r['Day']) == list(range(9, 19))
+    assert len(rb) == 0
+
+    # Single push larger than capacity.
+    rb.push(recs(0, 25), 3.)
+    assert list(rb.pop(10)[1]['Day']) == list(range(15, 25))
+    assert rb.get_stats()['dropped'] == 17
+
+
+#
+# Monitor block publishing
+#
+
+def test_status_publisher():
+    structure = [
+        ('ACU_summary', 'summary', 'tick', None),
+        ('ACU_faults', 'faults', None, None),
+        ('ACU_tilt', 'tilt', 'changed', 0.5),
+        ('ACU_commands', 'commands', None, None),
+        (None, 'dropped', None, None),
+    ]
+    pub = publisher.StatusPublisher(structure, 2.)
+    status = {
+        'summary': {'Time': 1.5, 'Year': 2025, 'Azimuth_mode': 'Stop'},
+        'faults': {'Az_fault': 'No Fault', 'Emergency': 0},
+        'tilt': {'Tilt_x': 0.1},
+        'commands': {'Azimuth_commanded_position': 180.,
+                     'Elevation_commanded_position': float('nan')},
+    }
+
+    def names(output, feed):
+        return sorted([b['block_name'] for f, b in output if f == feed])
+
+    # First pass publishes everything.
+    out = pub.process(status, 100.)
+    assert names(out, 'acu_status') == [
+        'ACU_commands', 'ACU_faults', 'ACU_summary', 'ACU_tilt']
+    assert names(out, 'acu_status_influx') == ['faults', 'summary', 'tilt']
+    assert names(out, 'acu_commands_influx') == ['ACU_commanded_positions_az']
+    influx = {b['block_name']: b['data'] for f, b in out
+              if f == 'acu_status_influx'}
+    assert influx['summary'] == {'Time_influx': 1.5,
+                                 'Year_influx': 2025.,
+                                 'Azimuth_mode_influx': 0}
+    assert influx['faults'] == {'Az_fault_influx': 0, 'Emergency_influx': 0}
+
+    # No changes: only the tick block (and commands).
+    out = pub.process(status, 100.1)
+    assert names(out, 'acu_status') == ['ACU_summary']
+    assert names(out, 'acu_status_influx') == []
+
+    # Changes -- but the tilt block is underdue.
+    status['faults']['Az_fault'] = 'Warning'
+    status['tilt']['Tilt_x'] = 0.2
+    out = pub.process(status, 100.2)
+    assert names(out, 'acu_status') == ['ACU_faults', 'ACU_summary']
+    assert names(out, 'acu_status_influx') == ['faults', 'tilt']
+    out = pub.process(status, 100.7)
+    assert names(out, 'acu_status') == ['ACU_summary', 'ACU_tilt']
+
+    # Overdue blocks are republished, except for policy 'changed'.
+    out = pub.process(status, 103.)
+    assert names(out, 'acu_status') == [
+        'ACU_commands', 'ACU_faults', 'ACU_summary']
+    assert names(out, 'acu_status_influx') == ['faults', 'summary', 'tilt']
+
+    # Same number of fields, but different keys: that's a change.
+    status['tilt'] = {'Tilt_y': 0.2}
+    out = pub.process(status, 103.1)
+    assert names(out, 'acu_status') == ['ACU_summary', 'ACU_tilt']
+    tilt = [b['data'] for f, b in out if b['block_name'] == 'ACU_tilt']
+    assert tilt == [{'Tilt_y': 0.2}]
+
+    # Unknown strings can't be converted for influx.
+    status['faults']['Az_fault'] = 'Confused'
+    try:
+        pub.process(status, 103.2)
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError.'
+
+
+#
+# Monitor dataset queries
+#
+
+class _StubRead:
+    """Stands in for acu_read; Values returns a Deferred from
+    self.responses (by dataset name) and records the request."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = {}
+
+    def Values(self, dataset):
+        self.requests.append(dataset)
+        response = self.responses.get(dataset)
+        if response is None:
+            return defer.succeed({'dataset': dataset})
+        return response
+
+
+def _get_status_agent():
+    agent = ACUAgent.__new__(ACUAgent)
+    agent.acu_read = _StubRead()
+    agent.datasets = {
+        'status': 'DataSets.StatusDetailed',
+        'third': None,
+        'shutter': None,
+        'pointing': 'DataSets.CmdPointingCorrection',
+        'hvac': 'DataSets.Hvac',
+        'power_dist': 'DataSets.PowerDistribution',
+    }
+    return agent
+
+
+def _result(d):
+    out = []
+    d.addBoth(out.append)
+    assert len(out) == 1, 'Deferred did not fire.'
+    return out[0]
+
+
+def test_monitor_dataset_periods():
+    for concurrent in [False, True]:
+        agent = _get_status_agent()
+        reqs = agent.acu_read.requests
+        periods = dict(MONITOR_DATASET_PERIODS)
+        last_fetch = {}
+
+        # First call gets everything.
+        out = _result(agent._get_status(last_fetch, periods, concurrent))
+        assert sorted(reqs) == sorted(v for v in agent.datasets.values() if v)
+        assert out['Status3rdAxis'] == {}
+        assert out['StatusShutter'] == {}
+        assert out['Hvac'] == {'dataset': 'DataSets.Hvac'}
+
+        # Within the period, slow datasets are skipped.
+        reqs.clear()
+        out = _result(agent._get_status(last_fetch, periods, concurrent))
+        assert sorted(reqs) == ['DataSets.CmdPointingCorrection',
+                                'DataSets.StatusDetailed']
+        assert 'Hvac' not in out and 'PowerDistribution' not in out
+
+        # Once the period has elapsed, they are fetched again.
+        reqs.clear()
+        last_fetch['hvac'] -= periods['hvac']
+        out = _result(agent._get_status(last_fetch, periods, concurrent))
+        assert 'DataSets.Hvac' in reqs
+        assert 'DataSets.PowerDistribution' not in reqs
+        assert 'DataSets.StatusDetailed' in reqs
+        assert out['Hvac'] == {'dataset': 'DataSets.Hvac'}
+
+
+def test_monitor_dataset_failure():
+    for concurrent in [False, True]:
+        agent = _get_status_agent()
+        periods = dict(MONITOR_DATASET_PERIODS)
+        last_fetch = {}
+
+        # Leave StatusDetailed pending while Hvac fails.
+        pending = defer.Deferred()
+        agent.acu_read.responses = {
+            'DataSets.StatusDetailed': pending,
+            'DataSets.Hvac': defer.fail(RuntimeError('hvac query failed')),
+        }
+        d = agent._get_status(last_fetch, periods, concurrent)
+        if concurrent:
+            # The failure is reported without waiting on the others.
+            out = _result(d)
+        else:
+            pending.callback({})
+            out = _result(d)
+        # The original exception comes through, not FirstError.
+        assert isinstance(out, Failure)
+        assert out.check(RuntimeError)
+        assert last_fetch == {}
+
+        # A late result for the pending query is harmless.
+        if concurrent:
+            pending.callback({})
+
+        # The next call retries everything.
+        agent.acu_read.responses = {}
+        agent.acu_read.requests.clear()
+        out = _result(agent._get_status(last_fetch, periods, concurrent))
+        assert 'DataSets.Hvac' in agent.acu_read.requests
+        assert out['StatusDetailed'] == {'dataset': 'DataSets.StatusDetailed'}
+
+
 #
 # HVAC parsing
 #
@@ -1 +1,100 @@
+import socket
+import struct
+
+import numpy as np
+
 from socs.agents.hwp_encoder.agent import HWPBBBAgent  # noqa: F401
+from socs.agents.hwp_encoder.agent import (COUNTER_INFO_LENGTH,
+                                           COUNTER_PACKET_DTYPE,
+                                           EncoderAccumulator, EncoderParser)
+from socs.common.encoder import (COUNTER_HEADER, ERROR_HEADER, IRIG_HEADER,
+                                 TIMEOUT_HEADER)
+
+
+def counter_packet(i):
+    packet = np.zeros(1, dtype=COUNTER_PACKET_DTYPE)
+    packet['header'] = COUNTER_HEADER
+    packet['quad'] = i
+    packet['clock'] = 1000 * i + np.arange(COUNTER_INFO_LENGTH)
+    packet['overflow'] = i
+    packet['index'] = COUNTER_INFO_LENGTH * i + np.arange(COUNTER_INFO_LENGTH)
+    return packet.tobytes()
+
+
+def irig_packet():
+    # 2023-02-01 12:34:56, as IRIG-B BCD
+    info = [((5 << 5) + 6) << 1, (3 << 5) + 4, (1 << 5) + 2, (3 << 5) + 2, 0,
+            (2 << 5) + 3, 0, 0, 0, 0]
+    synch = list(range(10))
+    return struct.pack('<' + 'L' * 33, IRIG_HEADER, 100, 0, *info, *synch,
+                       *synch)
+
+
+def test_encoder_parser_mixed_packets():
+    # Error, timeout and unknown packets don't cost the packets received
+    # with them.
+    parser = EncoderParser(beaglebone_port=0)
+    port = parser.sock.getsockname()[1]
+    datagrams = [
+        counter_packet(0),
+        struct.pack('<2I', ERROR_HEADER, 7),
+        counter_packet(1) + counter_packet(2),
+        struct.pack('<2I', TIMEOUT_HEADER, 1) + counter_packet(3),
+        struct.pack('<3I', 0xbad, 0, COUNTER_HEADER),
+        irig_packet(),
+        struct.pack('<2I', TIMEOUT_HEADER, 1),
+        counter_packet(4),
+    ]
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for datagram in datagrams:
+            sender.sendto(datagram, ('127.0.0.1', port))
+        while len(parser.counter_queue) < 5 or not parser.irig_queue:
+            assert parser.receiver.wait(1)
+            parser.grab_and_parse_data()
+    finally:
+        sender.close()
+        parser.receiver.close()
+
+    assert len(parser.counter_queue) == 5
+    for i, (counts, indexes, quad, _) in enumerate(parser.counter_queue):
+        assert quad == i
+        assert list(counts) == [1000 * i + j + (i << 32)
+                                for j in range(COUNTER_INFO_LENGTH)]
+        assert list(indexes) == [COUNTER_INFO_LENGTH * i + j
+                                 for j in range(COUNTER_INFO_LENGTH)]
+    assert len(parser.irig_queue) == 1
+    assert parser.irig_queue[0][0] == 100
+    assert len(parser.receiver) == 0
+
+
+def test_encoder_accumulator():
+    # Append past the initial capacities for both samples and packets.
+    acc = EncoderAccumulator(num_samples=25, num_packets=2)
+    counters, indexes, quads, times = [], [], [], []
+    for i in range(7):
+        counter = 1000 * i + np.arange(10, dtype=np.int64) + (1 << 33)
+        index = 10 * i + np.arange(10)
+        acc.append(counter, index, i % 2, 100. + i)
+        counters.append(counter)
+        indexes.append(index)
+        quads.append(i % 2)
+        times.append(100. + i)
+
+        assert acc.num_samples == 10 * (i + 1)
+        assert acc.num_packets == i + 1
+        assert np.array_equal(acc.counter, np.concatenate(counters))
+        assert np.array_equal(acc.counter_index, np.concatenate(indexes))
+        assert np.array_equal(acc.quad, quads)
+        assert np.array_equal(acc.received_time, times)
+    assert acc.counter.dtype == np.int64
+
+    # Reuse after clearing doesn't show the old samples.
+    acc.clear()
+    assert len(acc.counter) == len(acc.counter_index) == 0
+    assert len(acc.quad) == len(acc.received_time) == 0
+    acc.append(np.array([5, 6, 7]), np.array([0, 1, 2]), 1, 200.)
+    assert acc.counter.tolist() == [5, 6, 7]
+    assert acc.counter_index.tolist() == [0, 1, 2]
+    assert acc.quad.tolist() == [1]
+    assert acc.received_time.tolist() == [200.]
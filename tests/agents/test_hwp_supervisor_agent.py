@@ -1,9 +1,11 @@
+import time
 from unittest import mock
 
 import txaio
 from ocs.ocs_agent import OpSession
 
-from socs.agents.hwp_supervisor.agent import HWPSupervisor, make_parser
+from socs.agents.hwp_supervisor.agent import (HWPSupervisor, OpDataPoller,
+                                              make_parser)
 
 
 def create_session(op_name):
@@ -44,3 +46,125 @@ def test_hwp_supervisor_agent():
     monitored_sessions = session.data['monitored_sessions']
     assert monitored_sessions['temperature']['status'] == 'no_agent_provided'
     assert monitored_sessions['encoder']['status'] == 'test_mode'
+
+
+def test_op_data_poller():
+    delays = {'fast': 0, 'slow': 0}
+
+    def get_op_data(agent_id, op_name, log=None, test_mode=False):
+        data = {'agent_id': agent_id, 'op_name': op_name, 'timestamp': time.time(),
+                'data': None, 'status': 'no_agent_provided'}
+        if agent_id is not None:
+            time.sleep(delays[agent_id])
+            data.update(data={'value': 1}, status='ok')
+        return data
+
+    poller = OpDataPoller(timeout=0.2, max_cache_age=0.5)
+    queries = {'fast': ('fast', 'acq', False), 'slow': ('slow', 'acq', False),
+               'none': (None, 'acq', False)}
+    with mock.patch('socs.agents.hwp_supervisor.agent.get_op_data', get_op_data):
+        ops = poller.poll(queries)
+        assert ops['fast']['status'] == ops['slow']['status'] == 'ok'
+        assert ops['none']['status'] == 'no_agent_provided'
+        assert ops['none']['age'] is None
+
+        # A slow agent doesn't delay the poll, and its last reply is used
+        delays['slow'] = 1.5
+        start = time.time()
+        ops = poller.poll(queries)
+        assert time.time() - start < 0.5
+        assert ops['fast']['status'] == 'ok'
+        assert ops['slow']['status'] == 'cached'
+        assert ops['slow']['data'] == {'value': 1}
+        assert ops['slow']['latency'] >= 0.2
+
+        # Until the last reply is too old
+        time.sleep(0.4)
+        ops = poller.poll(queries)
+        assert ops['slow']['status'] == 'timeout'
+        assert ops['slow']['data'] is None
+
+
+class FakeCrossbar:
+    """Stands in for the crossbar router, delivering messages published on
+    OCS feeds to the handlers subscribed with ``subscribe_on_start``."""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe_on_start(self, handler, topic, options=None, force_subscribe=None):
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, instance_id, feed_name, block_name, data, timestamp=None):
+        """Publishes a single sample, in the format of a recorded feed."""
+        if timestamp is None:
+            timestamp = time.time()
+        blocks = {block_name: {'block_name': block_name,
+                               'timestamps': [timestamp],
+                               'data': {k: [v] for k, v in data.items()}}}
+        feed = {'agent_address': f'observatory.{instance_id}', 'feed_name': feed_name}
+        for handler in self.handlers.get(f'observatory.{instance_id}.feeds.{feed_name}', []):
+            handler((blocks, feed))
+
+
+def test_hwp_supervisor_feeds():
+    crossbar = FakeCrossbar()
+    mock_agent = mock.MagicMock()
+    mock_agent.log = txaio.make_logger()
+    mock_agent.subscribe_on_start = crossbar.subscribe_on_start
+    parser = make_parser()
+    args = parser.parse_args(args=[
+        '--hwp-pmx-id', 'hwp-pmx', '--hwp-pid-id', 'hwp-pid', '--ups-id', 'ups',
+        '--ybco-lakeshore-id', 'ls240', '--ybco-temp-field', 'Channel_7',
+        '--ybco-temp-thresh', '75', '--ups-minutes-remaining-thresh', '45',
+        '--no-acu', '--subscribe-feeds', '--feed-max-age', '1',
+    ])
+    agent = HWPSupervisor(mock_agent, args)
+    state = agent.hwp_state
+    assert set(crossbar.handlers) == {
+        'observatory.hwp-pmx.feeds.hwppmx', 'observatory.hwp-pid.feeds.hwppid',
+        'observatory.ups.feeds.ups', 'observatory.ls240.feeds.temperatures'}
+
+    crossbar.publish('ls240', 'temperatures', 'temps', {'Channel_7_T': 50., 'Channel_7_V': 1.})
+    crossbar.publish('ups', 'ups', 'ups', {
+        'upsOutputSource_0': 3, 'upsOutputSource_0_description': 'normal',
+        'upsEstimatedMinutesRemaining_0': 60, 'upsEstimatedMinutesRemaining_0_description': '60',
+        'upsEstimatedChargeRemaining_0': 100, 'upsEstimatedChargeRemaining_0_description': '100',
+        'upsBatteryVoltage_0': 136, 'upsBatteryVoltage_0_description': '136',
+        'upsBatteryCurrent_0': 0, 'upsBatteryCurrent_0_description': '0',
+    })
+    crossbar.publish('hwp-pmx', 'hwppmx', 'hwppmx', {'current': 1., 'voltage': 20., 'source': 'volt'})
+    crossbar.publish('hwp-pid', 'hwppid', 'HWPPID',
+                     {'current_freq': 2., 'target_freq': 2., 'direction': 0, 'healthy': True})
+    assert state.feed_event.is_set()
+
+    # Feed data is used without polling
+    with mock.patch('socs.agents.hwp_supervisor.agent.get_op_data') as get_op_data:
+        ops = state.update(poll=False)
+        get_op_data.assert_not_called()
+    assert all(ops[name]['status'] == 'feed' for name in ['temperature', 'ups', 'pmx', 'pid'])
+    assert state.temp == 50.
+    assert state.ups_output_source == 'normal'
+    assert state.ups_estimated_minutes_remaining == 60
+    assert state.pmx_voltage == 20.
+    assert state.pid_current_freq == 2.
+    assert state.is_spinning
+    assert state.pmx_action == 'ok'
+
+    # Updates as data is published
+    crossbar.publish('ls240', 'temperatures', 'temps', {'Channel_7_T': 80.})
+    state.update(poll=False)
+    assert state.pmx_action == 'stop'
+
+    # Stale feeds fall back to polling
+    time.sleep(1.1)
+    with mock.patch('socs.agents.hwp_supervisor.agent.get_op_data') as get_op_data:
+        get_op_data.side_effect = lambda agent_id, op_name, log=None, test_mode=False: {
+            'agent_id': agent_id, 'op_name': op_name, 'timestamp': time.time(),
+            'data': None, 'status': 'op_not_found'}
+        ops = state.update()
+        queried = {call.args[0] for call in get_op_data.call_args_list}
+        assert queried == {'ls240', 'ups', 'hwp-pmx', 'hwp-pid', None}
+    assert ops['temperature']['status'] == 'op_not_found'
+    assert state.temp is None
+    assert state.pmx_action == 'no_data'
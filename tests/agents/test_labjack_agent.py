@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from socs.agents.labjack.agent import LabJackFunctions, _stream_blocks
+
+
+def custom(function, units='K'):
+    return {'user_defined': 'True', 'function': function, 'units': units}
+
+
+def test_labjack_compile_builtin():
+    ljf = LabJackFunctions()
+    for name in ['MKS390', 'warm_therm']:
+        func = ljf.compile({'user_defined': 'False', 'type': name})
+        assert func == getattr(ljf, name)
+
+
+def test_labjack_compile_custom():
+    ljf = LabJackFunctions()
+    v = np.array([0., 1., 2.5])
+
+    func = ljf.compile(custom('2*v + 1'))
+    values, units = func(v)
+    assert units == 'K'
+    np.testing.assert_allclose(values, [1., 3., 6.])
+    values, units = func(1.5)
+    assert np.shape(values) == () and float(values) == 4.
+
+    # Constant functions are broadcast to the shape of the input.
+    func = ljf.compile(custom('3.5'))
+    values, _ = func(v)
+    np.testing.assert_array_equal(values, [3.5, 3.5, 3.5])
+    values, _ = func(1.5)
+    assert np.shape(values) == () and float(values) == 3.5
+
+    assert ljf.unit_conversion(v, custom('v**2'))[0].tolist() == \
+        [0., 1., 6.25]
+
+    # Only 'v' may be used.
+    with pytest.raises(ValueError):
+        ljf.compile(custom('2*x'))
+
+
+def test_labjack_mks390():
+    ljf = LabJackFunctions()
+    values, units = ljf.MKS390([5., 5.5])
+    assert units == 'mBar'
+    np.testing.assert_allclose(values, [1.3332e-1, 1.3332])
+    values, _ = ljf.MKS390(5.)
+    assert np.shape(values) == ()
+    assert abs(values - 1.3332e-1) < 1e-12
+
+
+def test_labjack_warm_therm():
+    ljf = LabJackFunctions()
+
+    # Voltages given by the LJTick for calibration points 25 C (10 kOhm)
+    # and 0 C (29.49 kOhm).
+    def volts(R):
+        return 2.5 * 10000. / (R + 10000.)
+
+    values, units = ljf.warm_therm([volts(10000.), volts(29490.)])
+    assert units == 'C'
+    np.testing.assert_allclose(values, [25., 0.], atol=0.01)
+    values, _ = ljf.warm_therm(volts(10000.))
+    assert np.shape(values) == ()
+    assert abs(values - 25.) < 0.01
+
+    # Out of range of the calibration curve.
+    values, _ = ljf.warm_therm([volts(1e7), volts(10000.)])
+    np.testing.assert_array_equal(values, [-1000., -1000.])
+
+
+def test_labjack_stream_blocks():
+    ljf = LabJackFunctions()
+    chs = ['AIN0', 'AIN1', 'AIN2']
+    conversions = [(1, 'AIN1', ljf.compile(custom('10*v'))),
+                   (2, 'AIN2', ljf.compile(custom('7', units='C')))]
+    timestamps = 100. + np.arange(4) * 0.5
+    # Scans of (AIN0, AIN1, AIN2), one after the other.
+    raw = [0., 1., 2.,
+           3., 4., 5.,
+           6., 7., 8.,
+           9., 10., 11.]
+
+    data, data_downsampled = _stream_blocks(raw, chs, conversions, timestamps)
+    assert data['block_name'] == 'sens'
+    assert data['timestamps'] == [100., 100.5, 101., 101.5]
+    assert data['data'] == {
+        'AIN0V': [0., 3., 6., 9.],
+        'AIN1V': [1., 4., 7., 10.],
+        'AIN2V': [2., 5., 8., 11.],
+        'AIN1K': [10., 40., 70., 100.],
+        'AIN2C': [7., 7., 7., 7.],
+    }
+    assert data_downsampled == {
+        'block_name': 'sens',
+        'timestamp': 100.75,
+        'data': {'AIN0V': 4.5, 'AIN1V': 5.5, 'AIN2V': 6.5,
+                 'AIN1K': 55., 'AIN2C': 7.},
+    }
+
+    # Data must be plain lists and floats, for publishing.
+    assert all(isinstance(v, list) for v in data['data'].values())
+    assert all(isinstance(v, float) for v in data_downsampled['data'].values())
@@ -85,6 +85,10 @@ def mock_372_msg():
         if '?' not in arg:
             return ''
 
+        # Batched queries are answered together, separated by ';'
+        if ';' in arg:
+            return ';'.join(side_effect(q) for q in arg.split(';'))
+
         # Mocked example query responses
         return values[arg]
 
@@ -4,9 +4,11 @@ import time
 
 import numpy as np
 import txaio
+from sqlalchemy import inspect, text
 
-from socs.db.suprsync import (SupRsyncFileHandler, SupRsyncFilesManager,
-                              TimecodeDir)
+from socs.db.suprsync import (SupRsyncFile, SupRsyncFileHandler,
+                              SupRsyncFilesManager, TimecodeDir)
+from socs.util import get_checksum
 
 txaio.use_twisted()
 
@@ -27,6 +29,107 @@ def test_suprsync_files_manager(tmp_path):
     srfm.add_file(str(fpath.absolute()), 'test.txt', 'test')
 
 
+def test_copyable_and_deletable_files(tmp_path):
+    """
+    Tests the selection of copyable and deletable files, and that indexes are
+    added to databases created without them.
+    """
+    db_path = tmp_path / 'test.db'
+    srfm = SupRsyncFilesManager(db_path)
+    now = time.time()
+    for i in range(10):
+        srfm.add_file(f'/data/{i}.g3', f'{i}.g3', 'test', local_md5sum='abc',
+                      timestamp=now - 100 + 10 * i)
+    srfm.add_file('/data/other.g3', 'other.g3', 'other', local_md5sum='abc')
+
+    with srfm.Session.begin() as session:
+        files = session.query(SupRsyncFile).filter(
+            SupRsyncFile.archive_name == 'test').all()
+        files[0].remote_md5sum = 'abc'  # copied
+        files[1].remote_md5sum = 'bad'  # bad copy
+        files[2].ignore = True
+        files[3].failed_copy_attempts = 5
+        files[4].removed = now
+        files[9].remote_md5sum = 'abc'  # copied, but recent
+
+    with srfm.Session() as session:
+        files = srfm.get_copyable_files('test', session=session)
+        assert [f.local_path for f in files] == \
+            ['/data/1.g3', '/data/3.g3'] + [f'/data/{i}.g3' for i in range(5, 9)]
+        files = srfm.get_copyable_files('test', max_copy_attempts=5,
+                                        num_files=2, session=session)
+        assert [f.local_path for f in files] == ['/data/1.g3', '/data/5.g3']
+        files = srfm.get_deletable_files('test', 50, session=session)
+        assert [f.local_path for f in files] == ['/data/0.g3']
+
+    # Drop the indexes, as in a database from an older version.
+    index_names = [ix['name'] for ix in inspect(srfm._engine).get_indexes(
+        SupRsyncFile.__tablename__)]
+    assert len(index_names) == len(SupRsyncFile.__table__.indexes)
+    with srfm._engine.begin() as conn:
+        for name in index_names:
+            conn.execute(text(f'DROP INDEX {name}'))
+    srfm = SupRsyncFilesManager(db_path)
+    assert len(inspect(srfm._engine).get_indexes(SupRsyncFile.__tablename__)) \
+        == len(index_names)
+
+
+def test_archive_stats(tmp_path):
+    """
+    Tests the archive stats and finalized_until computations.
+    """
+    srfm = SupRsyncFilesManager(tmp_path / 'test.db')
+    stats = srfm.get_archive_stats('test')
+    assert stats['num_files'] == 0 and stats['last_file_added'] == ''
+
+    for i in range(6):
+        srfm.add_file(f'/data/{i}.g3', f'{i}.g3', 'test', local_md5sum='abc',
+                      timestamp=1000. + i)
+    with srfm.Session.begin() as session:
+        files = session.query(SupRsyncFile).order_by(SupRsyncFile.id).all()
+        files[0].remote_md5sum = 'abc'
+        files[1].ignore = True
+        files[3].remote_md5sum = 'abc'
+
+    stats = srfm.get_archive_stats('test')
+    assert stats['num_files'] == 6
+    assert stats['uncopied_files'] == 3
+    assert stats['finalized_until'] == 1001.
+    assert stats['last_file_added'] == '/data/5.g3'
+    assert stats['last_file_copied'] == '/data/3.g3'
+    assert srfm.get_finalized_until('test') == 1001.
+
+
+def test_checksum_algorithm(tmp_path):
+    """
+    Tests copying with a non-default checksum algorithm, and that the
+    checksum_algorithm column is added to databases without it.
+    """
+    db_path = tmp_path / 'test.db'
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    srfm = SupRsyncFilesManager(db_path)
+    fpath = tmp_path / 'test.txt'
+    fpath.write_text('test')
+    srfm.add_file(str(fpath), 'test.txt', 'test', checksum_algorithm='blake2b')
+    srfm.add_file(str(fpath), 'test2.txt', 'test')
+
+    handler = SupRsyncFileHandler(srfm, 'test', str(dest))
+    assert all(ok for _, ok in handler.copy_files())
+    with srfm.Session() as session:
+        files = session.query(SupRsyncFile).order_by(SupRsyncFile.id).all()
+        assert [f.checksum_algorithm for f in files] == ['blake2b', 'md5']
+        assert len(files[0].local_md5sum) == 128
+
+    with srfm._engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {SupRsyncFile.__tablename__} '
+                          'DROP COLUMN checksum_algorithm'))
+    srfm = SupRsyncFilesManager(db_path)
+    with srfm.Session() as session:
+        files = session.query(SupRsyncFile).all()
+        assert [f.checksum_algorithm for f in files] == ['md5', 'md5']
+
+
 def test_timecode_dirs(tmp_path):
     txaio.start_logging(level='info')
     txaio.make_logger()
@@ -141,3 +244,139 @@ def test_suprsync_handle_files(tmp_path):
         assert group_perms, f"File {path} not granted write permissions"
 
     assert ncopied == nfiles + 1
+
+
+def test_suprsync_streams_pipeline(tmp_path):
+    """
+    Tests copying with several rsync streams, with remote checksums checked
+    while the following batch is copied.
+    """
+    db_path = str(tmp_path / 'test.db')
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+
+    srfm = SupRsyncFilesManager(db_path)
+    nfiles = 20
+    for i in range(nfiles):
+        path = str(data_dir / f'{i}.npy')
+        np.save(path, np.zeros(100 * (i + 1)))
+        srfm.add_file(path, f'test_remote/{i}.npy', 'test')
+
+    handler = SupRsyncFileHandler(srfm, 'test', str(dest), num_streams=3,
+                                  pipeline=True)
+    # First batch is only checked during the second call.
+    assert handler.copy_files(num_files=8) == []
+    output = handler.copy_files(num_files=8)
+    assert len(output) == 8
+    output += handler.copy_files(num_files=8)
+    assert len(output) == 16
+    output += handler.close()
+    assert len(output) == nfiles and all(ok for _, ok in output)
+    assert len(os.listdir(dest / 'test_remote')) == nfiles
+
+    stats = handler.transfer_stats
+    assert stats['bytes_copied'] == sum(
+        os.path.getsize(data_dir / f'{i}.npy') for i in range(nfiles))
+    for i in range(3):
+        assert stats[f'stream{i}_bytes'] > 0
+        assert stats[f'stream{i}_throughput'] >= 0
+
+    assert srfm.get_copyable_files('test') == []
+
+    # A smaller batch only reports the streams it used.
+    path = str(data_dir / 'extra.npy')
+    np.save(path, np.zeros(100))
+    srfm.add_file(path, 'test_remote/extra.npy', 'test')
+    handler.copy_files()
+    handler.close()
+    stats = handler.transfer_stats
+    assert stats['stream0_bytes'] == os.path.getsize(path)
+    assert not any(k.startswith(('stream1', 'stream2')) for k in stats)
+
+
+def test_timecode_column(tmp_path):
+    """
+    Tests that file timecodes are set on insert and backfilled for databases
+    without the timecode column, and are used to create timecode dirs.
+    """
+    db_path = tmp_path / 'test.db'
+    fpath = tmp_path / 'test.txt'
+    fpath.write_text('test')
+    tc = int(time.time() // 1e5)
+
+    srfm = SupRsyncFilesManager(db_path)
+    remote_paths = [f'{tc - 1}/a/0.txt', f'{tc}/b/1.txt', 'misc/2.txt', '123/3.txt']
+    for remote_path in remote_paths:
+        srfm.add_file(str(fpath), remote_path, 'test')
+    srfm.add_file(str(fpath), f'{tc - 2}/4.txt', 'other')
+
+    expected = [tc - 1, tc, None, None, tc - 2]
+    with srfm.Session() as session:
+        files = session.query(SupRsyncFile).order_by(SupRsyncFile.id).all()
+        assert [f.timecode for f in files] == expected
+
+    with srfm._engine.begin() as conn:
+        conn.execute(text('DROP INDEX ix_supersync_v0_archive_timecode'))
+        conn.execute(text(f'ALTER TABLE {SupRsyncFile.__tablename__} '
+                          'DROP COLUMN timecode'))
+    srfm = SupRsyncFilesManager(db_path)
+    with srfm.Session() as session:
+        files = session.query(SupRsyncFile).order_by(SupRsyncFile.id).all()
+        assert [f.timecode for f in files] == expected
+
+    with srfm._engine.begin() as conn:
+        conn.execute(text(f'DELETE FROM {TimecodeDir.__tablename__}'))
+    srfm.create_all_timecode_dirs('test')
+    srfm.create_all_timecode_dirs('test')
+    with srfm.Session() as session:
+        tcs = [t for t, in session.query(TimecodeDir.timecode).filter(
+            TimecodeDir.archive_name == 'test')]
+        assert sorted(tcs) == [tc - 1, tc]
+
+    # Only the earlier dir is complete; its one file is not synced.
+    srfm.update_all_timecode_dirs('test', str(tmp_path / 'root'), 'sync')
+    with srfm.Session() as session:
+        tcdirs = session.query(TimecodeDir).filter(
+            TimecodeDir.archive_name == 'test').order_by(TimecodeDir.timecode).all()
+        status = [(t.completed, t.synced) for t in tcdirs]
+        assert status == [(True, False), (False, False)]
+
+
+def test_add_files_bulk(tmp_path):
+    """
+    Tests bulk registration, including skipping files that are already
+    registered so that an interrupted registration can be resumed.
+    """
+    srfm = SupRsyncFilesManager(tmp_path / 'test.db')
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    tc = int(time.time() // 1e5)
+    entries = []
+    for i in range(25):
+        path = data_dir / f'{i}.txt'
+        path.write_text(str(i))
+        entries.append((path, f'{tc + i % 2}/{i}.txt', 'test'))
+
+    assert srfm.add_files_bulk(entries[:10], batch_size=4) == 10
+    # Repeated and already registered entries are skipped.
+    assert srfm.add_files_bulk(entries + entries[20:], batch_size=4) == 15
+    assert srfm.add_files_bulk(entries, batch_size=4) == 0
+    # Files in other archives are registered separately.
+    assert srfm.add_files_bulk([(entries[0][0], 'other.txt', 'other', False),
+                                (data_dir / 'missing.txt', 'missing.txt', 'other')]) == 1
+
+    with srfm.Session() as session:
+        files = session.query(SupRsyncFile).filter(
+            SupRsyncFile.archive_name == 'test').all()
+        assert sorted(f.local_path for f in files) == sorted(str(e[0]) for e in entries)
+        for f in files:
+            assert f.local_md5sum == get_checksum(f.local_path)
+            assert f.timecode in (tc, tc + 1) and f.deletable
+        other = session.query(SupRsyncFile).filter(
+            SupRsyncFile.archive_name == 'other').one()
+        assert not other.deletable
+        tcs = [t for t, in session.query(TimecodeDir.timecode).filter(
+            TimecodeDir.archive_name == 'test')]
+        assert sorted(tcs) == [tc, tc + 1]
@@ -0,0 +1,156 @@
+import calendar
+import socket
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from socs.common.encoder import (COUNTER_HEADER, IRIG_HEADER, IRIG_PACKET_SIZE,
+                                 TIMEOUT_HEADER, TIMEOUT_PACKET_SIZE,
+                                 BBBPacketParser, UDPPacketReceiver, de_irig,
+                                 decode_irig, irig_to_unix)
+
+
+def _de_irig(val, base_shift=0):
+    return (((val >> (0 + base_shift)) & 1)
+            + ((val >> (1 + base_shift)) & 1) * 2
+            + ((val >> (2 + base_shift)) & 1) * 4
+            + ((val >> (3 + base_shift)) & 1) * 8
+            + ((val >> (5 + base_shift)) & 1) * 10
+            + ((val >> (6 + base_shift)) & 1) * 20
+            + ((val >> (7 + base_shift)) & 1) * 40
+            + ((val >> (8 + base_shift)) & 1) * 80 * (base_shift == 0))
+
+
+def test_de_irig():
+    vals = np.arange(1 << 12)
+    for shift in (0, 1):
+        expected = [_de_irig(int(v), shift) for v in vals]
+        assert [de_irig(int(v), shift) for v in vals] == expected
+        assert de_irig(vals, shift).tolist() == expected
+
+    info = np.random.default_rng(0).integers(0, 1 << 10, (5, 10))
+    decoded = decode_irig(info)
+    assert decode_irig(info[2]) == tuple(int(d[2]) for d in decoded)
+
+
+@pytest.mark.parametrize('fields', [(23, 1, 0, 0, 0), (24, 366, 23, 59, 59),
+                                    (23, 366, 12, 30, 0), (68, 45, 1, 2, 3),
+                                    (69, 200, 4, 5, 61), (99, 365, 0, 0, 0)])
+def test_irig_to_unix(fields):
+    year, day, hours, mins, secs = fields
+    expected = calendar.timegm(time.strptime(
+        "%d %d %d:%d:%d" % fields, "%y %j %H:%M:%S"))
+    assert irig_to_unix(year, day, hours, mins, secs) == expected
+
+
+@pytest.mark.parametrize('fields', [(100, 1, 0, 0, 0), (23, 0, 0, 0, 0),
+                                    (23, 367, 0, 0, 0), (23, 1, 24, 0, 0),
+                                    (23, 1, 0, 60, 0), (23, 1, 0, 0, 62)])
+def test_irig_to_unix_invalid(fields):
+    with pytest.raises(ValueError):
+        time.strptime("%d %d %d:%d:%d" % fields, "%y %j %H:%M:%S")
+    with pytest.raises(ValueError):
+        irig_to_unix(*fields)
+
+
+def test_receiver_framing():
+    receiver = UDPPacketReceiver(0, read_chunk_size=1024)
+    port = receiver.sock.getsockname()[1]
+    dtype = np.dtype([('header', '<u4'), ('value', '<u4', (3,))])
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # Datagrams holding several packets, more than fit in the buffer
+        values = np.arange(60 * 20 * 3).reshape(60, 20, 3)
+        for datagram in values:
+            sender.sendto(b''.join(struct.pack('<4I', COUNTER_HEADER, *v)
+                                   for v in datagram), ('127.0.0.1', port))
+        sender.sendto(struct.pack('<I', IRIG_HEADER), ('127.0.0.1', port))
+
+        received = []
+        while True:
+            assert receiver.wait(1)
+            receiver.receive()
+            count = receiver.count_packets(COUNTER_HEADER, dtype.itemsize)
+            received.append(receiver.unpack(dtype, count)['value'].copy())
+            if len(receiver):
+                assert receiver.header() == IRIG_HEADER
+                break
+        assert np.array_equal(np.concatenate(received), values.reshape(-1, 3))
+        # An incomplete packet is not counted
+        assert receiver.count_packets(IRIG_HEADER, IRIG_PACKET_SIZE) == 0
+        receiver.consume(4)
+        assert len(receiver) == 0
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_receiver_skip_datagram():
+    # Small chunks, and packets parsed more slowly than they are received,
+    # so that the buffer is both compacted and grown.
+    receiver = UDPPacketReceiver(0, read_chunk_size=64)
+    port = receiver.sock.getsockname()[1]
+    dtype = np.dtype([('header', '<u4'), ('value', '<u4')])
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for i in range(40):
+            # A bad header, then a packet, following a timeout packet in the
+            # same datagram for odd i
+            sender.sendto(struct.pack('<3I', 0xbad, i, COUNTER_HEADER),
+                          ('127.0.0.1', port))
+            packet = struct.pack('<2I', COUNTER_HEADER, i)
+            if i % 2:
+                packet = struct.pack('<2I', TIMEOUT_HEADER, 1) + packet
+            sender.sendto(packet, ('127.0.0.1', port))
+
+        received = []
+        num_timeouts = 0
+        while len(received) < 40:
+            if receiver.wait(0.1):
+                receiver.receive(max_packets=2)
+            assert len(receiver)
+            header = receiver.header()
+            if header == COUNTER_HEADER:
+                assert receiver.datagram_size() == dtype.itemsize
+                received.append(int(receiver.unpack(dtype)['value'][0]))
+            elif header == TIMEOUT_HEADER:
+                assert receiver.datagram_size() == 2 * TIMEOUT_PACKET_SIZE
+                receiver.consume(TIMEOUT_PACKET_SIZE)
+                num_timeouts += 1
+            else:
+                assert receiver.datagram_size() == 12
+                receiver.skip_datagram()
+        assert received == list(range(40))
+        assert num_timeouts == 20
+        assert len(receiver) == 0 and len(receiver.datagram_ends) == 0
+        assert len(receiver.data) > 4 * 64
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_parse_irig_packet():
+    parser = BBBPacketParser(0)
+    port = parser.sock.getsockname()[1]
+    # 2023-02-01 12:34:56, as IRIG-B BCD, with the seconds shifted by a bit
+    info = [((5 << 5) + 6) << 1, (3 << 5) + 4, (1 << 5) + 2, (3 << 5) + 2, 0, (2 << 5) + 3,
+            0, 0, 0, 0]
+    synch = list(range(10))
+    packet = struct.pack('<' + 'L' * 33, IRIG_HEADER, 100, 1, *info, *synch, *synch)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sender.sendto(packet, ('127.0.0.1', port))
+        assert parser.receiver.wait(1)
+        parser.receiver.receive()
+        parser.parse_irig_packet()
+    finally:
+        sender.close()
+
+    edge, irig_time, irig_info, synch_times, _ = parser.irig_queue.popleft()
+    assert edge == 100 + (1 << 32)
+    assert irig_time == calendar.timegm((2023, 2, 1, 12, 34, 56))
+    assert list(irig_info) == info
+    assert synch_times == [i + (i << 32) for i in synch]
+    assert len(parser.receiver) == 0
@@ -0,0 +1,58 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from socs.Lakeshore.Lakeshore372 import LS372
+
+
+def make_ls372(timeout=1.):
+    """Returns an LS372 wired to one end of a socket pair, and the other
+    end, without running the device queries done on init."""
+    device, peer = socket.socketpair()
+    ls = LS372.__new__(LS372)
+    # Nothing listens here, so any reconnection attempt fails quickly.
+    ls.ip_address = '127.0.0.1'
+    ls.port = 9
+    ls.timeout = timeout
+    device.settimeout(timeout)
+    ls.comm = device
+    return ls, peer
+
+
+def test_ls372_msg_batch_split_response():
+    ls, peer = make_ls372()
+    peer.sendall(b'+1.0E+00;+2.0')
+    peer.sendall(b'E+00;3\r\n')
+    assert ls.msg_batch(['KRDG? 1', 'SRDG? 1', 'INSET? 1']) == \
+        ['+1.0E+00', '+2.0E+00', '3']
+    assert peer.recv(100) == b'KRDG? 1;SRDG? 1;INSET? 1\r\n'
+
+
+def test_ls372_msg_connection_closed():
+    ls, peer = make_ls372()
+    peer.sendall(b'+1.0E+00')
+    peer.close()
+    with pytest.raises(ConnectionError):
+        ls.msg('KRDG? 1')
+
+
+def test_ls372_msg_incomplete_response():
+    ls, peer = make_ls372(timeout=0.2)
+
+    def trickle():
+        for _ in range(20):
+            try:
+                peer.sendall(b'0')
+            except OSError:
+                return
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=trickle)
+    thread.start()
+    t0 = time.time()
+    with pytest.raises(ConnectionError):
+        ls.msg('KRDG? 1')
+    assert time.time() - t0 < 0.6
+    thread.join()
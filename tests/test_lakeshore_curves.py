@@ -0,0 +1,92 @@
+from socs.Lakeshore.curves import MAX_BREAKPOINTS, CurveTransfer
+from socs.Lakeshore.Lakeshore372 import Curve
+
+
+class FakeLakeshore:
+    """Stores curve breakpoints to 6 significant digits, like the
+    Lakeshores, and optionally drops some breakpoint writes."""
+
+    def __init__(self, drop=()):
+        self.points = {}
+        self.header = '"CURVE","SN",3,300.0,1'
+        self.drop = set(drop)
+        self.messages = []
+
+    def _handle(self, cmd):
+        name, _, args = cmd.partition(' ')
+        args = [a.strip() for a in args.split(',')]
+        if name == 'CRVPT':
+            index = int(args[1])
+            if index in self.drop:
+                self.drop.remove(index)
+                return None
+            self.points[index] = (float('%.6g' % float(args[2])),
+                                  float('%.6g' % float(args[3])))
+        elif name == 'CRVPT?':
+            return '%+.6g,%+.6g' % self.points.get(int(args[1]), (0, 0))
+        elif name == 'CRVHDR?':
+            return self.header
+
+    def msg(self, message):
+        self.messages.append(message)
+        resps = [self._handle(cmd) for cmd in message.split(';')]
+        if '?' in message:
+            return ';'.join(resps)
+        return ''
+
+
+def test_upload_and_read():
+    ls = FakeLakeshore(drop=[3, 7])
+    points = [(str(100 + i * 1.234567), str(300 - i)) for i in range(20)]
+
+    transfer = CurveTransfer(ls, 1, batch_size=8)
+    transfer.upload(points)
+    assert ls.drop == set()
+    read = transfer.read_points()
+    assert len(read) == len(points)
+    assert transfer.find_mismatches(points) == []
+    # Reading all breakpoints stops at the end of the curve, in 3 messages.
+    num_messages = len(ls.messages)
+    transfer.read_points()
+    assert len(ls.messages) - num_messages == 3
+    assert len(transfer.read_points(range(1, MAX_BREAKPOINTS + 1),
+                                    stop_at_zero=False)) == MAX_BREAKPOINTS
+
+
+def test_loaded_curve_cache():
+    ls = FakeLakeshore()
+    header = ['CURVE', 'SN', '3', '300.0', '1']
+    points = [(1.0, 300.0), (2.0, 200.0)]
+
+    transfer = CurveTransfer(ls, 1)
+    assert not transfer.is_loaded(header, points)
+    transfer.upload(points)
+    transfer.remember(header, points)
+
+    assert CurveTransfer(ls, 1).is_loaded(header, points)
+    assert not CurveTransfer(ls, 2).is_loaded(header, points)
+    assert not transfer.is_loaded(header, [(1.0, 300.0), (2.0, 250.0)])
+    assert not transfer.is_loaded(header[:1] + ['SN2'] + header[2:], points)
+    assert not CurveTransfer(FakeLakeshore(), 1).is_loaded(header, points)
+
+    # Changes to the curve on the device are noticed through its header.
+    ls.header = '"OTHER","SN",3,300.0,1'
+    assert not transfer.is_loaded(header, points)
+
+
+def test_delete_curve_forgets():
+    # The header is left unchanged by CRVDEL on FakeLakeshore, so only
+    # forget() keeps the deleted curve from being reported as loaded.
+    ls = FakeLakeshore()
+    header = ['CURVE', 'SN', '3', '300.0', '1']
+    points = [(1.0, 300.0), (2.0, 200.0)]
+
+    curve = Curve(ls, 1)
+    transfer = curve._transfer()
+    transfer.upload(points)
+    transfer.remember(header, points)
+    assert transfer.is_loaded(header, points)
+
+    curve.delete_curve()
+    assert 'CRVDEL 1' in ls.messages
+    assert not transfer.is_loaded(header, points)
@@ -0,0 +1,59 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from socs.common.moxa_serial import Serial_TCPServer
+
+
+@pytest.fixture
+def server():
+    """Connects a Serial_TCPServer to a local socket, standing in for the
+    moxa box, and yields both."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    accepted = {}
+    thread = threading.Thread(
+        target=lambda: accepted.update(conn=listener.accept()[0]))
+    thread.start()
+    moxa = Serial_TCPServer(listener.getsockname(), timeout=0.2)
+    thread.join()
+    yield moxa, accepted['conn']
+    accepted['conn'].close()
+    moxa.sock.close()
+    listener.close()
+
+
+def test_read_line_and_exact(server):
+    moxa, device = server
+    device.sendall(b'first\r\nsecond\nabc')
+    time.sleep(0.05)
+
+    assert moxa.readline() == 'first\r'
+    assert moxa.read_until('\n') == 'second\n'
+    # Not enough data: nothing is returned, and the data stays buffered
+    assert moxa.readexactly(5) == ''
+    assert moxa.readexactly(2) == 'ab'
+    assert moxa.read(5) == 'c'
+
+    # A line arriving in pieces is assembled
+    def send_pieces():
+        for piece in [b'12', b'3.', b'4\r']:
+            time.sleep(0.05)
+            device.sendall(piece)
+    threading.Thread(target=send_pieces).start()
+    assert moxa.readall() == '123.4'
+    assert moxa.readall() is False
+
+
+def test_flush_input(server):
+    moxa, device = server
+    moxa.encoded = False
+    device.sendall(b'garbage' * 1000)
+    time.sleep(0.05)
+    moxa.flushInput()
+    device.sendall(b'\x06\x01\x02')
+    assert moxa.read(3) == b'\x06\x01\x02'
+    assert moxa.readpacket(3) == ''
@@ -1 +1,216 @@
+from pysnmp.hlapi import ObjectIdentity, ObjectType
+from pysnmp.proto.rfc1902 import Integer
+from pysnmp.proto.rfc1905 import EndOfMibView
+from pysnmp.smi import builder, view
+from twisted.internet.defer import succeed
+from twisted.python.failure import Failure
+
 from socs import snmp  # noqa: F401
+from socs.agents.ups.agent import _table_rows
+from socs.snmp import SNMPPoll, SNMPTwister
+
+# Numeric OIDs of upsInputTable and upsOutputTable columns in UPS-MIB.
+INPUT_FREQUENCY = (1, 3, 6, 1, 2, 1, 33, 1, 3, 3, 1, 2)
+INPUT_VOLTAGE = (1, 3, 6, 1, 2, 1, 33, 1, 3, 3, 1, 3)
+OUTPUT_VOLTAGE = (1, 3, 6, 1, 2, 1, 33, 1, 4, 4, 1, 2)
+OUTPUT_CURRENT = (1, 3, 6, 1, 2, 1, 33, 1, 4, 4, 1, 3)
+
+
+class FakeSNMPAgent:
+    """Answers GETNEXT and GETBULK requests from a fixed set of OIDs, in
+    place of SNMPTwister.get_next and SNMPTwister.get_bulk.
+
+    Parameters
+    ----------
+    values : dict
+        Map from numeric OID tuple to integer value.
+    max_rows : int
+        If set, truncate GETBULK responses to this many rows, as an agent
+        limited by the size of its response might.
+
+    """
+
+    def __init__(self, values, max_rows=None):
+        self.values = values
+        self.max_rows = max_rows
+        self.requests = []
+        self.mib_view = view.MibViewController(builder.MibBuilder())
+
+    def _var(self, oid, value):
+        return ObjectType(ObjectIdentity(oid), value).resolveWithMib(self.mib_view)
+
+    def _next(self, oid):
+        for next_oid in sorted(self.values):
+            if next_oid > oid:
+                return self._var(next_oid, Integer(self.values[next_oid]))
+        return self._var(oid, EndOfMibView())
+
+    def _respond(self, oid_list, max_repetitions):
+        oids = []
+        for object_type in oid_list:
+            object_type.resolveWithMib(self.mib_view)
+            oids.append(tuple(object_type[0].getOid()))
+        self.requests.append(oids)
+
+        if self.max_rows is not None:
+            max_repetitions = min(max_repetitions, self.max_rows)
+        table = []
+        for _ in range(max_repetitions):
+            row = [self._next(oid) for oid in oids]
+            oids = [tuple(var[0].getOid()) for var in row]
+            table.append(row)
+        return succeed(table)
+
+    def get_bulk(self, oid_list, version, non_repeaters=0, max_repetitions=25):
+        return self._respond(oid_list, max_repetitions)
+
+    def get_next(self, oid_list, version):
+        return self._respond(oid_list, 1)
+
+
+def ups_values(num_lines):
+    values = {}
+    for line in range(1, num_lines + 1):
+        values[INPUT_FREQUENCY + (line,)] = 600 + line
+        values[INPUT_VOLTAGE + (line,)] = 120 + line
+        values[OUTPUT_VOLTAGE + (line,)] = 230 + line
+        values[OUTPUT_CURRENT + (line,)] = 10 + line
+    return values
+
+
+def result_of(deferred):
+    """Get the result of a Deferred that has already fired."""
+    results = []
+    deferred.addBoth(results.append)
+    assert results, 'Deferred has not fired.'
+    if isinstance(results[0], Failure):
+        results[0].raiseException()
+    return results[0]
+
+
+def walk(agent, version=2, max_repetitions=25,
+         oid_list=(('UPS-MIB', 'upsInputFrequency'),
+                   ('UPS-MIB', 'upsInputVoltage'))):
+    twister = SNMPTwister('localhost', 161)
+    twister.get_bulk = agent.get_bulk
+    twister.get_next = agent.get_next
+    return result_of(twister.walk(list(oid_list), version,
+                                  max_repetitions=max_repetitions))
+
+
+def column_values(column):
+    return [(var[0].getOid()[-1], int(var[1])) for var in column]
+
+
+def test_object_type_cache():
+    twister = SNMPTwister('localhost', 161)
+    oid = ('UPS-MIB', 'upsIdentModel', 0)
+
+    object_type = twister._object_type(oid)
+    assert twister._object_type(oid) is object_type
+    assert twister._object_type(('UPS-MIB', 'upsIdentModel', 1)) is not object_type
+    assert twister._object_type(object_type) is object_type
+    assert twister._object_identity(oid) is twister._object_identity(oid)
+
+
+def test_walk_leaves_subtree():
+    # Each column ends where the next one starts; three rows, with two
+    # rows per request.
+    agent = FakeSNMPAgent(ups_values(3))
+    frequencies, voltages = walk(agent, max_repetitions=2)
+    assert column_values(frequencies) == [(1, 601), (2, 602), (3, 603)]
+    assert column_values(voltages) == [(1, 121), (2, 122), (3, 123)]
+
+    # The second request continues from the last OID in the first.
+    assert len(agent.requests) == 2
+    assert agent.requests[1] == [INPUT_FREQUENCY + (2,), INPUT_VOLTAGE + (2,)]
+
+
+def test_walk_end_of_mib():
+    # The last column of the MIB ends in EndOfMibView.
+    agent = FakeSNMPAgent(ups_values(2))
+    voltages, currents = walk(agent, oid_list=[
+        ('UPS-MIB', 'upsOutputVoltage'), ('UPS-MIB', 'upsOutputCurrent')])
+    assert column_values(voltages) == [(1, 231), (2, 232)]
+    assert column_values(currents) == [(1, 11), (2, 12)]
+    assert len(agent.requests) == 1
+
+
+def test_walk_empty_table():
+    agent = FakeSNMPAgent({OUTPUT_VOLTAGE + (1,): 231})
+    assert walk(agent) == [[], []]
+
+    # An agent that returns no rows at all.
+    agent = FakeSNMPAgent(ups_values(2), max_rows=0)
+    assert walk(agent) == [[], []]
+    assert len(agent.requests) == 1
+
+
+def test_walk_truncated():
+    # Responses with fewer rows than requested take more requests.
+    agent = FakeSNMPAgent(ups_values(4), max_rows=1)
+    frequencies, voltages = walk(agent, max_repetitions=10)
+    assert column_values(frequencies) == [(i, 600 + i) for i in range(1, 5)]
+    assert column_values(voltages) == [(i, 120 + i) for i in range(1, 5)]
+    assert len(agent.requests) == 5
+
+
+def test_walk_snmpv1():
+    # SNMPv1 walks with GETNEXT, a row at a time.
+    agent = FakeSNMPAgent(ups_values(2))
+    agent.get_bulk = None
+    frequencies, voltages = walk(agent, version=1)
+    assert column_values(frequencies) == [(1, 601), (2, 602)]
+    assert column_values(voltages) == [(1, 121), (2, 122)]
+    assert len(agent.requests) == 3
+
+
+def test_walk_failure():
+    agent = FakeSNMPAgent(ups_values(2))
+    agent.get_bulk = lambda *args, **kwargs: succeed(None)
+    assert walk(agent) is None
+
+
+def test_table_rows():
+    # Rows are grouped by index, in numerical order of the index.
+    agent = FakeSNMPAgent(ups_values(11))
+    frequencies, voltages = walk(agent)
+    rows = _table_rows([frequencies[::-1], voltages])
+    assert len(rows) == 11
+    for index, row in enumerate(rows, 1):
+        assert column_values(row) == [(index, 600 + index),
+                                      (index, 120 + index)]
+    assert _table_rows([[], []]) == []
+
+
+def test_snmp_poll():
+    twister = SNMPTwister('localhost', 161)
+    agent = FakeSNMPAgent(ups_values(2))
+    twister.get_bulk = agent.get_bulk
+    gets = []
+
+    def get(oid_list, version):
+        gets.append(oid_list)
+        return succeed(['status'])
+    twister.get = get
+
+    poll = SNMPPoll(twister, 2,
+                    get_list=[('UPS-MIB', 'upsBatteryStatus', 0)],
+                    walk_list=[('UPS-MIB', 'upsInputFrequency')])
+    get_result, (frequencies,) = result_of(poll.run())
+    assert get_result == ['status']
+    assert gets == [[('UPS-MIB', 'upsBatteryStatus', 0)]]
+    assert column_values(frequencies) == [(1, 601), (2, 602)]
+
+    # Nothing to walk, or nothing to get.
+    assert result_of(SNMPPoll(twister, 2, get_list=poll.get_list).run()) == \
+        (['status'], [])
+    get_result, (frequencies,) = result_of(
+        SNMPPoll(twister, 2, walk_list=poll.walk_list).run())
+    assert get_result == []
+    assert column_values(frequencies) == [(1, 601), (2, 602)]
+    assert len(gets) == 2
+
+    # A failed request fails the poll.
+    twister.get = lambda oid_list, version: succeed(None)
+    assert result_of(poll.run()) is None
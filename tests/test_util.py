@@ -1 +1,26 @@
-from socs import util  # noqa: F401
+import hashlib
+
+import pytest
+
+from socs import util
+
+
+def test_get_checksums(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'{i}.dat'
+        path.write_bytes(bytes(range(256)) * (i * 10000 + 1))
+        paths.append(str(path))
+
+    for algorithm in util.CHECKSUM_COMMANDS:
+        checksums = util.get_checksums(paths, algorithm)
+        for path, checksum in zip(paths, checksums):
+            with open(path, 'rb') as f:
+                assert checksum == hashlib.new(algorithm, f.read()).hexdigest()
+    assert util.get_md5sum(paths[0]) == util.get_checksum(paths[0])
+
+    checksums = util.get_checksums(paths + [str(tmp_path / 'missing')],
+                                   return_exceptions=True)
+    assert isinstance(checksums[-1], FileNotFoundError)
+    with pytest.raises(ValueError):
+        util.get_checksum(paths[0], 'crc32')